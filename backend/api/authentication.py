@@ -0,0 +1,235 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Stateless JWT authentication without a user lookup       ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module lets authenticated requests run without loading the User row.
+Tokens carry the user's id, username and auth_version in signed claims, and
+StatelessJWTAuthentication turns them into a GolfTokenUser built from those
+claims alone.
+
+User.auth_version is bumped whenever a password or the active, staff or
+superuser flags change. A token whose auth_version is behind the user's
+current one is rejected, so those changes still revoke old tokens. The
+current version is read from a short-lived in-process cache backed by the
+shared cache, so the users table is only hit when both miss.
+
+Views that need fields beyond the claims call request.user.get_user(), which
+returns the full row from the same kind of in-process TTL cache.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+AUTH_VERSION_KEY = "auth:version:{user_id}"
+
+
+class TTLCache:
+    """Small thread-safe in-process cache with a fixed time to live."""
+
+    def __init__(self, ttl, max_entries=10000):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry stays valid
+            max_entries (int): Entries kept before the cache is cleared
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a live entry, or None."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        """Store an entry for ttl seconds."""
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._data.clear()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def delete(self, key):
+        """Drop an entry if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_versions = TTLCache(getattr(settings, "AUTH_VERSION_CACHE_SECONDS", 30))
+_users = TTLCache(getattr(settings, "AUTH_USER_CACHE_SECONDS", 60))
+
+
+def current_auth_version(user_id):
+    """
+    Current auth_version for a user.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        int or None: The version, or None if the user no longer exists
+    """
+    version = _versions.get(user_id)
+    if version is not None:
+        return version
+
+    key = AUTH_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(id=user_id, is_active=True)
+            .values_list("auth_version", flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+        cache.set(key, version, api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+    _versions.set(user_id, version)
+    return version
+
+
+def get_cached_user(user_id):
+    """
+    Full User row for an id, cached in process for AUTH_USER_CACHE_SECONDS.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        User: The user
+
+    Raises:
+        User.DoesNotExist: If there is no such user
+    """
+    user = _users.get(user_id)
+    if user is None:
+        user = get_user_model().objects.get(id=user_id)
+        _users.set(user_id, user)
+    return user
+
+
+def forget_user(user_id, auth_version=None):
+    """
+    Drop cached state for a user after their row changes.
+
+    Args:
+        user_id (int): ID of the user
+        auth_version (int, optional): New version to publish to other processes
+    """
+    _users.delete(user_id)
+    _versions.delete(user_id)
+    if auth_version is not None:
+        cache.set(
+            AUTH_VERSION_KEY.format(user_id=user_id),
+            auth_version,
+            api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+        )
+
+
+class GolfTokenUser(TokenUser):
+    """
+    Request user built from token claims, with lazy access to the full row.
+    """
+
+    @cached_property
+    def id(self):
+        # Simple JWT stores the id claim as a string; compare like User.id
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def auth_version(self):
+        return self.token.get("auth_version", 0)
+
+    def get_user(self):
+        """
+        Load the full User for this token.
+
+        Returns:
+            User: Cached user row
+        """
+        return get_cached_user(self.id)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts signed claims instead of loading the user.
+
+    Rejects tokens issued before the user's last password or permission
+    change.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        current = current_auth_version(user.id)
+        if current is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if user.auth_version < current:
+            raise InvalidToken(_("Token was issued before a password or permission change"))
+        return user
+
+
+def add_user_claims(token, user):
+    """
+    Add the claims GolfTokenUser reads to a token.
+
+    Args:
+        token: Refresh or access token
+        user: User the token is for
+
+    Returns:
+        The same token
+    """
+    token["username"] = user.username
+    token["auth_version"] = user.auth_version
+    if user.is_staff:
+        token["is_staff"] = True
+    if user.is_superuser:
+        token["is_superuser"] = True
+    return token
+
+
+def tokens_for_user(user):
+    """
+    Issue a refresh token (and its access token) carrying user claims.
+
+    Args:
+        user: User to issue tokens for
+
+    Returns:
+        RefreshToken: Refresh token; .access_token inherits the claims
+    """
+    return add_user_claims(RefreshToken.for_user(user), user)
+
+
+class GolfTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token pair serializer for /api/token/ that adds user claims."""
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
@@ -0,0 +1,107 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Pre-serialized, versioned course catalog                 ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module serves the saved course catalog (every course with its tees
+and holes) for SavedCourseView without walking the ORM on each request.
+
+The catalog is serialized once per version into JSON and gzip bytes and
+kept in the cache backend, with an ETag derived from the JSON. The version
+is a counter in the cache that course ingestion and any course, tee or
+hole write bump (see signals.py), so the next request builds a fresh blob.
+Each process also keeps the blob for the current version in memory, so a
+request costs one cache read for the version number.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "course-catalog:version"
+BLOB_KEY = "course-catalog:{version}"
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def _initial_version():
+    # Seeded from the clock so a counter lost with the cache never repeats
+    # a version another process still holds in memory
+    return time.time_ns() // 1_000_000
+
+
+def catalog_version():
+    """
+    Current catalog version.
+
+    Returns:
+        int: Version counter
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate the cached catalog so the next request rebuilds it."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+
+
+def build_catalog():
+    """
+    Serialize every course with its tees and holes.
+
+    Returns:
+        bytes: JSON in the SavedCourseView response format
+    """
+    from .fast_serializers import course_catalog, dumps
+
+    return dumps(course_catalog())
+
+
+def get_catalog():
+    """
+    The catalog for the current version, building and caching it if needed.
+
+    Returns:
+        dict: "etag" (quoted), "json" bytes and "gzip" bytes
+    """
+    version = catalog_version()
+    blob = _local.get(version)
+    if blob is not None:
+        return blob
+
+    key = BLOB_KEY.format(version=version)
+    blob = cache.get(key)
+    if blob is None:
+        body = build_catalog()
+        blob = {
+            "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            "json": body,
+            "gzip": gzip.compress(body, compresslevel=6),
+        }
+        cache.set(
+            key, blob, getattr(settings, "COURSE_CATALOG_CACHE_TIMEOUT", 24 * 60 * 60)
+        )
+
+    with _local_lock:
+        _local.clear()
+        _local[version] = blob
+    return blob
@@ -0,0 +1,203 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Per-user golfer profile context for the chatbot          ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module builds the "golfer profile" block appended to chatbot prompts.
+The block summarizes the requesting user's overall stats and most recent
+rounds using two aggregate queries plus one for packed rounds (see
+score_packing.py), and the hardest holes of the tee they played last from
+the materialized hole stats. It is cached per user until one of their
+rounds or hole scores changes (see signals.py).
+
+With CHAT_RETRIEVAL_ENABLED, technical questions get the stats summary plus
+only the rounds, notes and tips most relevant to the question (see
+retrieval.py) instead of a fixed list of recent rounds.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .model_router import CASUAL, canned_reply, classify
+from .models import HoleScore, Round
+from .score_packing import packed_score_rows
+
+logger = logging.getLogger(__name__)
+
+PROFILE_KEY = "golfer-profile:{user_id}:{recent_rounds}"
+RECENT_ROUNDS = 5
+HARDEST_HOLES = 3
+
+
+def build_golfer_profile(user_id, recent_rounds=RECENT_ROUNDS):
+    """
+    Build the profile text for a user straight from the database.
+
+    Args:
+        user_id (int): ID of the golfer
+        recent_rounds (int): Number of recent rounds to list
+
+    Returns:
+        str: Profile block ready to append to a prompt
+    """
+    totals = HoleScore.objects.filter(round__player_id=user_id).aggregate(
+        rounds=Count("round", distinct=True),
+        holes=Count("id"),
+        strokes=Sum("strokes"),
+        putts=Sum("putts"),
+        penalties=Sum("penalties"),
+        fairways=Count("id", filter=Q(fairway_hit=True)),
+        greens=Count("id", filter=Q(green_in_regulation=True)),
+    )
+
+    totals = {name: value or 0 for name, value in totals.items()}
+    packed_rounds = set()
+    for row in packed_score_rows(Round.objects.filter(player_id=user_id)):
+        packed_rounds.add(row["round_id"])
+        totals["holes"] += 1
+        totals["strokes"] += row["strokes"]
+        totals["putts"] += row["putts"]
+        totals["penalties"] += row["penalties"]
+        totals["fairways"] += row["fairway_hit"]
+        totals["greens"] += row["green_in_regulation"]
+    totals["rounds"] += len(packed_rounds)
+
+    if not totals["rounds"]:
+        return "\n\nGolfer profile:\n- No rounds recorded yet\n"
+
+    rounds = list(
+        Round.objects.filter(player_id=user_id)
+        .select_related("course")
+        .annotate(score=Coalesce(Sum("hole_scores__strokes"), "strokes_total"))
+        .order_by("-date_played")[: max(recent_rounds, 1)]
+    )
+
+    holes = totals["holes"]
+    lines = [
+        "\n\nGolfer profile:",
+        f"- Rounds recorded: {totals['rounds']}",
+        f"- Average score: {totals['strokes'] / totals['rounds']:.1f} per round",
+        f"- Putts: {totals['putts'] / holes:.2f} per hole",
+        f"- Penalties: {totals['penalties'] / totals['rounds']:.1f} per round",
+        f"- Fairways hit: {totals['fairways'] / holes * 100:.0f}%",
+        f"- Greens in regulation: {totals['greens'] / holes * 100:.0f}%",
+    ]
+    if rounds:
+        lines += _hardest_holes(rounds[0])
+    if not recent_rounds:
+        return "\n".join(lines) + "\n"
+
+    lines += ["", "Recent rounds data:"]
+    for round_obj in rounds[:recent_rounds]:
+        lines.append(
+            f"- Course: {round_obj.course.course_name}, "
+            f"Date: {round_obj.date_played.strftime('%Y-%m-%d')}, "
+            f"Score: {round_obj.score or 0}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def _hardest_holes(latest):
+    """
+    Profile lines naming the hardest holes of the tee a user played last.
+
+    Args:
+        latest (Round): The user's most recent round, with its course
+
+    Returns:
+        list: Lines to add to the profile, empty without hole stats
+    """
+    from .stats import hole_difficulty
+
+    holes = sorted(
+        hole_difficulty(latest.course_id, latest.tee_id),
+        key=lambda hole: hole["difficulty_rank"],
+    )[:HARDEST_HOLES]
+    if not holes:
+        return []
+    return [f"- Hardest holes at {latest.course.course_name} (all players):"] + [
+        f"  - Hole {hole['hole_number']} (par {hole['par']}): "
+        f"{hole['avg_to_par']:+.2f} to par, {hole['blow_up_pct']:.0f}% double "
+        f"bogey or worse"
+        for hole in holes
+    ]
+
+
+def get_golfer_profile(user_id, recent_rounds=RECENT_ROUNDS):
+    """
+    Return the cached profile text for a user, building it if needed.
+
+    Args:
+        user_id (int): ID of the golfer
+        recent_rounds (int): Number of recent rounds to list
+
+    Returns:
+        str: Profile block ready to append to a prompt
+    """
+    return cache.get_or_set(
+        PROFILE_KEY.format(user_id=user_id, recent_rounds=recent_rounds),
+        lambda: build_golfer_profile(user_id, recent_rounds),
+        getattr(settings, "CHAT_PROFILE_CACHE_TIMEOUT", 24 * 60 * 60),
+    )
+
+
+def invalidate_golfer_profile(user_id):
+    """
+    Drop a user's cached profile so the next chat rebuilds it.
+
+    Args:
+        user_id (int): ID of the golfer
+    """
+    cache.delete_many(
+        [
+            PROFILE_KEY.format(user_id=user_id, recent_rounds=recent_rounds)
+            for recent_rounds in (0, RECENT_ROUNDS)
+        ]
+    )
+
+
+def get_chat_context(user_id, question):
+    """
+    Build the context block appended to a chat message.
+
+    Uses retrieval when it is enabled and the message is not small talk,
+    falling back to the cached profile with recent rounds otherwise.
+
+    Args:
+        user_id (int): ID of the golfer
+        question (str): The chat message
+
+    Returns:
+        str: Context block ready to append to a prompt
+    """
+    if not getattr(settings, "CHAT_RETRIEVAL_ENABLED", False):
+        return get_golfer_profile(user_id)
+    if canned_reply(question) is not None or classify(question) == CASUAL:
+        return ""
+
+    from .retrieval import retrieve
+
+    try:
+        snippets = retrieve(user_id, question)
+    except Exception as e:
+        logger.warning("Retrieval failed, using recent rounds instead: %s", str(e))
+        return get_golfer_profile(user_id)
+
+    context = get_golfer_profile(user_id, recent_rounds=0)
+    if snippets:
+        context += "\nRelevant rounds and tips:\n" + "\n".join(
+            f"- {snippet}" for snippet in snippets
+        ) + "\n"
+    return context
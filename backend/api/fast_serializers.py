@@ -0,0 +1,164 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : values()-based serialization for hot read endpoints      ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module builds read-only payloads straight from values_list() tuples
+instead of model instances and DRF ModelSerializers, and renders JSON with
+orjson when it is installed. The output matches the serializers in
+serializers.py field for field, so clients see the same documents:
+
+    course_catalog()   CourseSerializer(many=True) over every course
+    user_rows()        UserSerializer over users
+
+FastJSONRenderer is the project's default DRF JSON renderer. It produces
+the same JSON as rest_framework's JSONRenderer, and uses orjson for speed
+when available. orjson writes float exponents without "+" (1e20, not
+1e+20) and encodes NaN and infinity as null, where JSONRenderer raises
+ValueError; other output is byte for byte the same.
+scripts/serialization_bench.py measures both layers.
+"""
+
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+COURSE_FIELDS = (
+    "id",
+    "club_name",
+    "course_name",
+    "address",
+    "city",
+    "state",
+    "country",
+    "latitude",
+    "longitude",
+)
+TEE_FIELDS = (
+    "id",
+    "tee_name",
+    "gender",
+    "course_rating",
+    "slope_rating",
+    "bogey_rating",
+    "total_yards",
+    "total_meters",
+    "number_of_holes",
+    "par_total",
+    "front_course_rating",
+    "front_slope_rating",
+    "front_bogey_rating",
+    "back_course_rating",
+    "back_slope_rating",
+    "back_bogey_rating",
+)
+HOLE_FIELDS = ("hole_number", "par", "yardage", "handicap")
+USER_FIELDS = ("username", "email", "first_name", "last_name")
+
+_orjson = None
+_encoder = JSONEncoder()
+
+
+def _load_orjson():
+    """Return the orjson module, or False when it is not installed."""
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+
+            _orjson = orjson
+        except ImportError:
+            _orjson = False
+    return _orjson
+
+
+def dumps(data):
+    """
+    Encode data as compact UTF-8 JSON, like DRF's JSONRenderer.
+
+    With orjson, non-finite floats become null instead of raising (see the
+    module docstring).
+
+    Args:
+        data: JSON-serializable data; dates, decimals, UUIDs and lazy strings
+            are handled as DRF handles them
+
+    Returns:
+        bytes: JSON document
+    """
+    orjson = _load_orjson()
+    if orjson:
+        # Non-str keys are converted as json.dumps converts them
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        body = orjson.dumps(data, default=_encoder.default, option=options)
+    else:
+        body = json.dumps(
+            data,
+            cls=JSONEncoder,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode()
+    # Same escaping of U+2028 and U+2029 DRF applies so the output is valid JavaScript
+    if b"\xe2\x80" in body:
+        body = body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return body
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with dumps() unless indentation is requested."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def course_catalog():
+    """
+    Every course with its tees and holes, in three queries.
+
+    Returns:
+        list: Dicts in the CourseSerializer(many=True) format
+    """
+    from .models import Course, Hole, Tee
+
+    holes_by_tee = {}
+    for tee_id, *values in Hole.objects.values_list("tee_id", *HOLE_FIELDS):
+        holes_by_tee.setdefault(tee_id, []).append(dict(zip(HOLE_FIELDS, values)))
+
+    tees_by_course = {}
+    for course_id, *values in Tee.objects.values_list("course_id", *TEE_FIELDS):
+        tee = dict(zip(TEE_FIELDS, values))
+        tee["holes"] = holes_by_tee.get(tee["id"], [])
+        tees_by_course.setdefault(course_id, []).append(tee)
+
+    catalog = []
+    for values in Course.objects.values_list(*COURSE_FIELDS):
+        course = dict(zip(COURSE_FIELDS, values))
+        course["tees"] = tees_by_course.get(course["id"], [])
+        catalog.append(course)
+    return catalog
+
+
+def user_rows(queryset):
+    """
+    Users in the UserSerializer format.
+
+    Args:
+        queryset: User QuerySet to read
+
+    Returns:
+        list: Dicts with username, email, first_name and last_name
+    """
+    return [dict(zip(USER_FIELDS, values)) for values in queryset.values_list(*USER_FIELDS)]
@@ -16,6 +16,7 @@ and custom processing for complex data structures like golf scorecards.
 
 from django import forms
 from .models import User, Round, Course, Tee, HoleScore
+from .score_packing import unpack_round
 
 
 class RegisterForm(forms.Form):
@@ -177,6 +178,8 @@ class ScorecardForm(forms.ModelForm):
         Returns:
             Round: The saved round instance
         """
+        if commit and self.instance.pk is not None:
+            unpack_round(self.instance)
         round_instance = super().save(commit=commit)
 
         if commit:
@@ -0,0 +1,134 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Idempotency keys for retried score writes                ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module lets clients retry writes safely. A request sent with an
+Idempotency-Key header is performed once per user and key; retries with
+the same key and body get the stored response back, marked with an
+Idempotent-Replayed header, and a different body under a used key is
+rejected with 422.
+
+The key row is inserted in the same transaction as the write, so a retry
+that arrives while the first attempt is still running waits on the unique
+constraint and then replays its result. Server errors roll the write and
+the key back so the request can be retried. Keys are purged after
+IDEMPOTENCY_KEY_TTL_HOURS by a periodic task.
+"""
+
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .fast_serializers import dumps
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(request):
+    """
+    Fingerprint the parts of a request a retry must repeat exactly.
+
+    Args:
+        request: DRF request
+
+    Returns:
+        str: Hex digest of the method, path and body
+    """
+    payload = json.dumps(
+        {"method": request.method, "path": request.path, "body": request.data},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def idempotent(method):
+    """
+    Make an APIView write method honour the Idempotency-Key header.
+
+    Requests without the header run as before.
+
+    Args:
+        method: View method taking (self, request, *args, **kwargs)
+
+    Returns:
+        The wrapped method
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        from .models import IdempotencyKey
+
+        key = request.headers.get(HEADER, "").strip()
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_hash(request)
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user_id=request.user.id, key=key, request_hash=fingerprint
+                    )
+            except IntegrityError:
+                record = IdempotencyKey.objects.get(user_id=request.user.id, key=key)
+                if record.request_hash != fingerprint:
+                    return Response(
+                        {"error": f"{HEADER} was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                response = Response(record.response, status=record.status_code)
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            # Stored as rendered so a replay matches the original byte for byte
+            record.status_code = response.status_code
+            record.response = json.loads(dumps(response.data))
+            record.save(update_fields=["status_code", "response"])
+            return response
+
+    return wrapper
+
+
+def purge_idempotency_keys(now=None):
+    """
+    Delete keys older than IDEMPOTENCY_KEY_TTL_HOURS.
+
+    Args:
+        now (datetime, optional): Current time
+
+    Returns:
+        int: Number of keys deleted
+    """
+    from .models import IdempotencyKey
+
+    hours = getattr(settings, "IDEMPOTENCY_KEY_TTL_HOURS", 24)
+    cutoff = (now or timezone.now()) - timedelta(hours=hours)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
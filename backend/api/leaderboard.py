@@ -0,0 +1,280 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Leaderboard computation and change publishing            ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module computes the leaderboard served by LeaderBoardView and pushes
+changes to live watchers (see leaderboard_stream.py).
+
+Round and hole score writes queue a publish_leaderboard Celery task once
+they commit, at most one per LEADERBOARD_PUSH_DEBOUNCE_SECONDS. The task
+recomputes the standings and compares them with the last published
+snapshot in Redis. When a player's rank changed, or nothing has been
+published yet, it stores the new snapshot under the next version and
+publishes a delta on a Redis pub/sub channel: the entries whose rank or
+figures changed since the snapshot, and the players who dropped off.
+Writes that leave every rank where it was publish nothing; their figures
+go out with the next delta.
+"""
+
+import builtins
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .fast_serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "leaderboard:snapshot"
+CHANNEL = "leaderboard:deltas"
+PENDING_KEY = "leaderboard:publish-pending"
+
+# Fields sent to live watchers; presence is left to the REST endpoint
+STANDING_FIELDS = ("user_id", "username", "average_score", "handicap", "total_rounds")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _redis():
+    """
+    Return a shared Redis client, or None when Redis is not configured.
+
+    Returns:
+        redis.Redis or None: Client for REDIS_URL
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", "")
+    if not url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(
+                    url, socket_timeout=2, socket_connect_timeout=2
+                )
+    return _client
+
+
+def build_leaderboard():
+    """
+    Rank players by their average score over their last 20 rounds.
+
+    Returns:
+        list: Leaderboard entries, best average first
+    """
+    from .models import Round, User
+    from .presence import online_user_ids
+
+    recent_rounds = Round.objects.select_related("tee").order_by("-date_played")
+    players = list(
+        User.objects.prefetch_related(
+            Prefetch("round_set", queryset=recent_rounds[:20], to_attr="recent_rounds")
+        )[:50]
+    )
+    online = online_user_ids()
+    leader_board = []
+
+    # Rounds saved before totals were stored, until they are backfilled
+    missing = [
+        player_round.id
+        for player in players
+        for player_round in player.recent_rounds
+        if player_round.holes_played is None
+    ]
+    if missing:
+        totals = Round.computed_totals(missing)
+        for player in players:
+            for player_round in player.recent_rounds:
+                if player_round.id in totals:
+                    (
+                        player_round.strokes_total,
+                        player_round.holes_played,
+                    ) = totals[player_round.id]
+
+    for player in players:
+        player_rounds = player.recent_rounds
+
+        round_count = len(player_rounds)
+        if round_count == 0:
+            continue
+
+        total = 0
+        for player_round in player_rounds:
+            total += player_round.strokes_total
+
+        differentials = []
+        for player_round in player_rounds:
+            num_holes = player_round.holes_played
+
+            course_rating = player_round.tee.course_rating
+            slope_rating = player_round.tee.slope_rating
+
+            if num_holes == 9:
+                adjusted_score = player_round.strokes_total * 2
+                differential = (adjusted_score - course_rating) * 113 / slope_rating
+            elif num_holes == 18:
+                differential = (
+                    (player_round.strokes_total - course_rating) * 113 / slope_rating
+                )
+            else:
+                continue
+
+            differentials.append(differential)
+
+        best_differentials = sorted(differentials)[: max(1, round_count // 2)]
+        handicap = None
+        if best_differentials:
+            handicap = builtins.round(
+                (sum(best_differentials) / len(best_differentials)) * 0.96, 2
+            )
+
+        if player.id in online:
+            is_online = "Online"
+        else:
+            is_online = "Offline"
+
+        leader_board.append(
+            {
+                "is_online": is_online,
+                "id": player.id,
+                "user_id": player.id,
+                "username": player.username,
+                "average_score": builtins.round(total / round_count, 1),
+                "handicap": handicap,
+                "total_rounds": round_count,
+            }
+        )
+
+    leader_board.sort(key=lambda x: x["average_score"])
+    return leader_board
+
+
+def standings(leader_board):
+    """
+    Leaderboard entries as sent to live watchers, with their rank.
+
+    Args:
+        leader_board (list): Result of build_leaderboard()
+
+    Returns:
+        list: Dicts of rank plus STANDING_FIELDS
+    """
+    return [
+        {"rank": rank, **{field: entry[field] for field in STANDING_FIELDS}}
+        for rank, entry in enumerate(leader_board, start=1)
+    ]
+
+
+def diff_standings(old, new):
+    """
+    Compare two standings.
+
+    Args:
+        old (list): Previously published standings
+        new (list): Current standings
+
+    Returns:
+        tuple: (whether any rank changed, entries added or changed,
+            user ids no longer on the board)
+    """
+    previous = {entry["user_id"]: entry for entry in old}
+    current = {entry["user_id"] for entry in new}
+    ranks_changed = [entry["user_id"] for entry in old] != [
+        entry["user_id"] for entry in new
+    ]
+    changed = [entry for entry in new if previous.get(entry["user_id"]) != entry]
+    removed = [user_id for user_id in previous if user_id not in current]
+    return ranks_changed, changed, removed
+
+
+def load_snapshot(client=None):
+    """
+    The last published standings.
+
+    Args:
+        client (redis.Redis, optional): Client to read with
+
+    Returns:
+        dict: {"version": int, "standings": list}; version 0 when nothing
+            has been published
+    """
+    client = client or _redis()
+    raw = client.get(SNAPSHOT_KEY) if client is not None else None
+    if not raw:
+        return {"version": 0, "standings": []}
+    return json.loads(raw)
+
+
+def publish_leaderboard():
+    """
+    Publish a delta if the current standings rank anyone differently.
+
+    Returns:
+        dict or None: The published delta, or None if nothing was published
+    """
+    import redis
+
+    client = _redis()
+    if client is None:
+        return None
+
+    current = standings(build_leaderboard())
+    with client.pipeline() as pipe:
+        while True:
+            try:
+                # Another publisher moving the snapshot restarts the comparison
+                pipe.watch(SNAPSHOT_KEY)
+                snapshot = load_snapshot(pipe)
+                ranks_changed, changed, removed = diff_standings(
+                    snapshot["standings"], current
+                )
+                if not ranks_changed and snapshot["version"]:
+                    pipe.unwatch()
+                    return None
+                version = snapshot["version"] + 1
+                delta = {
+                    "version": version,
+                    "base": snapshot["version"],
+                    "changed": changed,
+                    "removed": removed,
+                }
+                pipe.multi()
+                snapshot = {"version": version, "standings": current}
+                pipe.set(SNAPSHOT_KEY, dumps(snapshot))
+                pipe.publish(CHANNEL, dumps(delta))
+                pipe.execute()
+                return delta
+            except redis.WatchError:
+                continue
+
+
+def queue_leaderboard_update():
+    """Queue publish_leaderboard, once per debounce window."""
+    if not getattr(settings, "REDIS_URL", ""):
+        return
+    debounce = getattr(settings, "LEADERBOARD_PUSH_DEBOUNCE_SECONDS", 2)
+    if not cache.add(PENDING_KEY, 1, timeout=debounce + 30):
+        return
+
+    from .tasks import publish_leaderboard as task
+
+    try:
+        task.apply_async(countdown=debounce)
+    except Exception as e:
+        cache.delete(PENDING_KEY)
+        logger.warning("Unable to queue leaderboard publish: %s", e)
@@ -0,0 +1,286 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Server-Sent Events stream of leaderboard changes         ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module serves /api/leaderboard/stream/, a Server-Sent Events stream
+that replaces polling /api/leaderboard/. A watcher first gets the current
+standings as a "snapshot" event, then a "delta" event for each version
+published by leaderboard.publish_leaderboard(). Event ids are versions, so
+a reconnecting client's Last-Event-ID skips the snapshot when it is
+already current. Comment lines are sent as keepalives.
+
+Each web process holds one Redis pub/sub subscription and fans messages
+out to its watchers through in-memory queues, so watchers cost no
+database queries and one Redis connection per process. A watcher that
+misses a version, or falls too far behind, is sent a fresh snapshot.
+When nothing has been published yet, one process builds the first
+snapshot under a cache lock and the others wait for it.
+
+The stream needs the ASGI entry point (backend.asgi:application under an
+ASGI server such as uvicorn, which the development image runs) and Redis;
+otherwise it answers 501 or 503.
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+
+from .leaderboard import CHANNEL, SNAPSHOT_KEY, publish_leaderboard
+
+logger = logging.getLogger(__name__)
+
+# How long clients wait before reconnecting, sent in the stream
+RETRY_MS = 5000
+
+# Held by the process publishing the first snapshot
+REBUILD_KEY = "leaderboard:snapshot-rebuild"
+REBUILD_TIMEOUT = 60
+# How often, and how many times, other processes look for that snapshot
+REBUILD_POLL_SECONDS = 0.2
+REBUILD_POLLS = 25
+
+# Queue markers: fetch a fresh snapshot, or end the stream
+RESYNC = object()
+CLOSE = object()
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+class Broadcaster:
+    """
+    One Redis subscription to the delta channel, shared by a process's watchers.
+
+    The listener starts with the first watcher. If the subscription fails,
+    every watcher's stream is closed so clients reconnect, and the next
+    watcher starts a new listener.
+    """
+
+    def __init__(self, url):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            url (str): Redis URL
+        """
+        import redis.asyncio as redis
+
+        self.client = redis.Redis.from_url(url)
+        self.queues = set()
+        self.task = None
+
+    def subscribe(self):
+        """
+        Register a watcher.
+
+        Returns:
+            asyncio.Queue: Queue receiving raw delta messages and markers
+        """
+        queue = asyncio.Queue(getattr(settings, "LEADERBOARD_STREAM_QUEUE_SIZE", 100))
+        self.queues.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        """Remove a watcher."""
+        self.queues.discard(queue)
+
+    def deliver(self, item):
+        """
+        Hand an item to every watcher.
+
+        A watcher whose queue is full is skipped to a fresh snapshot instead.
+
+        Args:
+            item: Raw delta message or a marker
+        """
+        for queue in list(self.queues):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def _listen(self):
+        pubsub = self.client.pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self.deliver(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Leaderboard subscription lost: %s", str(e))
+        finally:
+            self.deliver(CLOSE)
+            await pubsub.aclose()
+
+
+def _broadcaster():
+    """The broadcaster for the running event loop."""
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = Broadcaster(settings.REDIS_URL)
+    return broadcaster
+
+
+async def _snapshot(client):
+    """
+    The published standings, publishing them first if there are none yet.
+
+    Only the process holding REBUILD_KEY publishes; the others poll for its
+    snapshot and fall back to an empty version 0, which the first delta
+    (base 0) fills in.
+
+    Args:
+        client (redis.asyncio.Redis): Client to read with
+
+    Returns:
+        dict: {"version": int, "standings": list}
+    """
+    raw = await client.get(SNAPSHOT_KEY)
+    if raw is None:
+        if await sync_to_async(cache.add)(REBUILD_KEY, 1, REBUILD_TIMEOUT):
+            try:
+                await sync_to_async(publish_leaderboard)()
+            finally:
+                await sync_to_async(cache.delete)(REBUILD_KEY)
+            raw = await client.get(SNAPSHOT_KEY)
+        else:
+            for _ in range(REBUILD_POLLS):
+                await asyncio.sleep(REBUILD_POLL_SECONDS)
+                raw = await client.get(SNAPSHOT_KEY)
+                if raw is not None:
+                    break
+    return json.loads(raw) if raw else {"version": 0, "standings": []}
+
+
+def event(name, version, data):
+    """
+    Format one Server-Sent Event.
+
+    Args:
+        name (str): Event type
+        version (int): Leaderboard version, used as the event id
+        data: JSON-serializable payload
+
+    Returns:
+        str: The event, terminated by a blank line
+    """
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {version}\nevent: {name}\ndata: {payload}\n\n"
+
+
+async def events(last_version=None):
+    """
+    Stream leaderboard events for one watcher.
+
+    Args:
+        last_version (int, optional): Version the client already has
+
+    Yields:
+        str: Server-Sent Event text
+    """
+    broadcaster = _broadcaster()
+    # Subscribe before reading the snapshot so no delta falls in between
+    queue = broadcaster.subscribe()
+    keepalive = getattr(settings, "LEADERBOARD_STREAM_KEEPALIVE_SECONDS", 20)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        version = last_version
+        item = RESYNC
+        while item is not CLOSE:
+            if item is RESYNC:
+                snapshot = await _snapshot(broadcaster.client)
+                if snapshot["version"] != version:
+                    version = snapshot["version"]
+                    yield event("snapshot", version, snapshot)
+            elif item is not None:
+                delta = json.loads(item)
+                if delta["base"] == version:
+                    version = delta["version"]
+                    yield event("delta", version, delta)
+                elif version is None or delta["version"] > version:
+                    item = RESYNC  # a version was missed
+                    continue
+            try:
+                item = await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                item = None
+                yield ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+def _authenticate(request):
+    """User for the request's bearer token, or None without one."""
+    from rest_framework.request import Request
+
+    from .authentication import StatelessJWTAuthentication
+
+    result = StatelessJWTAuthentication().authenticate(Request(request))
+    return result[0] if result else None
+
+
+async def leaderboard_stream(request):
+    """
+    Stream leaderboard snapshots and deltas as Server-Sent Events.
+
+    Headers:
+        Authorization: Bearer <your_jwt_token>
+        Last-Event-ID: Version already held, sent by reconnecting clients
+
+    Args:
+        request: HTTP request
+
+    Returns:
+        StreamingHttpResponse: text/event-stream, or a JSON error
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The leaderboard stream needs the ASGI server"}, status=501
+        )
+    if not getattr(settings, "REDIS_URL", ""):
+        return JsonResponse({"error": "The leaderboard stream needs Redis"}, status=503)
+
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except APIException as e:
+        return JsonResponse({"detail": str(e.detail)}, status=401)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    try:
+        last_version = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_version = None
+
+    response = StreamingHttpResponse(
+        events(last_version), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx buffering the stream
+    return response
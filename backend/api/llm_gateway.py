@@ -0,0 +1,479 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Admission control and fair scheduling for Ollama calls   ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module puts a gateway in front of every Ollama chat call.
+Each model gets a fixed number of concurrency slots. Waiting requests are
+served by priority class first (chat before vision), then round-robin across
+users within a class so one golfer uploading several videos cannot starve
+everyone else. When a model's queue is full, or a request waits too long,
+the caller gets a GatewayBusy error carrying a retry hint. Calls that would
+load a cold model over a hot one during peak hours are refused the same way
+(see ollama_residency.py).
+
+Limits are enforced per worker process, so slots should be sized as the
+Ollama server's parallelism divided by the number of web workers.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from django.conf import settings
+
+from . import metrics, ollama_residency
+
+logger = logging.getLogger(__name__)
+
+gateway_rejected = metrics.registry.counter(
+    "llm_gateway_rejected_total", "Requests refused by the LLM gateway.", ("model", "reason")
+)
+gateway_active = metrics.registry.gauge(
+    "llm_gateway_active", "Calls currently holding a gateway slot.", ("model",)
+)
+gateway_queued = metrics.registry.gauge(
+    "llm_gateway_queued", "Calls currently waiting for a gateway slot.", ("model",)
+)
+gateway_slots = metrics.registry.gauge(
+    "llm_gateway_slots", "Gateway slots configured per model.", ("model",)
+)
+
+PRIORITY_CHAT = "chat"
+PRIORITY_VISION = "vision"
+
+# Lower rank is served first
+PRIORITY_RANKS = {
+    PRIORITY_CHAT: 0,
+    PRIORITY_VISION: 1,
+}
+
+
+class GatewayBusy(Exception):
+    """
+    Raised when a model call cannot be admitted.
+
+    Attributes:
+        model (str): Model the request was for
+        retry_after (int): Suggested number of seconds to wait before retrying
+    """
+
+    def __init__(self, model, retry_after, reason="queue full"):
+        self.model = model
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(
+            f"{model} is busy ({reason}), retry in {retry_after} seconds"
+        )
+
+
+class _Ticket:
+    """A single request waiting for a slot."""
+
+    def __init__(self, user_key, rank):
+        self.user_key = user_key
+        self.rank = rank
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class _ModelState:
+    """
+    Slots, wait queues and counters for one model.
+
+    Waiting tickets are grouped by priority rank and then by user. Users
+    are kept in an ordered dict that is rotated every time one of their
+    tickets is granted, which gives round-robin service within a rank.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.active = 0
+        self.waiting = {}
+        self.queued = 0
+        self.avg_service_time = None
+        self.counters = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "completed": 0,
+            "failed": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def enqueue(self, ticket):
+        """Add a ticket to the back of its user's queue."""
+        users = self.waiting.setdefault(ticket.rank, OrderedDict())
+        users.setdefault(ticket.user_key, deque()).append(ticket)
+        self.queued += 1
+
+    def remove(self, ticket):
+        """Drop a ticket that gave up waiting."""
+        users = self.waiting.get(ticket.rank, {})
+        tickets = users.get(ticket.user_key)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            self.queued -= 1
+            if not tickets:
+                del users[ticket.user_key]
+
+    def next_ticket(self):
+        """Pop the next ticket by priority rank, then round-robin by user."""
+        for rank in sorted(self.waiting):
+            users = self.waiting[rank]
+            if not users:
+                continue
+            user_key, tickets = next(iter(users.items()))
+            ticket = tickets.popleft()
+            del users[user_key]
+            if tickets:
+                # Move the user to the back so other users go first
+                users[user_key] = tickets
+            self.queued -= 1
+            return ticket
+        return None
+
+    def record_service_time(self, seconds):
+        """Keep an exponentially weighted average of call duration."""
+        if self.avg_service_time is None:
+            self.avg_service_time = seconds
+        else:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * seconds
+
+
+class LLMGateway:
+    """
+    Per-model concurrency limiter with priority classes and fair queuing.
+
+    Use slot() around any Ollama call, or chat() and embed() as drop-in
+    replacements for ollama.chat() and ollama.embed().
+    """
+
+    def __init__(
+        self, model_slots=None, default_slots=None, max_queue_depth=None, queue_timeout=None
+    ):
+        """
+        Initialize the gateway.
+
+        Any argument left as None is read from settings.LLM_GATEWAY the first
+        time it is needed.
+
+        Args:
+            model_slots (dict, optional): Concurrent calls allowed per model
+            default_slots (int, optional): Slots for models not listed
+            max_queue_depth (int, optional): Waiting requests allowed per model
+            queue_timeout (float, optional): Seconds a request may wait for a slot
+        """
+        self._model_slots = model_slots
+        self._default_slots = default_slots
+        self._max_queue_depth = max_queue_depth
+        self._queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._models = {}
+
+    def _config(self, name, override, default):
+        """Return an explicit override or the value from settings."""
+        if override is not None:
+            return override
+        return getattr(settings, "LLM_GATEWAY", {}).get(name, default)
+
+    @property
+    def max_queue_depth(self):
+        return self._config("MAX_QUEUE_DEPTH", self._max_queue_depth, 20)
+
+    @property
+    def queue_timeout(self):
+        return self._config("QUEUE_TIMEOUT", self._queue_timeout, 60)
+
+    def slots_for(self, model):
+        """
+        Number of concurrent calls allowed for a model.
+
+        Args:
+            model (str): Ollama model name
+
+        Returns:
+            int: Slot count
+        """
+        model_slots = self._config("MODEL_SLOTS", self._model_slots, {})
+        default_slots = self._config("DEFAULT_SLOTS", self._default_slots, 1)
+        return max(1, int(model_slots.get(model, default_slots)))
+
+    def _state(self, model):
+        """Return the state for a model, creating it on first use."""
+        state = self._models.get(model)
+        if state is None:
+            state = _ModelState(self.slots_for(model))
+            self._models[model] = state
+        return state
+
+    def _retry_after(self, state):
+        """Estimate seconds until a new request would be admitted."""
+        service_time = state.avg_service_time or 5.0
+        return max(1, math.ceil((state.queued + 1) * service_time / state.slots))
+
+    def _grant_next(self, state):
+        """Hand free slots to waiting tickets."""
+        granted = False
+        while state.active < state.slots:
+            ticket = state.next_ticket()
+            if ticket is None:
+                break
+            ticket.granted = True
+            state.active += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def acquire(self, model, priority=PRIORITY_CHAT, user_id=None):
+        """
+        Wait for a slot on a model.
+
+        Args:
+            model (str): Ollama model name
+            priority (str): Priority class, "chat" or "vision"
+            user_id (int, optional): Requesting user, used for fair queuing
+
+        Returns:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            GatewayBusy: If the queue is full or the wait timed out
+        """
+        rank = PRIORITY_RANKS.get(priority, max(PRIORITY_RANKS.values()))
+        ticket = _Ticket(user_id if user_id is not None else "anonymous", rank)
+
+        with self._condition:
+            state = self._state(model)
+
+            if state.active < state.slots and state.queued == 0:
+                state.active += 1
+                state.counters["admitted"] += 1
+                return 0.0
+
+            if state.queued >= self.max_queue_depth:
+                state.counters["rejected"] += 1
+                gateway_rejected.inc(model=model, reason="queue full")
+                raise GatewayBusy(model, self._retry_after(state))
+
+            state.enqueue(ticket)
+            deadline = ticket.enqueued_at + self.queue_timeout
+
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    state.remove(ticket)
+                    state.counters["timed_out"] += 1
+                    gateway_rejected.inc(model=model, reason="timed out")
+                    raise GatewayBusy(
+                        model, self._retry_after(state), reason="timed out waiting"
+                    )
+                self._condition.wait(remaining)
+
+            waited = time.monotonic() - ticket.enqueued_at
+            state.counters["admitted"] += 1
+            state.counters["wait_seconds_total"] += waited
+            state.counters["wait_seconds_max"] = max(
+                state.counters["wait_seconds_max"], waited
+            )
+            return waited
+
+    def release(self, model, service_time=None, failed=False):
+        """
+        Return a slot and wake the next waiting request.
+
+        Args:
+            model (str): Ollama model name
+            service_time (float, optional): Duration of the call that held the slot
+            failed (bool): Whether the call raised an error
+        """
+        with self._condition:
+            state = self._state(model)
+            state.active = max(0, state.active - 1)
+            state.counters["failed" if failed else "completed"] += 1
+            if service_time is not None and not failed:
+                state.record_service_time(service_time)
+            self._grant_next(state)
+
+    @contextmanager
+    def slot(self, model, priority=PRIORITY_CHAT, user_id=None):
+        """
+        Hold a slot on a model for the duration of a with block.
+
+        Args:
+            model (str): Ollama model name
+            priority (str): Priority class, "chat" or "vision"
+            user_id (int, optional): Requesting user, used for fair queuing
+
+        Yields:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            GatewayBusy: If the request cannot be admitted
+        """
+        waited = self.acquire(model, priority=priority, user_id=user_id)
+        started = time.monotonic()
+        failed = False
+        try:
+            yield waited
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(model, time.monotonic() - started, failed=failed)
+
+    def _check_residency(self, model):
+        """
+        Refuse a call that would load a cold model over a hot one.
+
+        Args:
+            model (str): Ollama model name
+
+        Raises:
+            GatewayBusy: If loading the model now would evict a hot model
+        """
+        if ollama_residency.can_schedule(model):
+            return
+        with self._lock:
+            self._state(model).counters["rejected"] += 1
+        gateway_rejected.inc(model=model, reason="would evict a hot model")
+        raise GatewayBusy(
+            model,
+            getattr(settings, "LLM_GATEWAY", {}).get("EVICTION_RETRY_AFTER", 60),
+            reason="would evict a hot model",
+        )
+
+    def chat(
+        self,
+        model,
+        messages,
+        priority=PRIORITY_CHAT,
+        user_id=None,
+        endpoint=None,
+        **kwargs,
+    ):
+        """
+        Call ollama.chat once a slot on the model is available.
+
+        Every call is recorded in metrics.py with its queue wait, token
+        counts and timings.
+
+        Args:
+            model (str): Ollama model name
+            messages (list): Chat messages
+            priority (str): Priority class, "chat" or "vision"
+            user_id (int, optional): Requesting user, used for fair queuing
+            endpoint (str, optional): Metrics label for the caller, defaults to priority
+            **kwargs: Passed through to ollama.chat
+
+        Returns:
+            The Ollama chat response
+
+        Raises:
+            GatewayBusy: If the call cannot be admitted or would evict a hot model
+        """
+        self._check_residency(model)
+        kwargs.setdefault("keep_alive", ollama_residency.keep_alive())
+        endpoint = endpoint or priority
+        images = metrics.image_stats(messages)
+
+        import ollama
+
+        with self.slot(model, priority=priority, user_id=user_id) as waited:
+            started = time.monotonic()
+            try:
+                response = ollama.chat(model=model, messages=messages, **kwargs)
+            except Exception as e:
+                metrics.record_llm_call(
+                    model, endpoint, waited, time.monotonic() - started, images=images, error=e
+                )
+                raise
+            metrics.record_llm_call(
+                model, endpoint, waited, time.monotonic() - started, response, images
+            )
+            ollama_residency.mark_used(model)
+            return response
+
+    def embed(self, model, texts, priority=PRIORITY_CHAT, user_id=None, **kwargs):
+        """
+        Call ollama.embed once a slot on the model is available.
+
+        Embedding models count against the server's loaded-model limit like
+        chat models, so the same residency check applies.
+
+        Args:
+            model (str): Ollama embedding model name
+            texts (list): Strings to embed
+            priority (str): Priority class, "chat" or "vision"
+            user_id (int, optional): Requesting user, used for fair queuing
+            **kwargs: Passed through to ollama.embed
+
+        Returns:
+            The Ollama embed response
+
+        Raises:
+            GatewayBusy: If the call cannot be admitted or would evict a hot model
+        """
+        self._check_residency(model)
+        kwargs.setdefault("keep_alive", ollama_residency.keep_alive())
+
+        import ollama
+
+        with self.slot(model, priority=priority, user_id=user_id) as waited:
+            started = time.monotonic()
+            try:
+                response = ollama.embed(model=model, input=list(texts), **kwargs)
+            except Exception as e:
+                metrics.record_llm_call(
+                    model, "embed", waited, time.monotonic() - started, error=e
+                )
+                raise
+            metrics.record_llm_call(
+                model, "embed", waited, time.monotonic() - started, response
+            )
+            ollama_residency.mark_used(model)
+            return response
+
+    def snapshot(self):
+        """
+        Current slot usage, queue depth and counters per model.
+
+        Returns:
+            dict: Metrics keyed by model name
+        """
+        with self._lock:
+            return {
+                model: {
+                    "slots": state.slots,
+                    "active": state.active,
+                    "queued": state.queued,
+                    "avg_service_seconds": state.avg_service_time,
+                    **state.counters,
+                }
+                for model, state in self._models.items()
+            }
+
+
+gateway = LLMGateway()
+
+
+def _collect_gateway_metrics():
+    """Publish the gateway's slot and queue state as gauges."""
+    for model, state in gateway.snapshot().items():
+        gateway_active.set(state["active"], model=model)
+        gateway_queued.set(state["queued"], model=model)
+        gateway_slots.set(state["slots"], model=model)
+
+
+metrics.registry.add_collector(_collect_gateway_metrics)
@@ -0,0 +1,47 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : One-off backfill of stored round totals                  ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This command fills in Round.strokes_total and holes_played for rounds saved
+before those columns existed. New rounds keep them current through the hole
+score signals, so it only needs to run once after upgrading; running it
+again only touches rounds still missing totals.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from ...models import Round
+
+
+class Command(BaseCommand):
+    help = "Store strokes_total and holes_played for rounds saved without them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rounds updated per query (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        round_ids = list(
+            Round.objects.filter(
+                Q(strokes_total__isnull=True) | Q(holes_played__isnull=True)
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        batch_size = options["batch_size"]
+        for start in range(0, len(round_ids), batch_size):
+            Round.refresh_totals(round_ids[start : start + batch_size])
+        self.stdout.write(f"Stored totals for {len(round_ids)} rounds")
@@ -0,0 +1,327 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : In-process metrics with Prometheus text exposition       ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module provides a small metrics registry (counters, gauges and
+histograms with labels) rendered in the Prometheus text format by
+MetricsView. Each worker process keeps its own registry, so Prometheus
+should scrape every worker. It also records every LLM call: queue wait,
+time to first token, tokens per second, prompt and eval token counts, and
+image count and bytes, per model and endpoint, with a matching structured
+log line.
+"""
+
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+llm_logger = logging.getLogger("api.llm")
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKENS_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150)
+
+
+def _format_labels(names, values):
+    """Render a label set as {a="1",b="2"}."""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    """Render a sample value the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class _Metric:
+    """Base class for a named metric with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        """Turn a labels dict into a tuple in label-name order."""
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        """Render HELP, TYPE and samples as Prometheus text lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, set at collection time."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observations across cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def _samples(self):
+        lines = []
+        for key, state in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(
+                    self.label_names + ("le",), key + (_format_value(float(bound)),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics plus callbacks that refresh gauges on scrape."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=SECONDS_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector):
+        """
+        Register a callable run before every render, used to set gauges.
+
+        Args:
+            collector: Callable taking no arguments
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning("Metrics collector %r failed: %s", collector, str(e))
+
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+LLM_LABELS = ("model", "endpoint")
+
+llm_requests = registry.counter(
+    "llm_requests_total", "LLM calls by outcome.", LLM_LABELS + ("outcome",)
+)
+llm_queue_wait = registry.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a gateway slot.", LLM_LABELS
+)
+llm_ttft = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Queue wait plus model load and prompt evaluation before the first token.",
+    LLM_LABELS,
+)
+llm_duration = registry.histogram(
+    "llm_request_duration_seconds", "Wall-clock time of the call to Ollama.", LLM_LABELS
+)
+llm_load = registry.histogram(
+    "llm_load_duration_seconds", "Time Ollama spent loading the model.", LLM_LABELS
+)
+llm_tokens_per_second = registry.histogram(
+    "llm_eval_tokens_per_second",
+    "Generation speed of the response.",
+    LLM_LABELS,
+    buckets=RATE_BUCKETS,
+)
+llm_prompt_tokens = registry.histogram(
+    "llm_prompt_tokens", "Prompt tokens evaluated per call.", LLM_LABELS, TOKENS_BUCKETS
+)
+llm_eval_tokens = registry.histogram(
+    "llm_eval_tokens", "Tokens generated per call.", LLM_LABELS, TOKENS_BUCKETS
+)
+llm_images = registry.counter(
+    "llm_images_total", "Images sent to vision models.", LLM_LABELS
+)
+llm_image_bytes = registry.counter(
+    "llm_image_bytes_total", "Decoded bytes of images sent to vision models.", LLM_LABELS
+)
+
+
+def _seconds(nanoseconds):
+    """Convert an Ollama duration in nanoseconds to seconds."""
+    return (nanoseconds or 0) / 1e9
+
+
+def image_stats(messages):
+    """
+    Count images and their decoded size in a list of chat messages.
+
+    Args:
+        messages (list): Ollama chat messages, images as base64 strings
+
+    Returns:
+        tuple: (image count, total decoded bytes)
+    """
+    count = 0
+    size = 0
+    for message in messages:
+        for image in message.get("images") or []:
+            count += 1
+            if isinstance(image, (bytes, bytearray)):
+                size += len(image)
+            else:
+                size += len(image) * 3 // 4
+    return count, size
+
+
+def record_llm_call(
+    model, endpoint, queue_wait, duration, response=None, images=(0, 0), error=None
+):
+    """
+    Record metrics and a structured log line for one LLM call.
+
+    Args:
+        model (str): Ollama model name
+        endpoint (str): Caller, e.g. "chat", "vision" or "router"
+        queue_wait (float): Seconds spent waiting for a gateway slot
+        duration (float): Seconds spent in the Ollama call
+        response (optional): Ollama response carrying eval counts and durations
+        images (tuple): (image count, bytes) from image_stats()
+        error (Exception, optional): Error raised by the call
+    """
+    labels = {"model": model, "endpoint": endpoint}
+    record = {
+        "event": "llm_call",
+        "model": model,
+        "endpoint": endpoint,
+        "outcome": "error" if error else "ok",
+        "queue_wait_seconds": round(queue_wait, 4),
+        "duration_seconds": round(duration, 4),
+        "images": images[0],
+        "image_bytes": images[1],
+    }
+
+    llm_requests.inc(outcome=record["outcome"], **labels)
+    llm_queue_wait.observe(queue_wait, **labels)
+    llm_duration.observe(duration, **labels)
+    if images[0]:
+        llm_images.inc(images[0], **labels)
+        llm_image_bytes.inc(images[1], **labels)
+
+    if response is not None and not error:
+        prompt_tokens = response.get("prompt_eval_count") or 0
+        eval_tokens = response.get("eval_count") or 0
+        load = _seconds(response.get("load_duration"))
+        prompt_eval = _seconds(response.get("prompt_eval_duration"))
+        eval_seconds = _seconds(response.get("eval_duration"))
+        ttft = queue_wait + load + prompt_eval
+
+        llm_ttft.observe(ttft, **labels)
+        llm_load.observe(load, **labels)
+        llm_prompt_tokens.observe(prompt_tokens, **labels)
+        llm_eval_tokens.observe(eval_tokens, **labels)
+        if eval_seconds:
+            tokens_per_second = eval_tokens / eval_seconds
+            llm_tokens_per_second.observe(tokens_per_second, **labels)
+            record["tokens_per_second"] = round(tokens_per_second, 2)
+
+        record.update(
+            {
+                "ttft_seconds": round(ttft, 4),
+                "load_seconds": round(load, 4),
+                "prompt_tokens": prompt_tokens,
+                "eval_tokens": eval_tokens,
+            }
+        )
+    elif error:
+        record["error"] = str(error)
+
+    llm_logger.info(json.dumps(record), extra=record)
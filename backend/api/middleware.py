@@ -11,40 +11,36 @@
 
 
 This module implements Django middleware for tracking user online status.
-It updates user login timestamps and online status flags based on request activity,
-allowing the application to determine which users are currently active.
+Each authenticated request records a presence heartbeat in Redis (see
+presence.py); the users table is only written on the request path when
+Redis is not available, at most once per user per heartbeat interval.
 """
 
-from datetime import timedelta
-from django.utils import timezone
-from django.conf import settings
+from .presence import record_heartbeat
 
 
 class UserOnlineStatusMiddleware:
     """
-    Middleware to track and update user online status.
+    Middleware to track user online status.
 
-    This middleware updates a user's last_login timestamp and online status
-    when authenticated users make requests. It uses a configurable timeout
-    period to determine when a user should be considered online.
+    Records a heartbeat for the authenticated user after the view runs, so
+    users authenticated by DRF (JWT) are seen as well as session users.
+    Heartbeats are throttled in presence.py, and a Celery task copies them
+    to the database in batches.
     """
 
     def __init__(self, get_response):
         """
-        Initialize the middleware with response handler and timeout settings.
+        Initialize the middleware with the response handler.
 
         Args:
             get_response: The Django response handler function
         """
         self.get_response = get_response
-        self.online_timeout = getattr(settings, "USER_ONLINE_TIMEOUT", 15 * 60)
 
     def __call__(self, request):
         """
-        Process each request and update user status.
-
-        For authenticated users, updates their last_login timestamp and
-        online status if their last activity was more than 5 minutes ago.
+        Process each request and record a presence heartbeat.
 
         Args:
             request: The Django request object
@@ -52,23 +48,10 @@ class UserOnlineStatusMiddleware:
         Returns:
             The response from the view
         """
-        if request.user.is_authenticated:
-            current_time = timezone.now()
-
-            update_threshold = current_time - timedelta(minutes=5)
-
-            if (
-                not request.user.last_login
-                or request.user.last_login < update_threshold
-            ):
-                request.user.last_login = current_time
-                request.user.is_online = True
-                request.user.save(update_fields=["last_login", "is_online"])
+        response = self.get_response(request)
 
-            print(
-                f"User {request.user.username} last login updated to {request.user.last_login}, "
-                f"{'Online' if request.user.is_online else 'Offline'}"
-            )
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            record_heartbeat(user.id)
 
-        response = self.get_response(request)
         return response
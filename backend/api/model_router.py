@@ -0,0 +1,230 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Route chat messages to canned replies or the right model ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module classifies incoming chat messages into the interaction types
+the GolfPro system prompt already uses (casual, technical, story) with
+keyword and regex rules. Greetings and thanks get a canned reply, other
+casual turns and stories go to a small model, and only technical golf
+questions reach the large model. Messages the rules cannot place can
+optionally be classified by a tiny model; otherwise they go to the large
+model so quality never drops.
+"""
+
+import logging
+import re
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CASUAL = "casual"
+TECHNICAL = "technical"
+STORY = "story"
+
+Route = namedtuple("Route", ["interaction", "model", "canned_reply"])
+
+CANNED_REPLIES = {
+    "greeting": "Hey there! 🏌️‍♂️ Ready to talk golf? Ask me anything about your swing, your game or the course.",
+    "thanks": "Anytime! Go hit 'em straight ⛳",
+    "farewell": "See you on the course! Keep it in the short grass ⛳",
+}
+
+CANNED_PATTERNS = [
+    (
+        "greeting",
+        re.compile(
+            r"^(hi|hello|hey|hiya|howdy|yo|sup|good (morning|afternoon|evening))( there)?( golfpro)?$"
+        ),
+    ),
+    (
+        "thanks",
+        re.compile(r"^(thanks|thank you|thx|ty|cheers|appreciate it)( so much| a lot)?( golfpro)?$"),
+    ),
+    ("farewell", re.compile(r"^(bye|goodbye|see ya|see you|later|cya)( later)?$")),
+]
+
+TECHNICAL_PATTERN = re.compile(
+    r"\b("
+    r"swing|slice|hook|shank|fade|draw|grip|stance|posture|alignment|tempo|"
+    r"backswing|downswing|follow.?through|impact|release|takeaway|"
+    r"driver|wood|hybrid|iron|wedge|putter|club|shaft|loft|lie angle|"
+    r"putt|putting|chip|chipping|pitch|bunker|sand|rough|fairway|green|"
+    r"drill|practice|handicap|yardage|distance|spin|ball flight|"
+    r"rule|penalty|drop|course management|strategy|tee shot|"
+    r"fix|improve|stop|cure|consistent|consistency"
+    r")s?\b"
+)
+
+QUESTION_PATTERN = re.compile(
+    r"\?|^(how|why|what|which|when|should|can|could|would|do|does|is|are)\b"
+)
+
+CASUAL_PATTERN = re.compile(
+    r"\b(how are you|how's it going|what's up|whats up|your day|who are you|"
+    r"nice to meet|good to see|lol|haha|cool|awesome|great|ok|okay)\b"
+)
+
+STORY_PATTERN = re.compile(
+    r"\b(i (shot|played|made|hit|had|got|sank|holed|birdied|parred|bogeyed)|"
+    r"today|yesterday|last (week|weekend|round|time)|"
+    r"birdie|eagle|albatross|hole.in.one|ace|my round)\b"
+)
+
+CASUAL_MAX_WORDS = 8
+
+
+def _setting(name, default):
+    """Read a setting, falling back when Django is not configured."""
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def normalize(message):
+    """
+    Lowercase a message and strip surrounding punctuation and whitespace.
+
+    Args:
+        message (str): The user's message
+
+    Returns:
+        str: Normalized message
+    """
+    return " ".join(message.lower().split()).strip(" .!?,~")
+
+
+def canned_reply(message):
+    """
+    Return a canned reply for pure greetings, thanks and farewells.
+
+    Args:
+        message (str): The user's message
+
+    Returns:
+        str or None: The canned reply, if the message is a stock phrase
+    """
+    text = normalize(message)
+    for kind, pattern in CANNED_PATTERNS:
+        if pattern.match(text):
+            return CANNED_REPLIES[kind]
+    return None
+
+
+def classify(message):
+    """
+    Classify a message with keyword and regex rules.
+
+    Args:
+        message (str): The user's message
+
+    Returns:
+        str or None: CASUAL, TECHNICAL or STORY, or None if the rules cannot tell
+    """
+    text = normalize(message)
+    words = len(text.split())
+    technical = TECHNICAL_PATTERN.search(text)
+    question = QUESTION_PATTERN.search(message.lower().strip()) is not None
+    story = STORY_PATTERN.search(text)
+
+    if technical:
+        if story and not question:
+            return STORY
+        return TECHNICAL
+    if CASUAL_PATTERN.search(text) and words <= CASUAL_MAX_WORDS:
+        return CASUAL
+    if story:
+        return STORY
+    if words <= 3 and not question:
+        return CASUAL
+    return None
+
+
+def classify_with_model(message, user_id=None):
+    """
+    Ask the tiny classifier model for a message's interaction type.
+
+    Args:
+        message (str): The user's message
+        user_id (int, optional): Requesting user, for the LLM gateway
+
+    Returns:
+        str or None: CASUAL, TECHNICAL or STORY, or None if unavailable
+    """
+    model = _setting("CHAT_ROUTER_CLASSIFIER_MODEL", "")
+    if not model:
+        return None
+
+    from .llm_gateway import gateway, PRIORITY_CHAT
+
+    try:
+        res = gateway.chat(
+            model=model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Classify the golf chatbot message as exactly one word: "
+                    "casual, technical or story.",
+                },
+                {"role": "user", "content": message},
+            ],
+            priority=PRIORITY_CHAT,
+            user_id=user_id,
+            endpoint="router",
+            options={"temperature": 0, "num_predict": 3},
+        )
+    except Exception as e:
+        logger.warning("Router classifier model failed: %s", str(e))
+        return None
+
+    answer = res["message"]["content"].strip().lower()
+    for interaction in (TECHNICAL, STORY, CASUAL):
+        if interaction in answer:
+            return interaction
+    return None
+
+
+def route_message(message, large_model, user_id=None):
+    """
+    Decide how a chat message should be answered.
+
+    Args:
+        message (str): The user's message
+        large_model (str): Model used for technical questions
+        user_id (int, optional): Requesting user, for the LLM gateway
+
+    Returns:
+        Route: Interaction type, model to call (None for canned replies)
+            and canned reply text (None when a model must answer)
+    """
+    reply = canned_reply(message)
+    if reply is not None:
+        return Route(CASUAL, None, reply)
+
+    interaction = classify(message) or classify_with_model(message, user_id)
+    if interaction is None:
+        interaction = TECHNICAL
+
+    if interaction == TECHNICAL:
+        model = large_model
+    else:
+        model = _setting("CHAT_SMALL_MODEL", "gemma3:1b")
+
+        from .ollama_residency import can_schedule
+
+        if not can_schedule(model):
+            # Loading the small model would evict a hot one; the large model
+            # is already warm, so answering there is faster overall.
+            model = large_model
+
+    logger.debug("Routed %s message to %s", interaction, model)
+    return Route(interaction, model, None)
@@ -16,12 +16,53 @@ with relationships that reflect the structure of golf course data and scoring.
 """
 
 from django.db import models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, Lower
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
+from django.contrib.auth.hashers import check_password
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 from django.utils.timezone import now
 
 
+class UserQuerySet(models.QuerySet):
+    """QuerySet for users with an indexed prefix search."""
+
+    SEARCH_FIELDS = ("username", "first_name", "last_name")
+
+    def search(self, prefix):
+        """
+        Filter users whose username, first or last name starts with prefix,
+        ignoring case.
+
+        Each name is matched as a range on its lower() value, which the
+        user_*_lower indexes answer; the startswith check keeps the match
+        exact under collations that order characters non-bytewise.
+
+        Args:
+            prefix (str): Start of a username or name
+
+        Returns:
+            QuerySet: Matching users
+        """
+        start = prefix.lower()
+        end = start[:-1] + chr(ord(start[-1]) + 1)
+        condition = models.Q()
+        for field in self.SEARCH_FIELDS:
+            key = f"{field}_key"
+            condition |= models.Q(
+                **{f"{key}__gte": start, f"{key}__lt": end, f"{key}__startswith": start}
+            )
+        return self.alias(
+            **{f"{field}_key": Lower(field) for field in self.SEARCH_FIELDS}
+        ).filter(condition)
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    """Default user manager with UserQuerySet methods."""
+
+
 class User(AbstractUser):
     """
     Extended user model with additional fields for golf app functionality.
@@ -41,13 +82,35 @@ class User(AbstractUser):
     updated_at = models.DateTimeField(auto_now=True)
     last_login = models.DateTimeField(null=True, blank=True)
     is_online = models.BooleanField(default=False)
+    # Bumped when credentials or permissions change; older JWTs are rejected
+    auth_version = models.PositiveIntegerField(default=0)
+
+    AUTH_FIELDS = ("password", "is_active", "is_staff", "is_superuser")
+
+    objects = UserManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded credential and permission fields.
+
+        Lets save() detect changes that must revoke issued tokens without
+        another query.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth = instance._auth_state()
+        return instance
+
+    def _auth_state(self):
+        return tuple(self.__dict__.get(field) for field in self.AUTH_FIELDS)
 
     def save(self, *args, **kwargs):
         """
         Override save method to add custom behavior.
 
-        Normalizes username to lowercase and updates online status
-        based on login activity time thresholds.
+        Normalizes username to lowercase, updates online status based on
+        login activity time thresholds, and bumps auth_version when the
+        password or permission flags changed.
 
         Args:
             *args: Variable length argument list
@@ -62,11 +125,25 @@ class User(AbstractUser):
             else:
                 self.is_online = True
 
+        loaded = getattr(self, "_loaded_auth", None)
+        if loaded is not None and loaded != self._auth_state():
+            self.auth_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = set(update_fields) | {"auth_version"}
+
         super().save(*args, **kwargs)
+        self._loaded_auth = self._auth_state()
 
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        indexes = [
+            # Prefix search in UserQuerySet.search()
+            models.Index(Lower("username"), name="user_username_lower"),
+            models.Index(Lower("first_name"), name="user_first_name_lower"),
+            models.Index(Lower("last_name"), name="user_last_name_lower"),
+        ]
 
     def __str__(self):
         """
@@ -118,6 +195,27 @@ class Course(models.Model):
         return self.course_name
 
 
+class TeeQuerySet(models.QuerySet):
+    """QuerySet for tees with a case-insensitive name lookup."""
+
+    def named(self, tee_name):
+        """
+        Filter tees by name, ignoring case.
+
+        Compares lower(tee_name) so the unique_tee_name index is used,
+        which a tee_name__iexact lookup cannot do.
+
+        Args:
+            tee_name (str): Tee name in any case
+
+        Returns:
+            QuerySet: Matching tees
+        """
+        return self.alias(name_key=Lower("tee_name")).filter(
+            name_key=Lower(models.Value(tee_name))
+        )
+
+
 class Tee(models.Model):
     """
     Tee box model with difficulty ratings and course measurements.
@@ -150,6 +248,18 @@ class Tee(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TeeQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                models.F("course"),
+                Lower("tee_name"),
+                models.F("gender"),
+                name="unique_tee_name",
+            )
+        ]
+
     def __str__(self):
         """
         String representation of tee with course name, tee name, and gender.
@@ -180,6 +290,11 @@ class Hole(models.Model):
 
     class Meta:
         ordering = ["hole_number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tee", "hole_number"], name="unique_hole_number"
+            )
+        ]
 
     def __str__(self):
         """
@@ -213,6 +328,31 @@ class HoleScore(models.Model):
 
     class Meta:
         ordering = ["hole__hole_number"]
+        constraints = [
+            models.UniqueConstraint(fields=["round", "hole"], name="unique_hole_score")
+        ]
+        indexes = [models.Index(fields=["updated_at"], name="hole_score_updated_at")]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded round and strokes.
+
+        Lets the totals signal adjust the round's stored totals by the
+        difference instead of recomputing them.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.counted_score()
+        return instance
+
+    def counted_score(self):
+        """
+        The round and strokes this score contributes to stored round totals.
+
+        Returns:
+            tuple: (round_id, strokes); either is None when not loaded
+        """
+        return (self.__dict__.get("round_id"), self.__dict__.get("strokes"))
 
     def __str__(self):
         """
@@ -238,9 +378,109 @@ class Round(models.Model):
     notes = models.TextField(blank=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     is_complete = models.BooleanField(default=False)
+    # Stored totals for round lists, kept current by the hole score signals;
+    # None only on rows from before they were stored (backfill_round_totals)
+    strokes_total = models.IntegerField(null=True, blank=True, default=0)
+    holes_played = models.IntegerField(null=True, blank=True, default=0)
+    # Packed hole scores replacing the HoleScore rows (see score_packing.py)
+    packed_scores = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["player", "-date_played", "-id"], name="round_player_history"
+            ),
+            models.Index(fields=["updated_at"], name="round_updated_at"),
+        ]
+
+    @classmethod
+    def refresh_totals(cls, round_ids):
+        """
+        Recompute stored strokes_total and holes_played from hole scores.
+
+        Packed rounds keep the totals stored when they were packed.
+
+        Args:
+            round_ids (iterable): IDs of the rounds to refresh
+        """
+        scores = HoleScore.objects.filter(round=models.OuterRef("pk")).order_by()
+        cls.objects.filter(
+            pk__in=list(round_ids), packed_scores__isnull=True
+        ).update(
+            strokes_total=Coalesce(
+                models.Subquery(
+                    scores.values("round").annotate(total=Sum("strokes")).values("total")
+                ),
+                0,
+            ),
+            holes_played=Coalesce(
+                models.Subquery(
+                    scores.values("round").annotate(count=Count("id")).values("count")
+                ),
+                0,
+            ),
+        )
+
+    @classmethod
+    def add_to_totals(cls, round_id, strokes, holes):
+        """
+        Adjust a round's stored totals in place.
+
+        Totals still unset stay unset and are computed when next needed.
+
+        Args:
+            round_id (int): ID of the round
+            strokes (int): Change in strokes_total
+            holes (int): Change in holes_played
+        """
+        cls.objects.filter(pk=round_id).update(
+            strokes_total=models.F("strokes_total") + strokes,
+            holes_played=models.F("holes_played") + holes,
+        )
+
+    @classmethod
+    def computed_totals(cls, round_ids):
+        """
+        Totals of rounds without stored ones, computed without writing them.
+
+        Rounds saved before totals were stored read them from here until
+        the backfill_round_totals command has filled them in.
+
+        Args:
+            round_ids (iterable): IDs of rounds whose totals are missing
+
+        Returns:
+            dict: Round ID -> (strokes_total, holes_played)
+        """
+        totals = {pk: (0, 0) for pk in round_ids}
+        rows = (
+            HoleScore.objects.filter(round_id__in=list(totals))
+            .order_by()
+            .values("round_id")
+            .annotate(strokes=Sum("strokes"), holes=Count("id"))
+            .values_list("round_id", "strokes", "holes")
+        )
+        for pk, strokes, holes in rows:
+            totals[pk] = (strokes or 0, holes)
+        return totals
+
+    def scores(self):
+        """
+        The round's hole scores, decoded when the round is packed.
+
+        Returns:
+            list: HoleScore instances in hole order; unsaved for a packed round
+        """
+        if self.packed_scores is None:
+            return list(self.hole_scores.all())
+        if "_unpacked_scores" not in self.__dict__:
+            from .score_packing import unpack_round_scores
+
+            self._unpacked_scores = unpack_round_scores(self)
+        return self._unpacked_scores
+
     @property
     def total_score(self):
         """
@@ -249,7 +489,7 @@ class Round(models.Model):
         Returns:
             int: Sum of strokes across all holes
         """
-        return sum(score.strokes for score in self.hole_scores.all())
+        return sum(score.strokes for score in self.scores())
 
     @property
     def front_nine_score(self):
@@ -261,7 +501,7 @@ class Round(models.Model):
         """
         return sum(
             score.strokes
-            for score in self.hole_scores.all()
+            for score in self.scores()
             if score.hole.hole_number <= 9
         )
 
@@ -275,7 +515,7 @@ class Round(models.Model):
         """
         return sum(
             score.strokes
-            for score in self.hole_scores.all()
+            for score in self.scores()
             if score.hole.hole_number > 9
         )
 
@@ -287,13 +527,13 @@ class Round(models.Model):
         Returns:
             float: Percentage of greens in regulation (0-100)
         """
-        hole_scores = self.hole_scores.all()
+        hole_scores = self.scores()
         if not hole_scores:
             return 0.0
         return round(
             (
-                sum(score.green_in_regulation for score in self.hole_scores.all())
-                / len(self.hole_scores.all())
+                sum(score.green_in_regulation for score in self.scores())
+                / len(self.scores())
                 * 100
             ),
             2,
@@ -307,7 +547,7 @@ class Round(models.Model):
         Returns:
             float: Percentage of fairways hit (0-100)
         """
-        hole_scores = self.hole_scores.all()
+        hole_scores = self.scores()
         if not hole_scores:
             return 0.0
         return round(
@@ -323,7 +563,7 @@ class Round(models.Model):
         Returns:
             int: Sum of putts across all holes
         """
-        return sum(score.putts for score in self.hole_scores.all())
+        return sum(score.putts for score in self.scores())
 
     @property
     def putt_per_hole(self):
@@ -333,10 +573,10 @@ class Round(models.Model):
         Returns:
             float: Average number of putts per hole
         """
-        hole_scores = self.hole_scores.all()
+        hole_scores = self.scores()
         if not hole_scores:
             return 0.0
-        return round(self.putt_total / len(self.hole_scores.all()), 2)
+        return round(self.putt_total / len(self.scores()), 2)
 
     @property
     def penalties_total(self):
@@ -346,7 +586,7 @@ class Round(models.Model):
         Returns:
             int: Sum of penalties across all holes
         """
-        return sum(score.penalties for score in self.hole_scores.all())
+        return sum(score.penalties for score in self.scores())
 
     @property
     def penalties_per_hole(self):
@@ -356,10 +596,10 @@ class Round(models.Model):
         Returns:
             float: Average number of penalties per hole
         """
-        hole_scores = self.hole_scores.all()
+        hole_scores = self.scores()
         if not hole_scores:
             return 0.0
-        return round(self.penalties_total / len(self.hole_scores.all()), 2)
+        return round(self.penalties_total / len(self.scores()), 2)
 
     def __str__(self):
         """
@@ -371,3 +611,213 @@ class Round(models.Model):
         return (
             f"{self.player.username} - {self.course.course_name} ({self.date_played})"
         )
+
+
+class DailyStats(models.Model):
+    """
+    Abstract base for daily rollups of hole scores.
+
+    Each row sums the hole scores played on one day for one subject (a
+    player, a course or a hole). Rows are maintained by rollups.py from a
+    watermark on updated_at, so dashboards never scan raw hole scores.
+    """
+
+    day = models.DateField()
+    rounds = models.IntegerField(default=0)
+    holes = models.IntegerField(default=0)
+    strokes = models.IntegerField(default=0)
+    par = models.IntegerField(default=0)
+    putts = models.IntegerField(default=0)
+    penalties = models.IntegerField(default=0)
+    fairways = models.IntegerField(default=0)
+    greens = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class PlayerDailyStats(DailyStats):
+    """Daily totals of one player's hole scores."""
+
+    player = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["player", "day"], name="unique_player_daily_stats"
+            )
+        ]
+
+
+class CourseDailyStats(DailyStats):
+    """Daily totals of all hole scores played on one course."""
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "day"], name="unique_course_daily_stats"
+            )
+        ]
+
+
+class HoleDailyStats(DailyStats):
+    """
+    Daily totals of all scores on one hole; rounds equals holes here.
+
+    Also counts blow-ups, so HoleStats can be summed from these rows.
+    """
+
+    hole = models.ForeignKey(Hole, on_delete=models.CASCADE)
+    blow_ups = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hole", "day"], name="unique_hole_daily_stats"
+            )
+        ]
+
+
+class HoleStats(models.Model):
+    """
+    All-time totals of every hole score on one hole.
+
+    Summed by rollups.py from the daily hole rollups, so hole
+    difficulty (scoring average, greens, putts, blow-ups) is read without
+    scanning hole scores. A blow-up is a score of double bogey or worse.
+    """
+
+    hole = models.OneToOneField(Hole, on_delete=models.CASCADE, related_name="stats")
+    scores = models.IntegerField(default=0)
+    strokes = models.IntegerField(default=0)
+    putts = models.IntegerField(default=0)
+    penalties = models.IntegerField(default=0)
+    fairways = models.IntegerField(default=0)
+    greens = models.IntegerField(default=0)
+    blow_ups = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        String representation of the hole totals.
+
+        Returns:
+            str: Hole ID and number of scores
+        """
+        return f"Hole {self.hole_id}: {self.scores} scores"
+
+
+class RollupBacklog(models.Model):
+    """
+    Rollup keys whose old data changed in a way updated_at cannot show.
+
+    Deleting a round or hole score, or moving a round to another day or
+    course, leaves nothing behind with a newer updated_at for the old day.
+    Signals record the old keys here and the next rollup run recomputes
+    them. Plain integers are used so rows outlive the deleted objects.
+    """
+
+    player_id = models.IntegerField()
+    course_id = models.IntegerField()
+    hole_id = models.IntegerField()
+    day = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class RollupWatermark(models.Model):
+    """
+    Progress marker for an incremental job.
+
+    value is the updated_at up to which source rows have been processed.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        String representation of the watermark.
+
+        Returns:
+            str: Job name and position
+        """
+        return f"{self.name} @ {self.value}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response to a write sent with an Idempotency-Key header.
+
+    A retry with the same key gets this response back instead of writing
+    again. The row is inserted in the same transaction as the write, so a
+    concurrent retry waits on the unique constraint until the first
+    request commits or rolls back (see idempotency.py).
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key")
+        ]
+        indexes = [models.Index(fields=["created_at"], name="idempotency_key_created_at")]
+
+    def __str__(self):
+        """
+        String representation of the key.
+
+        Returns:
+            str: User ID and key
+        """
+        return f"{self.user_id}:{self.key}"
+
+
+class Tournament(models.Model):
+    """
+    Club event on one course and tee over a date window.
+
+    Every round a player plays on the event's course and tee within the
+    window is eligible; a player's best round counts. Live standings are
+    kept in Redis sorted sets (see tournaments.py).
+    """
+
+    name = models.CharField(max_length=100)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    tee = models.ForeignKey(Tee, on_delete=models.CASCADE)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(ends_at__gt=models.F("starts_at")),
+                name="tournament_window_order",
+            )
+        ]
+        indexes = [
+            # Finding the events a round counts for
+            models.Index(
+                fields=["course", "tee", "starts_at", "ends_at"],
+                name="tournament_scope",
+            )
+        ]
+
+    def __str__(self):
+        """
+        String representation of the tournament.
+
+        Returns:
+            str: Event name and course
+        """
+        return f"{self.name} ({self.course.course_name})"
@@ -1,12 +1,10 @@
-import ollama
-import os
-
-ollama_host = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
-ollama.host = ollama_host
+from .llm_gateway import gateway, PRIORITY_CHAT
+from .model_router import route_message, CASUAL
+from .response_cache import response_cache, context_hash, is_deterministic
 
 
 class ChatBot:
-    def __init__(self):
+    def __init__(self, user_id=None):
         self.system_prompt = """
 You are GolfPro, an expert golf instructor with a friendly personality. Respond based on the type of message received:
 
@@ -50,23 +48,67 @@ For "How do I fix my slice?": "A **slice** happens when your clubface is open at
 **Pro Tip**: Place a headcover a few inches outside your ball during practice, forcing you to swing inside-to-out to avoid hitting it."
                                 """
         self.messages = [{"role": "system", "content": self.system_prompt}]
+        self.user_id = user_id
+        self.model = "mistral"
+        self.options = {
+            "temperature": 0,
+        }
 
-    def answer_question(self, content, last_rounds):
+    def answer_question(self, content, last_rounds=""):
         if content.lower() == "reset":
             return self.handle_reset()
         else:
+            last_rounds = last_rounds or ""
+
+            # Greetings get a canned reply and small talk goes to the small
+            # model without the golfer profile; only technical questions and
+            # stories about rounds need the large model or the round context.
+            route = route_message(content, self.model, user_id=self.user_id)
+            if route.canned_reply is not None:
+                self.messages.append({"role": "user", "content": content})
+                self.messages.append(
+                    {"role": "assistant", "content": route.canned_reply}
+                )
+                return route.canned_reply
+            if route.interaction == CASUAL:
+                last_rounds = ""
+            model = route.model
+
+            # Answers are deterministic at temperature 0, so identical prompts in
+            # an identical conversation can be served from the response cache.
+            cache_key = None
+            if is_deterministic(self.options):
+                cache_key = response_cache.make_key(
+                    content,
+                    model,
+                    self.options,
+                    context_hash(self.messages, last_rounds),
+                )
+                cached = response_cache.get(cache_key)
+                if cached is not None:
+                    self.messages.append(
+                        {"role": "user", "content": content + last_rounds}
+                    )
+                    self.messages.append({"role": "assistant", "content": cached})
+                    return cached
+
             content = content + last_rounds
             self.messages.append({"role": "user", "content": content})
-            res = ollama.chat(
-                model="mistral",
+            res = gateway.chat(
+                model=model,
                 messages=self.messages,
+                priority=PRIORITY_CHAT,
+                user_id=self.user_id,
+                endpoint="chat",
                 stream=False,
-                options={
-                    "temperature": 0,
-                },
+                options=self.options,
             )  # call to Ollama
-            self.messages.append(res["message"])
-            return res["message"]["content"]
+            answer = res["message"]["content"]
+            self.messages.append({"role": "assistant", "content": answer})
+
+            if cache_key:
+                response_cache.set(cache_key, answer)
+            return answer
 
     def handle_conversation(self, user_input=None, last_rounds=None):
         if user_input:
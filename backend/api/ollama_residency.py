@@ -0,0 +1,290 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Ollama model warm-up, keep-alive and residency tracking  ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module keeps the models the app uses loaded on the Ollama server.
+Models are preloaded at worker start and periodically by a Celery beat task,
+and every call passes keep_alive so they stay resident between requests.
+The server only holds a limited number of models, so loading a cold model
+can evict one that is serving traffic. During peak hours the manager
+refuses to load a model that would push out a recently used ("hot") one.
+"""
+
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LAST_USED_KEY = "ollama:last-used:{model}"
+RESIDENT_KEY = "ollama:resident"
+UNREACHABLE_KEY = "ollama:unreachable"
+
+
+def _setting(name, default):
+    """Read a setting, falling back when Django is not configured."""
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def _base_name(model):
+    """Normalize a model name so "mistral" matches "mistral:latest"."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def keep_alive():
+    """
+    How long Ollama should keep a model loaded after each call.
+
+    Returns:
+        str: Ollama keep_alive duration (e.g. "30m", or "-1" for forever)
+    """
+    return _setting("OLLAMA_KEEP_ALIVE", "30m")
+
+
+def max_loaded_models():
+    """
+    How many models the Ollama server holds at once.
+
+    Returns:
+        int: The server's OLLAMA_MAX_LOADED_MODELS
+    """
+    return _setting("OLLAMA_MAX_LOADED_MODELS", 3)
+
+
+def configured_models():
+    """
+    Models the app serves and wants resident.
+
+    Returns:
+        list: Ollama model names
+    """
+    return _setting("OLLAMA_RESIDENT_MODELS", ["mistral", "gemma3"])
+
+
+def is_peak_hours(at=None):
+    """
+    Check whether a time falls within the configured peak hours.
+
+    Args:
+        at (datetime, optional): Time to check, defaults to now
+
+    Returns:
+        bool: True during peak hours
+    """
+    start, end = _setting("OLLAMA_PEAK_HOURS", (7, 21))
+    hour = timezone.localtime(at or timezone.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def mark_used(model):
+    """
+    Record that a model just served a request.
+
+    Args:
+        model (str): Ollama model name
+    """
+    try:
+        cache.set(LAST_USED_KEY.format(model=_base_name(model)), time.time(), None)
+    except Exception as e:
+        logger.debug("Unable to record use of %s: %s", model, str(e))
+
+
+def is_hot(model):
+    """
+    Check whether a model served a request within the hot window.
+
+    Args:
+        model (str): Ollama model name
+
+    Returns:
+        bool: True if the model was used recently
+    """
+    last_used = cache.get(LAST_USED_KEY.format(model=_base_name(model)))
+    window = _setting("OLLAMA_HOT_WINDOW", 10 * 60)
+    return last_used is not None and time.time() - last_used < window
+
+
+def resident_models(refresh=False):
+    """
+    Models currently loaded on the Ollama server.
+
+    The answer is cached briefly so request paths do not call the server
+    every time. A failed read is cached too, for a shorter time, so an
+    unreachable server is not asked again on every request.
+
+    Args:
+        refresh (bool): Bypass the short-lived cache
+
+    Returns:
+        list: Dicts with name, size, size_vram and expires_at, or None if
+            the server could not be reached
+    """
+    if not refresh:
+        cached = cache.get_many([RESIDENT_KEY, UNREACHABLE_KEY])
+        if RESIDENT_KEY in cached:
+            return cached[RESIDENT_KEY]
+        if UNREACHABLE_KEY in cached:
+            return None
+
+    import ollama
+
+    try:
+        response = ollama.ps()
+    except Exception as e:
+        logger.warning("Unable to read Ollama residency: %s", str(e))
+        cache.set(
+            UNREACHABLE_KEY, True, _setting("OLLAMA_UNREACHABLE_CACHE_SECONDS", 5)
+        )
+        return None
+
+    models = [
+        {
+            "name": model.model,
+            "size": int(model.size or 0),
+            "size_vram": int(model.size_vram or 0),
+            "expires_at": model.expires_at.isoformat() if model.expires_at else None,
+        }
+        for model in response.models
+    ]
+    cache.set(RESIDENT_KEY, models, _setting("OLLAMA_RESIDENCY_CACHE_SECONDS", 10))
+    cache.delete(UNREACHABLE_KEY)
+    return models
+
+
+def can_schedule(model):
+    """
+    Decide whether a call to a model may run now.
+
+    A model that is already loaded can always run. Loading a cold model is
+    refused during peak hours when the server is full and a hot model would
+    have to be evicted to make room.
+
+    Args:
+        model (str): Ollama model name
+
+    Returns:
+        bool: True if the call may run
+    """
+    resident = resident_models()
+    if resident is None:
+        # Server state unknown; let the call through rather than fail closed
+        return True
+
+    names = {_base_name(m["name"]) for m in resident}
+    if _base_name(model) in names:
+        return True
+
+    if len(names) < max_loaded_models():
+        return True
+
+    if not is_peak_hours():
+        return True
+
+    hot = [name for name in names if is_hot(name)]
+    if hot:
+        logger.info(
+            "Refusing to load %s during peak hours, it would evict hot model(s) %s",
+            model,
+            ", ".join(sorted(hot)),
+        )
+        return False
+    return True
+
+
+def preload(model):
+    """
+    Load a model into memory without generating anything.
+
+    Args:
+        model (str): Ollama model name
+
+    Returns:
+        float: Seconds the load took
+    """
+    import ollama
+
+    started = time.monotonic()
+    ollama.generate(model=model, prompt="", keep_alive=keep_alive())
+    return time.monotonic() - started
+
+
+def warm_models(models=None):
+    """
+    Preload configured models that are not resident, without evicting hot ones.
+
+    Args:
+        models (list, optional): Models to warm, defaults to configured_models()
+
+    Returns:
+        dict: Outcome per model ("resident", "loaded", "skipped" or "failed")
+    """
+    outcome = {}
+    resident = resident_models(refresh=True) or []
+    names = {_base_name(m["name"]) for m in resident}
+
+    for model in models or configured_models():
+        if _base_name(model) in names:
+            # Refresh keep_alive so the model's expiry moves forward
+            try:
+                preload(model)
+                outcome[model] = "resident"
+            except Exception as e:
+                logger.warning("Keep-alive for %s failed: %s", model, str(e))
+                outcome[model] = "failed"
+            continue
+
+        if not can_schedule(model):
+            outcome[model] = "skipped"
+            continue
+
+        try:
+            seconds = preload(model)
+            logger.info("Preloaded %s in %.1f seconds", model, seconds)
+            outcome[model] = "loaded"
+        except Exception as e:
+            logger.warning("Preloading %s failed: %s", model, str(e))
+            outcome[model] = "failed"
+
+        cache.delete(RESIDENT_KEY)
+        names = {_base_name(m["name"]) for m in resident_models(refresh=True) or []}
+
+    return outcome
+
+
+def residency_report():
+    """
+    Summarize load and residency state for every configured model.
+
+    Returns:
+        dict: Peak-hours flag, loaded model details and per-model state
+    """
+    resident = resident_models(refresh=True)
+    loaded = {_base_name(m["name"]): m for m in resident or []}
+    return {
+        "reachable": resident is not None,
+        "peak_hours": is_peak_hours(),
+        "keep_alive": keep_alive(),
+        "max_loaded_models": max_loaded_models(),
+        "loaded": list(loaded.values()),
+        "models": {
+            model: {
+                "resident": _base_name(model) in loaded,
+                "hot": is_hot(model),
+            }
+            for model in configured_models()
+        },
+    }
@@ -10,19 +10,13 @@
 ╚════════════════════════════════════════════════════════════════════╝
 """
 
-import ollama
-from ollama import Client
 import base64
-import cv2
 import os
 import tempfile
 
+from .llm_gateway import gateway, GatewayBusy, PRIORITY_CHAT, PRIORITY_VISION
+from .model_router import route_message
 
-# Get the Ollama host from environment variable
-OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://ollama:11434")
-
-# Use the host in your client
-client = Client(host=OLLAMA_HOST)
 
 class ChatBot:
     """
@@ -32,8 +26,15 @@ class ChatBot:
     to text queries with golf-specific expertise.
     """
 
-    def __init__(self):
-        """Initialize the ChatBot with a golf instructor system prompt."""
+    def __init__(self, user_id=None):
+        """
+        Initialize the ChatBot with a golf instructor system prompt.
+
+        Args:
+            user_id (int, optional): Requesting user, used for fair queuing in the LLM gateway
+        """
+        self.user_id = user_id
+        self.model = "gemma3"
         self.system_prompt = """
 You are GolfPro, an expert golf instructor with a friendly personality. Respond based on the type of message received:
 
@@ -88,8 +89,21 @@ Make sure to respond in a markdown format, using **bold** for key terms and emoj
         elif content.lower() == "video":
             return self.handle_video()
         else:
+            route = route_message(content, self.model, user_id=self.user_id)
             self.messages.append({"role": "user", "content": content})
-            res = ollama.chat(model="gemma3", messages=self.messages)
+            if route.canned_reply is not None:
+                self.messages.append(
+                    {"role": "assistant", "content": route.canned_reply}
+                )
+                return route.canned_reply
+
+            res = gateway.chat(
+                model=route.model,
+                messages=self.messages,
+                priority=PRIORITY_CHAT,
+                user_id=self.user_id,
+                endpoint="vision_text",
+            )
             self.messages.append(res["message"])
             return res["message"]["content"]
 
@@ -112,8 +126,11 @@ Make sure to respond in a markdown format, using **bold** for key terms and emoj
                 image_data = f.read()
                 base64_image = base64.b64encode(image_data).decode("utf-8")
 
-            res = ollama.chat(
-                model="gemma3",
+            res = gateway.chat(
+                model=self.model,
+                priority=PRIORITY_VISION,
+                user_id=self.user_id,
+                endpoint="vision",
                 messages=[
                     {
                         "role": "user",
@@ -172,6 +189,8 @@ You are SwingCoach, an expert golf instructor specializing in swing analysis. Wh
             self.messages.append(res["message"])
 
             return res["message"]["content"]
+        except GatewayBusy:
+            raise
         except Exception as e:
             return f"Error processing image: {str(e)}"
 
@@ -198,8 +217,11 @@ You are SwingCoach, an expert golf instructor specializing in swing analysis. Wh
             if not frames:
                 return "No frames were extracted from the video."
 
-            res = ollama.chat(
-                model="gemma3",
+            res = gateway.chat(
+                model=self.model,
+                priority=PRIORITY_VISION,
+                user_id=self.user_id,
+                endpoint="vision",
                 messages=[
                     {
                         "role": "user",
@@ -258,6 +280,8 @@ You are SwingCoach, an expert golf instructor specializing in swing analysis. Wh
             self.messages.append(res["message"])
 
             return res["message"]["content"]
+        except GatewayBusy:
+            raise
         except Exception as e:
             return f"Error processing video: {str(e)}"
 
@@ -272,6 +296,9 @@ You are SwingCoach, an expert golf instructor specializing in swing analysis. Wh
         Returns:
             list: List of base64 encoded frames
         """
+        # OpenCV is slow to import and heavy in memory, so only load it here
+        import cv2
+
         print(f"Processing video: {video_path}")
 
         cap = cv2.VideoCapture(video_path)
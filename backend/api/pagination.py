@@ -0,0 +1,106 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Keyset (cursor) pagination helpers                       ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module pages through querysets by their sort key instead of an
+offset. A cursor is an opaque token holding the sort key of the last item
+on the previous page, and the next page is "everything after that key",
+which an index on the same columns answers directly however deep the page.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    """
+    Turn the sort key of the last item on a page into a cursor token.
+
+    Args:
+        values (list): JSON-serializable key values, in sort order
+
+    Returns:
+        str: URL-safe cursor
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """
+    Read the sort key back out of a cursor token.
+
+    Args:
+        cursor (str): Token from encode_cursor()
+        length (int): Number of key values expected
+
+    Returns:
+        list: Key values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("invalid cursor")
+    return values
+
+
+def after(fields, values, descending=True):
+    """
+    Filter for rows that sort after a key.
+
+    For a descending sort on fields (a, b) and values (x, y) this is
+    a < x OR (a = x AND b < y); an ascending sort uses > instead.
+
+    Args:
+        fields (list): Sort fields, most significant first
+        values (list): Key of the last row already returned
+        descending (bool): Whether the sort is descending
+
+    Returns:
+        Q: Filter selecting the following rows
+    """
+    lookup = "lt" if descending else "gt"
+    condition = Q()
+    for i, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[i]})
+        for prior, value in zip(fields[:i], values[:i]):
+            step &= Q(**{prior: value})
+        condition |= step
+    return condition
+
+
+def page_size(request, default, maximum):
+    """
+    Read the limit query parameter, clamped to maximum.
+
+    Args:
+        request: HTTP request
+        default (int): Size when no limit is given
+        maximum (int): Largest size allowed
+
+    Returns:
+        int: Page size
+
+    Raises:
+        ValueError: If limit is not a positive number
+    """
+    limit = int(request.query_params.get("limit", default))
+    if limit < 1:
+        raise ValueError("limit")
+    return min(limit, maximum)
@@ -0,0 +1,211 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Redis-backed user presence tracking                      ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module tracks which users are online without writing to the users
+table on the request path. Each authenticated request records a heartbeat
+in a Redis sorted set (member user id, score unix time), so "who's online"
+is a single range query. A Celery beat task periodically copies last-seen
+times into User.last_login and refreshes User.is_online in two bulk
+updates.
+
+Heartbeats are throttled per process to one write per user every
+PRESENCE_HEARTBEAT_INTERVAL seconds, in a bounded in-process cache.
+Without REDIS_URL, or while Redis is unreachable, heartbeats update the
+users table directly and presence is read back from it, so every process
+and the Celery flush see the same users.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Case, When
+from django.contrib.auth import get_user_model
+
+from .authentication import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ONLINE_KEY = "presence:last-seen"
+FLUSHED_KEY = "presence:flushed-at"
+
+_client = None
+_client_lock = threading.Lock()
+# Per-process heartbeat throttle: users written within the interval
+_last_written = TTLCache(getattr(settings, "PRESENCE_HEARTBEAT_INTERVAL", 60))
+
+
+def _redis():
+    """
+    Return a shared Redis client, or None when Redis is not configured.
+
+    Returns:
+        redis.Redis or None: Client for REDIS_URL
+    """
+    global _client
+    url = getattr(settings, "REDIS_URL", "")
+    if not url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(
+                    url, socket_timeout=0.5, socket_connect_timeout=0.5
+                )
+    return _client
+
+
+def online_timeout():
+    """Seconds since the last heartbeat after which a user counts as offline."""
+    return getattr(settings, "USER_ONLINE_TIMEOUT", 15 * 60)
+
+
+def record_heartbeat(user_id, at=None):
+    """
+    Record that a user just made a request.
+
+    Args:
+        user_id (int): ID of the user
+        at (float, optional): Unix time of the activity, defaults to now
+    """
+    now = at or time.time()
+    if _last_written.get(user_id):
+        return
+    _last_written.set(user_id, True)
+
+    client = _redis()
+    if client is not None:
+        try:
+            client.zadd(ONLINE_KEY, {user_id: now})
+            return
+        except Exception as e:
+            logger.debug("Presence heartbeat for user %s not recorded: %s", user_id, str(e))
+    get_user_model().objects.filter(pk=user_id).update(
+        last_login=_datetime(now), is_online=True
+    )
+
+
+def _datetime(at):
+    """Aware UTC datetime for a unix time."""
+    return datetime.fromtimestamp(at, tz=dt_timezone.utc)
+
+
+def _seen_since(cutoff):
+    """
+    Users with a heartbeat in Redis after a unix time.
+
+    Returns:
+        dict or None: user id -> last-seen unix time, or None when Redis is
+            not configured or unreachable
+    """
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        return {
+            int(member): score
+            for member, score in client.zrangebyscore(
+                ONLINE_KEY, f"({cutoff}", "+inf", withscores=True
+            )
+        }
+    except Exception as e:
+        logger.debug("Presence lookup failed, using the users table: %s", str(e))
+        return None
+
+
+def online_user_ids():
+    """
+    IDs of users seen within the online timeout.
+
+    Returns:
+        set: User ids currently online
+    """
+    cutoff = time.time() - online_timeout()
+    seen = _seen_since(cutoff)
+    if seen is None:
+        return set(
+            get_user_model()
+            .objects.filter(is_online=True, last_login__gt=_datetime(cutoff))
+            .values_list("id", flat=True)
+        )
+    return set(seen)
+
+
+def is_online(user_id):
+    """
+    Check whether one user is online.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        bool: True if the user was seen within the online timeout
+    """
+    return user_id in online_user_ids()
+
+
+def flush_to_database():
+    """
+    Copy last-seen times to User.last_login and refresh User.is_online.
+
+    Only heartbeats newer than the previous flush are written, so each run
+    touches just the users active since then. Entries older than the
+    online timeout are then dropped from the sorted set. Without Redis the
+    heartbeats are already in the users table, and only users past the
+    online timeout are marked offline.
+
+    Returns:
+        tuple: (users whose last_login was updated, users marked offline)
+    """
+    User = get_user_model()
+    now = time.time()
+    client = _redis()
+
+    flushed_at = 0.0
+    if client is not None:
+        try:
+            flushed_at = float(client.get(FLUSHED_KEY) or 0)
+        except Exception as e:
+            logger.debug("Presence flush watermark unavailable: %s", str(e))
+
+    seen = _seen_since(flushed_at) or {}
+    updated = 0
+    if seen:
+        updated = User.objects.filter(id__in=seen).update(
+            last_login=Case(
+                *[When(id=user_id, then=_datetime(at)) for user_id, at in seen.items()]
+            ),
+            is_online=True,
+        )
+
+    cutoff = now - online_timeout()
+    online = online_user_ids()
+    went_offline = (
+        User.objects.filter(is_online=True)
+        .exclude(id__in=online)
+        .exclude(last_login__gt=_datetime(cutoff))
+        .update(is_online=False)
+    )
+
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            pipe.set(FLUSHED_KEY, now)
+            pipe.zremrangebyscore(ONLINE_KEY, "-inf", f"({cutoff}")
+            pipe.execute()
+        except Exception as e:
+            logger.debug("Presence cleanup failed: %s", str(e))
+    return updated, went_offline
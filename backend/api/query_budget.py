@@ -0,0 +1,255 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Per-request query counting and query budgets             ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module counts the database queries a request runs, the time spent in
+them and how often the same statement repeats. A statement that repeats
+with different parameters is the signature of an N+1 loop, so queries are
+grouped by fingerprint: the SQL with literals and IN lists collapsed.
+
+QueryBudgetMiddleware records every request. In DEBUG the numbers are
+returned as X-DB-* response headers; in all environments they feed the
+db_* metrics in metrics.py, and requests over their budget in
+QUERY_BUDGETS, keyed by HTTP method and URL name, are logged and counted. Tests use assert_query_budget() to
+fail when a view goes over its budget.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+DB_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+db_queries = registry.histogram(
+    "db_queries_per_request", "Database queries run per request.", ("view",),
+    QUERY_COUNT_BUCKETS,
+)
+db_time = registry.histogram(
+    "db_time_seconds", "Time per request spent in database queries.", ("view",),
+    DB_SECONDS_BUCKETS,
+)
+db_repeated = registry.counter(
+    "db_repeated_queries_total",
+    "Queries that repeated an earlier statement in the same request.",
+    ("view",),
+)
+db_over_budget = registry.counter(
+    "db_query_budget_exceeded_total",
+    "Requests over their view's query budget.",
+    ("view", "method"),
+)
+
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%s|\?|'[^']*'|-?\d+(?:\.\d+)?)\s*,?)+\)", re.I)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Normalize a statement so repeats with different values compare equal.
+
+    Args:
+        sql (str): SQL as passed to the database cursor
+
+    Returns:
+        str: SQL with literals replaced by ? and IN lists by IN (...)
+    """
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that tallies queries.
+
+    Install it with record_queries(); it can be reused across blocks and
+    keeps adding to the same totals.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def repeated(self):
+        """Queries beyond the first of each fingerprint."""
+        return sum(n - 1 for n in self.fingerprints.values() if n > 1)
+
+    def top_repeats(self, limit=3):
+        """
+        Most repeated fingerprints.
+
+        Args:
+            limit (int): Fingerprints to return
+
+        Returns:
+            list: (count, fingerprint) for statements run more than once
+        """
+        return [
+            (n, sql) for sql, n in self.fingerprints.most_common(limit) if n > 1
+        ]
+
+    def summary(self, limit=3):
+        """Human-readable totals plus the most repeated statements."""
+        lines = [
+            f"{self.count} queries in {self.seconds * 1000:.1f} ms, "
+            f"{self.repeated} repeated"
+        ]
+        lines.extend(f"  {n}x {sql[:300]}" for n, sql in self.top_repeats(limit))
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_queries(recorder=None):
+    """
+    Record queries on every database connection for the duration of a block.
+
+    Args:
+        recorder (QueryRecorder, optional): Recorder to add to
+
+    Yields:
+        QueryRecorder: The recorder
+    """
+    recorder = recorder or QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def budget_for(view_name, method="GET"):
+    """
+    Query budget for a view.
+
+    Args:
+        view_name (str): URL name of the view
+        method (str): HTTP method of the request
+
+    Returns:
+        int or None: Maximum queries per request, None when unbudgeted
+    """
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    return budgets.get(
+        (method.upper(), view_name), getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+    )
+
+
+@contextmanager
+def assert_query_budget(view_name, budget=None, method="GET"):
+    """
+    Fail with AssertionError if a block runs more queries than a budget.
+
+    Args:
+        view_name (str): URL name whose QUERY_BUDGETS entry applies
+        budget (int, optional): Explicit budget instead of the configured one
+        method (str): HTTP method whose QUERY_BUDGETS entry applies
+
+    Yields:
+        QueryRecorder: The recorder, for further assertions
+    """
+    budget = budget if budget is not None else budget_for(view_name, method)
+    if budget is None:
+        raise AssertionError(f"No query budget declared for {method} {view_name}")
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > budget:
+        raise AssertionError(
+            f"{method} {view_name} ran over its budget of {budget} queries: "
+            + recorder.summary()
+        )
+
+
+def _view_name(request):
+    """URL name of the view that handled a request."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.view_name or "unnamed"
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware that records database work per request and checks budgets.
+
+    Queries run while a streaming response is iterated happen after this
+    middleware returns and are not counted.
+    """
+
+    def __init__(self, get_response):
+        """
+        Initialize the middleware with the response handler.
+
+        Args:
+            get_response: The Django response handler function
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Run the request under a query recorder and report the totals.
+
+        Args:
+            request: The Django request object
+
+        Returns:
+            The response from the view
+        """
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        view = _view_name(request)
+        db_queries.observe(recorder.count, view=view)
+        db_time.observe(recorder.seconds, view=view)
+        if recorder.repeated:
+            db_repeated.inc(recorder.repeated, view=view)
+
+        budget = budget_for(view, request.method)
+        if budget is not None and recorder.count > budget:
+            db_over_budget.inc(view=view, method=request.method)
+            logger.warning(
+                "%s %s ran over its budget of %d queries: %s",
+                request.method,
+                request.path,
+                budget,
+                recorder.summary(),
+            )
+
+        if settings.DEBUG:
+            response["X-DB-Queries"] = str(recorder.count)
+            response["X-DB-Time-Ms"] = f"{recorder.seconds * 1000:.1f}"
+            response["X-DB-Repeated-Queries"] = str(recorder.repeated)
+            if budget is not None:
+                response["X-DB-Query-Budget"] = str(budget)
+
+        return response
@@ -0,0 +1,241 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Response cache for deterministic chatbot answers         ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module caches chatbot answers in the configured cache backend.
+The chatbot runs with temperature 0, so the same prompt, model, options and
+conversation context always produce the same answer. Entries expire after a
+configurable timeout and Redis evicts the least recently used keys when it
+runs out of memory. Hit and miss counters are kept in the cache so the hit
+rate covers every worker process.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "chat-response"
+HITS_KEY = f"{KEY_PREFIX}:stats:hits"
+MISSES_KEY = f"{KEY_PREFIX}:stats:misses"
+
+
+def normalize_prompt(prompt):
+    """
+    Normalize a prompt so trivial differences share a cache entry.
+
+    Args:
+        prompt (str): The user's message
+
+    Returns:
+        str: Lowercased prompt with collapsed whitespace
+    """
+    return " ".join(prompt.lower().split())
+
+
+def context_hash(messages, context=""):
+    """
+    Hash the conversation state a prompt is answered in.
+
+    Args:
+        messages (list): Messages already sent to the model, including the system prompt
+        context (str): Extra context appended to the prompt (e.g. recent rounds)
+
+    Returns:
+        str: Hex digest identifying the context
+    """
+    payload = json.dumps(
+        {"messages": messages, "context": context or ""},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(options):
+    """
+    Check whether model options produce repeatable answers.
+
+    Args:
+        options (dict): Ollama generation options
+
+    Returns:
+        bool: True if the temperature is pinned to 0
+    """
+    return bool(options) and options.get("temperature") == 0
+
+
+class ResponseCache:
+    """
+    Cache of chatbot answers keyed on prompt, model, options and context.
+
+    Uses Django's default cache, which is Redis in docker-compose and an
+    in-process cache in local development.
+    """
+
+    def __init__(self, timeout=None, enabled=None):
+        """
+        Initialize the cache with optional timeout and enabled overrides.
+
+        Settings are read lazily so the module can be imported before
+        Django is configured.
+
+        Args:
+            timeout (int, optional): Entry lifetime in seconds
+            enabled (bool, optional): Whether lookups and stores are performed
+        """
+        self._timeout = timeout
+        self._enabled = enabled
+
+    @property
+    def timeout(self):
+        """Entry lifetime in seconds."""
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, "CHAT_RESPONSE_CACHE_TIMEOUT", 7 * 24 * 60 * 60)
+
+    @property
+    def enabled(self):
+        """Whether the cache is used at all."""
+        if self._enabled is not None:
+            return self._enabled
+        if not settings.configured:
+            return False
+        return getattr(settings, "CHAT_RESPONSE_CACHE_ENABLED", True)
+
+    def make_key(self, prompt, model, options, context_digest):
+        """
+        Build the cache key for a single model call.
+
+        Args:
+            prompt (str): The user's message
+            model (str): Ollama model name
+            options (dict): Ollama generation options
+            context_digest (str): Result of context_hash()
+
+        Returns:
+            str: Cache key
+        """
+        payload = json.dumps(
+            {
+                "prompt": normalize_prompt(prompt),
+                "model": model,
+                "options": options or {},
+                "context": context_digest,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{model}:{digest}"
+
+    def get(self, key):
+        """
+        Look up a cached answer and record a hit or miss.
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            str or None: The cached answer, if any
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            answer = cache.get(key)
+        except Exception as e:
+            logger.warning("Chat response cache lookup failed: %s", str(e))
+            return None
+
+        self._count(HITS_KEY if answer is not None else MISSES_KEY)
+        return answer
+
+    def set(self, key, answer):
+        """
+        Store an answer under the given key.
+
+        Args:
+            key (str): Key from make_key()
+            answer (str): Model response content
+        """
+        if not self.enabled or not answer:
+            return
+
+        try:
+            cache.set(key, answer, self.timeout)
+        except Exception as e:
+            logger.warning("Chat response cache store failed: %s", str(e))
+
+    def stats(self):
+        """
+        Report hit and miss counts across all processes.
+
+        Returns:
+            dict: Hits, misses and hit rate (0-1)
+        """
+        counts = cache.get_many([HITS_KEY, MISSES_KEY])
+        hits = counts.get(HITS_KEY, 0)
+        misses = counts.get(MISSES_KEY, 0)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+    def _count(self, key):
+        """Increment a stats counter, creating it if needed."""
+        try:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+        except Exception as e:
+            logger.debug("Unable to update chat cache counter %s: %s", key, str(e))
+
+
+def replay(answer, chunk_size=64):
+    """
+    Yield a complete answer in chunks so it can be streamed like a live reply.
+
+    Args:
+        answer (str): The full response text
+        chunk_size (int): Characters per chunk
+
+    Yields:
+        str: Consecutive pieces of the answer
+    """
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start : start + chunk_size]
+
+
+response_cache = ResponseCache()
+
+cache_lookups = metrics.registry.gauge(
+    "chat_response_cache_lookups",
+    "Chat response cache lookups across all workers.",
+    ("result",),
+)
+
+
+def _collect_cache_metrics():
+    """Publish the shared hit and miss counts as gauges."""
+    stats = response_cache.stats()
+    cache_lookups.set(stats["hits"], result="hit")
+    cache_lookups.set(stats["misses"], result="miss")
+
+
+metrics.registry.add_collector(_collect_cache_metrics)
@@ -0,0 +1,431 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Local vector index for retrieval-augmented chat          ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module embeds each user's rounds (stats and notes) and a curated golf
+tips corpus with a local Ollama embedding model, and keeps the vectors in a
+small on-disk NumPy index. Rounds are added, replaced or removed one at a
+time as they are written, and only the top-k snippets relevant to a
+question are pasted into the chat prompt.
+
+The index is one file in RETRIEVAL_INDEX_DIR, index.npz, holding unit-length
+float16 embeddings, one row per document, next to each row's document id,
+owner (user id, or null for shared tips) and text as JSON. Writers hold an
+exclusive file lock and replace the file atomically, so a reader always
+sees vectors and metadata from the same write; readers reload it only
+when it changes.
+
+Embedding calls go through the LLM gateway like chat calls, including its
+refusal to load a cold model over a hot one at peak. A refused question
+is answered without retrieval (see chat_context.py).
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .llm_gateway import gateway, PRIORITY_CHAT
+from .models import Round
+from .score_packing import decode_rows
+
+logger = logging.getLogger(__name__)
+
+TIPS_FILE = Path(__file__).resolve().parent / "golf_tips.json"
+
+
+def round_doc_id(round_id):
+    """Document id used for a round in the index."""
+    return f"round:{round_id}"
+
+
+def embed(texts, user_id=None):
+    """
+    Embed texts with the configured local embedding model.
+
+    Args:
+        texts (list): Strings to embed
+        user_id (int, optional): Requesting user, for the LLM gateway
+
+    Returns:
+        numpy.ndarray: One unit-length float32 row per text
+
+    Raises:
+        GatewayBusy: If the embedding model cannot be admitted now
+    """
+    response = gateway.embed(
+        settings.CHAT_EMBEDDING_MODEL, texts, priority=PRIORITY_CHAT, user_id=user_id
+    )
+    vectors = np.asarray(response["embeddings"], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def describe_round(round_obj):
+    """
+    Render a round as a short text snippet for embedding and retrieval.
+
+    Expects the round to be annotated by rounds_for_indexing().
+
+    Args:
+        round_obj: Round instance
+
+    Returns:
+        str: Snippet describing the round
+    """
+    holes = round_obj.holes or 0
+    text = (
+        f"Round on {round_obj.date_played.strftime('%Y-%m-%d')} at "
+        f"{round_obj.course.course_name} ({round_obj.tee.tee_name} tees, "
+        f"{holes} holes): score {round_obj.strokes or 0} "
+        f"({(round_obj.strokes or 0) - (round_obj.par or 0):+d} to par)"
+    )
+    if holes:
+        text += (
+            f", {round_obj.putts} putts, "
+            f"{round_obj.fairways / holes * 100:.0f}% fairways, "
+            f"{round_obj.greens / holes * 100:.0f}% greens in regulation, "
+            f"{round_obj.penalties} penalties"
+        )
+    text += "."
+    if round_obj.notes:
+        text += f" Notes: {round_obj.notes.strip()}"
+    return text
+
+
+def rounds_for_indexing():
+    """
+    Queryset of rounds annotated with everything describe_round() needs.
+
+    Returns:
+        QuerySet: Rounds with course, tee and per-round totals
+    """
+    return Round.objects.select_related("course", "tee").annotate(
+        holes=Count("hole_scores"),
+        strokes=Sum("hole_scores__strokes"),
+        par=Sum("hole_scores__hole__par"),
+        putts=Sum("hole_scores__putts"),
+        penalties=Sum("hole_scores__penalties"),
+        fairways=Count("hole_scores", filter=Q(hole_scores__fairway_hit=True)),
+        greens=Count("hole_scores", filter=Q(hole_scores__green_in_regulation=True)),
+    )
+
+
+def _add_packed_totals(rounds):
+    """
+    Fill rounds_for_indexing() totals of packed rounds from their scores.
+
+    Args:
+        rounds (list): Annotated rounds; unpacked ones are left as they are
+    """
+    packed = {
+        round_obj.id: round_obj
+        for round_obj in rounds
+        if round_obj.packed_scores is not None
+    }
+    for round_obj in packed.values():
+        round_obj.holes = round_obj.strokes = round_obj.par = 0
+        round_obj.putts = round_obj.penalties = 0
+        round_obj.fairways = round_obj.greens = 0
+    rows = decode_rows(
+        (r.id, r.player_id, r.course_id, r.tee_id, r.date_played, r.packed_scores)
+        for r in packed.values()
+    )
+    for row in rows:
+        round_obj = packed[row["round_id"]]
+        round_obj.holes += 1
+        round_obj.strokes += row["strokes"]
+        round_obj.par += row["hole__par"]
+        round_obj.putts += row["putts"]
+        round_obj.penalties += row["penalties"]
+        round_obj.fairways += row["fairway_hit"]
+        round_obj.greens += row["green_in_regulation"]
+
+
+class VectorIndex:
+    """
+    Compact on-disk vector index with incremental upserts.
+
+    Rows are stored as float16 to halve the file size; scoring converts
+    them to float32.
+
+    Every upsert or remove rewrites the whole file under the write lock,
+    so a write costs time and disk I/O in proportion to the index size.
+    That keeps the file format and crash safety simple and suits indexes
+    up to a few tens of thousands of documents: a 768-dimension row is
+    1.5 KB, so 20,000 rounds rewrite about 30 MB plus their text per
+    write. Larger indexes need an append-only segment with periodic
+    compaction instead.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize the index for a directory.
+
+        Args:
+            directory (str or Path): Where index.npz lives
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / "index.npz"
+        self.lock_path = self.directory / ".lock"
+        self._loaded_mtime = None
+        self._vectors = None
+        self._meta = []
+        self._positions = {}
+        self._owners = None
+        self._reload_lock = threading.Lock()
+
+    @contextmanager
+    def _write_lock(self):
+        """Hold an exclusive lock shared by every process writing the index."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Reload the index from disk if another process has changed it."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime == self._loaded_mtime and self._vectors is not None:
+            return
+
+        with self._reload_lock:
+            if mtime is None:
+                self._vectors = np.zeros((0, 0), dtype=np.float16)
+                self._meta = []
+            else:
+                # One open file, so a concurrent replace cannot mix two writes
+                with np.load(self.path) as data:
+                    self._vectors = data["vectors"]
+                    self._meta = json.loads(data["meta"].tobytes())
+            self._positions = {entry["id"]: i for i, entry in enumerate(self._meta)}
+            self._owners = np.array(
+                [-1 if entry["owner"] is None else entry["owner"] for entry in self._meta],
+                dtype=np.int64,
+            )
+            self._loaded_mtime = mtime
+
+    def _save(self):
+        """Write vectors and metadata together in one atomic replace."""
+        tmp = self.directory / "index.tmp.npz"
+        meta = np.frombuffer(json.dumps(self._meta).encode("utf-8"), dtype=np.uint8)
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=self._vectors, meta=meta)
+        os.replace(tmp, self.path)
+        self._loaded_mtime = None
+
+    def __len__(self):
+        self._load()
+        return len(self._meta)
+
+    def upsert(self, documents):
+        """
+        Add or replace documents, rewriting the index file.
+
+        Args:
+            documents (list): Tuples of (doc_id, owner, text, vector)
+        """
+        if not documents:
+            return
+        # A repeated doc_id keeps its last version, as sequential upserts would
+        documents = {document[0]: document for document in documents}.values()
+
+        with self._write_lock():
+            self._load()
+            # Searches may be reading the loaded rows; change a copy
+            vectors = self._vectors.copy()
+            meta = list(self._meta)
+            positions = dict(self._positions)
+            new_rows = []
+
+            for doc_id, owner, text, vector in documents:
+                entry = {"id": doc_id, "owner": owner, "text": text}
+                row = np.asarray(vector, dtype=np.float16)
+                if doc_id in positions:
+                    vectors[positions[doc_id]] = row
+                    meta[positions[doc_id]] = entry
+                else:
+                    positions[doc_id] = len(meta) + len(new_rows)
+                    new_rows.append((entry, row))
+
+            if new_rows:
+                stacked = np.stack([row for _, row in new_rows])
+                vectors = stacked if not len(meta) else np.vstack([vectors, stacked])
+                meta.extend(entry for entry, _ in new_rows)
+
+            self._vectors = vectors
+            self._meta = meta
+            self._save()
+
+    def remove(self, doc_ids):
+        """
+        Delete documents by id.
+
+        Args:
+            doc_ids (list): Ids of documents to remove
+        """
+        with self._write_lock():
+            self._load()
+            doomed = {self._positions[d] for d in doc_ids if d in self._positions}
+            if not doomed:
+                return
+            keep = [i for i in range(len(self._meta)) if i not in doomed]
+            self._vectors = self._vectors[keep]
+            self._meta = [self._meta[i] for i in keep]
+            self._save()
+
+    def search(self, query_vector, owner, k):
+        """
+        Find the most similar documents visible to an owner.
+
+        Args:
+            query_vector (numpy.ndarray): Unit-length query embedding
+            owner (int): User id; shared documents (owner None) are always visible
+            k (int): Number of results
+
+        Returns:
+            list: Tuples of (score, text), best first
+        """
+        self._load()
+        with self._reload_lock:
+            # Rows and metadata from one load, even if another thread reloads
+            vectors, meta, owners = self._vectors, self._meta, self._owners
+        if not meta:
+            return []
+
+        visible = np.flatnonzero((owners == owner) | (owners == -1))
+        if not len(visible):
+            return []
+
+        scores = vectors[visible].astype(np.float32) @ query_vector
+        k = min(k, len(visible))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), meta[visible[i]]["text"]) for i in top]
+
+
+_index = None
+
+
+def get_index():
+    """
+    Return the process-wide vector index.
+
+    Returns:
+        VectorIndex: The index stored in RETRIEVAL_INDEX_DIR
+    """
+    global _index
+    if _index is None:
+        _index = VectorIndex(settings.RETRIEVAL_INDEX_DIR)
+    return _index
+
+
+def index_tips():
+    """
+    Embed the curated tips corpus into the index.
+
+    Returns:
+        int: Number of tips indexed
+    """
+    with open(TIPS_FILE) as f:
+        tips = json.load(f)
+    vectors = embed([tip["text"] for tip in tips])
+    get_index().upsert(
+        [
+            (f"tip:{tip['id']}", None, tip["text"], vector)
+            for tip, vector in zip(tips, vectors)
+        ]
+    )
+    return len(tips)
+
+
+def index_rounds(round_ids):
+    """
+    Embed (or re-embed) specific rounds.
+
+    Rounds that no longer exist are removed from the index.
+
+    Args:
+        round_ids (list): IDs of rounds that changed
+
+    Returns:
+        int: Number of rounds indexed
+    """
+    rounds = list(rounds_for_indexing().filter(id__in=round_ids))
+    found = {round_obj.id for round_obj in rounds}
+    missing = [round_doc_id(rid) for rid in round_ids if rid not in found]
+    if missing:
+        get_index().remove(missing)
+    if not rounds:
+        return 0
+
+    _add_packed_totals(rounds)
+    texts = [describe_round(round_obj) for round_obj in rounds]
+    vectors = embed(texts)
+    get_index().upsert(
+        [
+            (round_doc_id(round_obj.id), round_obj.player_id, text, vector)
+            for round_obj, text, vector in zip(rounds, texts, vectors)
+        ]
+    )
+    return len(rounds)
+
+
+def rebuild_index(batch_size=64):
+    """
+    Index the tips corpus and every round.
+
+    Args:
+        batch_size (int): Rounds embedded per call
+
+    Returns:
+        int: Number of documents indexed
+    """
+    total = index_tips()
+    round_ids = list(Round.objects.values_list("id", flat=True).order_by("id"))
+    for start in range(0, len(round_ids), batch_size):
+        total += index_rounds(round_ids[start : start + batch_size])
+    return total
+
+
+def retrieve(user_id, question, k=None):
+    """
+    Find the snippets most relevant to a question for one user.
+
+    Args:
+        user_id (int): ID of the golfer asking
+        question (str): The chat message
+        k (int, optional): Number of snippets, defaults to RETRIEVAL_TOP_K
+
+    Returns:
+        list: Snippet texts, most relevant first
+    """
+    k = k or settings.RETRIEVAL_TOP_K
+    query = embed([question], user_id=user_id)[0]
+    min_score = settings.RETRIEVAL_MIN_SCORE
+    return [
+        text for score, text in get_index().search(query, user_id, k) if score >= min_score
+    ]
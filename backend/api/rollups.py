@@ -0,0 +1,497 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Incremental daily rollups of hole scores                 ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module keeps PlayerDailyStats, CourseDailyStats and HoleDailyStats in
+step with the hole scores they summarize, along with the all-time HoleStats
+behind hole difficulty. A Celery beat task calls refresh_rollups() every
+few minutes.
+
+Each run looks for hole scores whose own updated_at, or whose round's
+updated_at, is past the stored watermark, and recomputes every (player,
+day), (course, day) and (hole, day) they fall in from the raw rows, then
+sums the all-time totals of each hole touched from its daily hole rows. A
+recompute is always a full re-aggregation of that key, so edits to rounds
+played long ago land in the right day and running twice is harmless.
+
+Changes that leave no newer updated_at behind (deleting a score or round,
+moving a round to another day or course) are recorded as old keys in
+RollupBacklog by signals.py and recomputed on the next run, which drops
+rollup rows that no longer have any scores.
+
+Packed rounds (see score_packing.py) have no HoleScore rows; their decoded
+scores are added to the daily aggregates of the day they were played. They
+never change while packed, since a write unpacks the round first, so a run
+only decodes packed rounds on the days it recomputes; HoleStats never reads
+scores at all.
+
+The watermark trails the clock by ROLLUP_SETTLE_SECONDS so rows written by
+transactions still open during a run are picked up by the next one.
+"""
+
+import logging
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CourseDailyStats,
+    HoleDailyStats,
+    HoleScore,
+    HoleStats,
+    PlayerDailyStats,
+    RollupBacklog,
+    RollupWatermark,
+    Round,
+)
+from .score_packing import packed_score_rows
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "daily-rollups"
+ROLLUP_FIELDS = (
+    "rounds",
+    "holes",
+    "strokes",
+    "par",
+    "putts",
+    "penalties",
+    "fairways",
+    "greens",
+)
+
+# HoleDailyStats also counts blow-ups, so HoleStats can be summed from it
+HOLE_ROLLUP_FIELDS = (*ROLLUP_FIELDS, "blow_ups")
+
+HOLE_STATS_FIELDS = (
+    "scores",
+    "strokes",
+    "putts",
+    "penalties",
+    "fairways",
+    "greens",
+    "blow_ups",
+)
+
+# HoleStats field -> HoleDailyStats field it is the sum of
+HOLE_STATS_SOURCES = {
+    "scores": "holes",
+    "strokes": "strokes",
+    "putts": "putts",
+    "penalties": "penalties",
+    "fairways": "fairways",
+    "greens": "greens",
+    "blow_ups": "blow_ups",
+}
+
+# Strokes over par that make a blow-up (double bogey or worse)
+BLOW_UP_OVER_PAR = 2
+
+# scope -> (rollup model, rollup key field, HoleScore lookup for that key,
+#           Round lookup finding the packed rounds with scores for that key,
+#           rollup fields)
+SCOPES = {
+    "player": (
+        PlayerDailyStats,
+        "player",
+        "round__player_id",
+        "player_id",
+        ROLLUP_FIELDS,
+    ),
+    "course": (
+        CourseDailyStats,
+        "course",
+        "round__course_id",
+        "course_id",
+        ROLLUP_FIELDS,
+    ),
+    "hole": (HoleDailyStats, "hole", "hole_id", "tee__holes", HOLE_ROLLUP_FIELDS),
+}
+
+
+def _batch_size():
+    """Keys recomputed per query and rows written per insert."""
+    return getattr(settings, "ROLLUP_BATCH_SIZE", 500)
+
+
+def score_totals(fields=ROLLUP_FIELDS):
+    """
+    Aggregates over HoleScore rows that make up one rollup row.
+
+    Args:
+        fields (iterable): Rollup fields to aggregate
+
+    Returns:
+        dict: Aggregate expressions keyed by rollup field
+    """
+    totals = {
+        # First, so "strokes" still means the column rather than its sum
+        "blow_ups": Count(
+            "id", filter=Q(strokes__gte=F("hole__par") + BLOW_UP_OVER_PAR)
+        ),
+        "rounds": Count("round", distinct=True),
+        "holes": Count("id"),
+        "strokes": Sum("strokes"),
+        "par": Sum("hole__par"),
+        "putts": Sum("putts"),
+        "penalties": Sum("penalties"),
+        "fairways": Count("id", filter=Q(fairway_hit=True)),
+        "greens": Count("id", filter=Q(green_in_regulation=True)),
+    }
+    return {name: total for name, total in totals.items() if name in fields}
+
+
+def _hole_stats(hole_ids=None):
+    """HoleStats instances summed from daily hole rollups, one per hole scored."""
+    rows = HoleDailyStats.objects.all()
+    if hole_ids is not None:
+        rows = rows.filter(hole_id__in=hole_ids)
+    rows = (
+        rows.values("hole_id")
+        .annotate(
+            **{
+                f"total_{name}": Sum(source)
+                for name, source in HOLE_STATS_SOURCES.items()
+            }
+        )
+        .order_by()
+    )
+    for row in rows.iterator(chunk_size=_batch_size()):
+        yield HoleStats(
+            hole_id=row["hole_id"],
+            **{name: row[f"total_{name}"] or 0 for name in HOLE_STATS_FIELDS},
+        )
+
+
+def recompute_hole_stats(hole_ids):
+    """
+    Re-sum all-time HoleStats rows for holes from their daily hole rollups.
+
+    Runs after the hole scope's days are recomputed. Holes with no scores
+    left have their row deleted.
+
+    Args:
+        hole_ids (iterable): IDs of the holes
+
+    Returns:
+        int: HoleStats rows written or deleted
+    """
+    changed = 0
+    for chunk in _chunks(sorted(set(hole_ids)), _batch_size()):
+        fresh = list(_hole_stats(chunk))
+        if fresh:
+            HoleStats.objects.bulk_create(
+                fresh,
+                update_conflicts=True,
+                unique_fields=["hole"],
+                update_fields=[*HOLE_STATS_FIELDS, "updated_at"],
+            )
+        stale = set(chunk) - {obj.hole_id for obj in fresh}
+        if stale:
+            HoleStats.objects.filter(hole_id__in=stale).delete()
+        changed += len(fresh) + len(stale)
+    return changed
+
+
+def _grouped(source, fields=ROLLUP_FIELDS):
+    """Hole score totals grouped by one rollup key and the day played."""
+    return (
+        HoleScore.objects.annotate(day=TruncDate("round__date_played"))
+        .values(source, "day")
+        .annotate(**score_totals(fields))
+        .order_by()
+    )
+
+
+def _key(source):
+    """Key of a _grouped(source) row: (subject id, day)."""
+    return lambda row: (row[source], row["day"])
+
+
+def _packed_totals(source, rounds):
+    """Rollup totals of packed rounds, keyed like _grouped(source) rows."""
+    totals = {}
+    for row in packed_score_rows(rounds):
+        key = (row[source], row["day"])
+        entry = totals.get(key)
+        if entry is None:
+            entry = totals[key] = {
+                source: row[source],
+                "day": row["day"],
+                "round_ids": set(),
+                **dict.fromkeys(HOLE_ROLLUP_FIELDS, 0),
+            }
+        entry["round_ids"].add(row["round_id"])
+        entry["holes"] += 1
+        entry["strokes"] += row["strokes"]
+        entry["par"] += row["hole__par"]
+        entry["putts"] += row["putts"]
+        entry["penalties"] += row["penalties"]
+        entry["fairways"] += row["fairway_hit"]
+        entry["greens"] += row["green_in_regulation"]
+        entry["blow_ups"] += row["strokes"] >= row["hole__par"] + BLOW_UP_OVER_PAR
+    for entry in totals.values():
+        entry["rounds"] = len(entry.pop("round_ids"))
+    return totals
+
+
+def _with_packed(key, fields, rows, packed):
+    """
+    Add packed-round totals to aggregated hole score rows.
+
+    Args:
+        key (callable): Returns a row's key in packed
+        fields (iterable): Total fields to add up
+        rows (iterable): Aggregated HoleScore rows
+        packed (dict): Packed totals keyed like the rows
+
+    Yields:
+        dict: Each row with its packed totals added, then rows only packed
+            rounds contribute to
+    """
+    for row in rows:
+        extra = packed.pop(key(row), None)
+        if extra is not None:
+            for name in fields:
+                row[name] = (row[name] or 0) + extra[name]
+        yield row
+    yield from packed.values()
+
+
+def _rollup_row(model, field, source, fields, row):
+    """Build an unsaved rollup instance from a _grouped() row."""
+    return model(
+        **{f"{field}_id": row[source], "day": row["day"]},
+        **{name: row[name] or 0 for name in fields},
+    )
+
+
+def _chunks(items, size):
+    """Split a list into lists of at most size items."""
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def recompute(scope, keys):
+    """
+    Re-aggregate rollup rows for (subject id, day) keys from hole scores.
+
+    Keys with no scores left have their rollup row deleted.
+
+    Args:
+        scope (str): "player", "course" or "hole"
+        keys (iterable): (subject id, date) pairs
+
+    Returns:
+        int: Rollup rows written or deleted
+    """
+    model, field, source, packed_lookup, fields = SCOPES[scope]
+    changed = 0
+
+    for chunk in _chunks(sorted(set(keys)), _batch_size()):
+        wanted = set(chunk)
+        subjects = {key[0] for key in chunk}
+        days = {key[1] for key in chunk}
+        rows = _grouped(source, fields).filter(
+            **{f"{source}__in": subjects, "round__date_played__date__in": days}
+        )
+        packed = _packed_totals(
+            source,
+            Round.objects.filter(
+                **{f"{packed_lookup}__in": subjects, "date_played__date__in": days}
+            ).distinct(),
+        )
+        fresh = [
+            _rollup_row(model, field, source, fields, row)
+            for row in _with_packed(_key(source), fields, rows, packed)
+            if (row[source], row["day"]) in wanted
+        ]
+        if fresh:
+            model.objects.bulk_create(
+                fresh,
+                update_conflicts=True,
+                unique_fields=[field, "day"],
+                update_fields=[*fields, "updated_at"],
+            )
+
+        stale = wanted - {(getattr(obj, f"{field}_id"), obj.day) for obj in fresh}
+        if stale:
+            model.objects.filter(
+                reduce(or_, (Q(**{f"{field}_id": pk, "day": day}) for pk, day in stale))
+            ).delete()
+        changed += len(fresh) + len(stale)
+
+    return changed
+
+
+def _settled(now):
+    """Watermark position for a run starting at now."""
+    return now - timedelta(seconds=getattr(settings, "ROLLUP_SETTLE_SECONDS", 60))
+
+
+def rebuild_rollups(now=None):
+    """
+    Rebuild every rollup table from scratch and reset the watermark.
+
+    Args:
+        now (datetime, optional): Time the run starts, defaults to now
+
+    Returns:
+        dict: Scope -> rollup rows written, plus "hole_stats"
+    """
+    upto = _settled(now or timezone.now())
+    written = {}
+
+    with transaction.atomic():
+        RollupBacklog.objects.all().delete()
+        for scope, (model, field, source, _, fields) in SCOPES.items():
+            model.objects.all().delete()
+            batch, written[scope] = [], 0
+            rows = _with_packed(
+                _key(source),
+                fields,
+                _grouped(source, fields).iterator(chunk_size=_batch_size()),
+                _packed_totals(source, Round.objects.all()),
+            )
+            for row in rows:
+                batch.append(_rollup_row(model, field, source, fields, row))
+                if len(batch) >= _batch_size():
+                    model.objects.bulk_create(batch)
+                    written[scope] += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+            written[scope] += len(batch)
+
+        # From the hole rows just written
+        HoleStats.objects.all().delete()
+        written["hole_stats"] = 0
+        for batch in _chunks(list(_hole_stats()), _batch_size()):
+            HoleStats.objects.bulk_create(batch)
+            written["hole_stats"] += len(batch)
+        RollupWatermark.objects.update_or_create(
+            name=WATERMARK, defaults={"value": upto}
+        )
+
+    logger.info("Rebuilt daily rollups: %s", written)
+    return written
+
+
+def _changed_scores(since):
+    """
+    Rollup keys of hole scores written, or in rounds written, after since.
+
+    Two queries rather than one OR across the join to Round, so each is
+    answered from its updated_at index instead of scanning hole scores.
+
+    Args:
+        since (datetime): Watermark
+
+    Returns:
+        list: Querysets of (player id, course id, hole id, date) tuples
+    """
+    scores = HoleScore.objects.annotate(day=TruncDate("round__date_played")).order_by()
+    fields = ("round__player_id", "round__course_id", "hole_id", "day")
+    rounds = Round.objects.filter(updated_at__gt=since).order_by().values("id")
+    return [
+        scores.filter(updated_at__gt=since).values_list(*fields).distinct(),
+        scores.filter(round_id__in=rounds).values_list(*fields).distinct(),
+    ]
+
+
+def refresh_rollups(now=None):
+    """
+    Bring the rollup tables up to date with changes since the last run.
+
+    Falls back to rebuild_rollups() when no run has happened yet.
+
+    Args:
+        now (datetime, optional): Time the run starts, defaults to now
+
+    Returns:
+        dict: Scope -> rollup rows written or deleted, plus "hole_stats"
+    """
+    upto = _settled(now or timezone.now())
+
+    with transaction.atomic():
+        watermark = (
+            RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        )
+        if watermark is None:
+            return rebuild_rollups(now)
+
+        since = watermark.value
+        keys = set()
+        for rows in _changed_scores(since):
+            keys.update(rows)
+        backlog = list(
+            RollupBacklog.objects.values_list(
+                "id", "player_id", "course_id", "hole_id", "day"
+            )
+        )
+        keys.update(tuple(entry[1:]) for entry in backlog)
+
+        changed = {
+            "player": recompute("player", {(p, day) for p, _, _, day in keys}),
+            "course": recompute("course", {(c, day) for _, c, _, day in keys}),
+            "hole": recompute("hole", {(h, day) for _, _, h, day in keys}),
+            # Summed from the hole rows, so after them
+            "hole_stats": recompute_hole_stats({h for _, _, h, _ in keys}),
+        }
+
+        for ids in _chunks([entry[0] for entry in backlog], _batch_size()):
+            RollupBacklog.objects.filter(id__in=ids).delete()
+        if upto > since:
+            watermark.value = upto
+            watermark.save(update_fields=["value", "updated_at"])
+
+    return changed
+
+
+def record_stale_keys(keys):
+    """
+    Queue old rollup keys for the next run.
+
+    Args:
+        keys (iterable): (player id, course id, hole id, date) tuples
+    """
+    RollupBacklog.objects.bulk_create(
+        RollupBacklog(player_id=p, course_id=c, hole_id=h, day=day)
+        for p, c, h, day in set(keys)
+    )
+
+
+def round_keys(round_id, packed=False):
+    """
+    Current rollup keys of a round's hole scores.
+
+    Args:
+        round_id (int): ID of the round
+        packed (bool): Whether the round's scores are packed
+
+    Returns:
+        list: (player id, course id, hole id, date) tuples
+    """
+    if packed:
+        fields = ("round__player_id", "round__course_id", "hole_id", "day")
+        return [
+            tuple(row[name] for name in fields)
+            for row in packed_score_rows(Round.objects.filter(pk=round_id))
+        ]
+    return list(
+        HoleScore.objects.filter(round_id=round_id)
+        .annotate(day=TruncDate("round__date_played"))
+        .values_list("round__player_id", "round__course_id", "hole_id", "day")
+    )
@@ -0,0 +1,367 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Compact packed storage for completed rounds' scores      ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module stores a completed round's hole scores in one column instead
+of one HoleScore row per hole. With SCORE_PACKING_ENABLED, a daily task
+packs rounds completed more than SCORE_PACKING_AFTER_DAYS ago: their
+scores are encoded into Round.packed_scores and the HoleScore rows are
+deleted, so round history reads one row per round.
+
+Each hole takes three bytes after a one-byte format version:
+
+    byte 0   hole number (bits 0-4), fairway hit (bit 5), GIR (bit 6)
+    byte 1   strokes
+    byte 2   putts (bits 0-3), penalties (bits 4-7)
+
+Rounds with values that do not fit stay unpacked, as do rounds with
+scores on another tee's holes, since a packed round's hole numbers are
+read against its own tee. Stored totals
+(strokes_total, holes_played) are set when a round is packed and left
+alone while it stays packed. The HoleScore rows are deleted inside
+packing(), which the delete signal handlers check: only the storage
+moves, so totals, rollups and standings have nothing to update.
+
+Round.scores() decodes a packed round into unsaved HoleScore instances,
+so Round's aggregate properties work either way, and decode_rows() feeds
+packed rounds to the aggregates that otherwise run over HoleScore in SQL
+(rollups, stats, tournaments). Any write to a packed round unpacks it
+first, recreating its HoleScore rows.
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+RECORD_SIZE = 3
+FAIRWAY_BIT = 0x20
+GREEN_BIT = 0x40
+HOLE_NUMBER_MASK = 0x1F
+
+_state = threading.local()
+
+PackedScore = namedtuple(
+    "PackedScore",
+    [
+        "hole_number",
+        "strokes",
+        "putts",
+        "fairway_hit",
+        "green_in_regulation",
+        "penalties",
+    ],
+)
+
+
+@contextmanager
+def packing():
+    """
+    Mark hole score deletes in this thread as moves into packed storage.
+
+    Signal handlers skip such deletes (see is_packing()).
+    """
+    _state.depth = getattr(_state, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+def is_packing():
+    """
+    Whether this thread is deleting hole scores that are being packed.
+
+    Returns:
+        bool: True inside packing()
+    """
+    return getattr(_state, "depth", 0) > 0
+
+
+def pack(scores):
+    """
+    Encode hole scores.
+
+    Args:
+        scores (iterable): PackedScore-like tuples
+
+    Returns:
+        bytes: Packed scores
+
+    Raises:
+        ValueError: If a value does not fit its field
+    """
+    data = bytearray([FORMAT_VERSION])
+    for score in scores:
+        score = PackedScore(*score)
+        if not 1 <= score.hole_number <= HOLE_NUMBER_MASK:
+            raise ValueError(f"hole number {score.hole_number} cannot be packed")
+        if not 0 <= score.strokes <= 0xFF:
+            raise ValueError(f"strokes {score.strokes} cannot be packed")
+        if not (0 <= score.putts <= 0x0F and 0 <= score.penalties <= 0x0F):
+            raise ValueError("putts and penalties must be between 0 and 15")
+        data.append(
+            score.hole_number
+            | (FAIRWAY_BIT if score.fairway_hit else 0)
+            | (GREEN_BIT if score.green_in_regulation else 0)
+        )
+        data.append(score.strokes)
+        data.append(score.putts | score.penalties << 4)
+    return bytes(data)
+
+
+def unpack(data):
+    """
+    Decode packed hole scores.
+
+    Args:
+        data (bytes or memoryview): Output of pack()
+
+    Returns:
+        list: PackedScore tuples in stored order
+
+    Raises:
+        ValueError: If the data is not in a known format
+    """
+    data = bytes(data)
+    if not data or data[0] != FORMAT_VERSION or (len(data) - 1) % RECORD_SIZE:
+        raise ValueError("Unknown packed score format")
+    return [
+        PackedScore(
+            flags & HOLE_NUMBER_MASK,
+            strokes,
+            extra & 0x0F,
+            bool(flags & FAIRWAY_BIT),
+            bool(flags & GREEN_BIT),
+            extra >> 4,
+        )
+        for flags, strokes, extra in zip(data[1::3], data[2::3], data[3::3])
+    ]
+
+
+def _holes_by_tee(tee_ids):
+    """Tee ID -> hole number -> Hole, in one query."""
+    from .models import Hole
+
+    holes = {}
+    for hole in Hole.objects.filter(tee_id__in=set(tee_ids)).order_by():
+        holes.setdefault(hole.tee_id, {})[hole.hole_number] = hole
+    return holes
+
+
+def unpack_round_scores(round_obj):
+    """
+    A packed round's scores as unsaved HoleScore instances, in hole order.
+
+    Scores for holes no longer on the tee are dropped, as deleting a hole
+    deletes its HoleScore rows.
+
+    Args:
+        round_obj: Round with packed_scores set
+
+    Returns:
+        list: HoleScore instances with round and hole set
+    """
+    from .models import HoleScore
+
+    holes = _holes_by_tee([round_obj.tee_id]).get(round_obj.tee_id, {})
+    scores = [
+        HoleScore(
+            round=round_obj,
+            hole=holes[score.hole_number],
+            strokes=score.strokes,
+            putts=score.putts,
+            fairway_hit=score.fairway_hit,
+            green_in_regulation=score.green_in_regulation,
+            penalties=score.penalties,
+        )
+        for score in unpack(round_obj.packed_scores)
+        if score.hole_number in holes
+    ]
+    return sorted(scores, key=lambda score: score.hole.hole_number)
+
+
+def decode_rows(rows):
+    """
+    Per-hole rows of packed rounds, shaped like HoleScore values.
+
+    Args:
+        rows (iterable): (round id, player id, course id, tee id, date
+            played, packed scores) tuples of packed rounds
+
+    Yields:
+        dict: round_id, round__player_id, round__course_id, day, hole_id,
+            hole__hole_number, hole__par, strokes, putts, fairway_hit,
+            green_in_regulation and penalties
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    holes = _holes_by_tee(row[3] for row in rows)
+    for round_id, player_id, course_id, tee_id, date_played, data in rows:
+        tee_holes = holes.get(tee_id, {})
+        day = timezone.localtime(date_played).date()
+        for score in unpack(data):
+            hole = tee_holes.get(score.hole_number)
+            if hole is None:
+                continue
+            yield {
+                "round_id": round_id,
+                "round__player_id": player_id,
+                "round__course_id": course_id,
+                "day": day,
+                "hole_id": hole.id,
+                "hole__hole_number": hole.hole_number,
+                "hole__par": hole.par,
+                "strokes": score.strokes,
+                "putts": score.putts,
+                "fairway_hit": score.fairway_hit,
+                "green_in_regulation": score.green_in_regulation,
+                "penalties": score.penalties,
+            }
+
+
+def packed_score_rows(rounds):
+    """
+    Per-hole rows of the packed rounds in a queryset (see decode_rows()).
+
+    Args:
+        rounds (QuerySet): Rounds to read; unpacked ones are skipped
+
+    Returns:
+        generator: Rows shaped like HoleScore values
+    """
+    return decode_rows(
+        rounds.filter(packed_scores__isnull=False)
+        .order_by()
+        .values_list(
+            "id", "player_id", "course_id", "tee_id", "date_played", "packed_scores"
+        )
+    )
+
+
+def pack_round(round_id):
+    """
+    Move a completed round's hole scores into its packed column.
+
+    The daily rollups must already include the round's scores; its rows
+    are deleted inside packing(), so no rollup changes are recorded.
+
+    Args:
+        round_id (int): ID of the round
+
+    Returns:
+        bool: Whether the round was packed
+    """
+    from .models import HoleScore, Round
+
+    with transaction.atomic():
+        round_obj = (
+            Round.objects.select_for_update()
+            .filter(pk=round_id, is_complete=True, packed_scores__isnull=True)
+            .first()
+        )
+        if round_obj is None:
+            return False
+        rows = list(
+            HoleScore.objects.filter(round_id=round_id).values_list(
+                "hole__tee_id",
+                "hole__hole_number",
+                "strokes",
+                "putts",
+                "fairway_hit",
+                "green_in_regulation",
+                "penalties",
+            )
+        )
+        if not rows:
+            return False
+        if any(row[0] != round_obj.tee_id for row in rows):
+            logger.info("Round %s left unpacked: scores on another tee", round_id)
+            return False
+        scores = [row[1:] for row in rows]
+        try:
+            data = pack(scores)
+        except ValueError as e:
+            logger.info("Round %s left unpacked: %s", round_id, e)
+            return False
+
+        Round.objects.filter(pk=round_id).update(
+            packed_scores=data,
+            strokes_total=sum(score[1] for score in scores),
+            holes_played=len(scores),
+        )
+        with packing():
+            HoleScore.objects.filter(round_id=round_id).delete()
+    return True
+
+
+def unpack_round(round_obj):
+    """
+    Recreate a packed round's HoleScore rows before it is written to.
+
+    Args:
+        round_obj: Round to unpack; left alone if it is not packed
+    """
+    from .models import HoleScore, Round
+
+    if round_obj.packed_scores is None:
+        return
+    with transaction.atomic():
+        locked = (
+            Round.objects.select_for_update()
+            .filter(pk=round_obj.pk, packed_scores__isnull=False)
+            .first()
+        )
+        if locked is not None:
+            HoleScore.objects.bulk_create(locked.scores())
+            Round.objects.filter(pk=round_obj.pk).update(packed_scores=None)
+    round_obj.packed_scores = None
+    round_obj.__dict__.pop("_unpacked_scores", None)
+
+
+def pack_completed_rounds(now=None):
+    """
+    Pack rounds completed more than SCORE_PACKING_AFTER_DAYS ago.
+
+    Does nothing unless SCORE_PACKING_ENABLED is set.
+
+    Args:
+        now (datetime, optional): Current time
+
+    Returns:
+        int: Number of rounds packed
+    """
+    from .models import Round
+
+    if not getattr(settings, "SCORE_PACKING_ENABLED", False):
+        return 0
+    days = getattr(settings, "SCORE_PACKING_AFTER_DAYS", 30)
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    batch = getattr(settings, "SCORE_PACKING_BATCH_SIZE", 5000)
+    round_ids = list(
+        Round.objects.filter(
+            is_complete=True, packed_scores__isnull=True, updated_at__lt=cutoff
+        )
+        # Scores edited since the cutoff may not have reached the rollups yet
+        .exclude(hole_scores__updated_at__gte=cutoff)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch]
+    )
+    return sum(pack_round(round_id) for round_id in round_ids)
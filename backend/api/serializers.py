@@ -12,12 +12,13 @@
 
 This module contains serializer classes for transforming database models
 into JSON representations and validating incoming data for the REST API.
-It includes serializers for users, courses, holes, tees, and authentication.
+It includes serializers for users, courses, holes, tees, tournaments, and
+authentication.
 """
 
 from .models import User
 from rest_framework import serializers
-from .models import Course, Hole, Tee, Round
+from .models import Course, Hole, Tee, Round, Tournament
 from rest_framework.permissions import IsAuthenticated
 
 
@@ -153,3 +154,37 @@ class CourseSerializer(serializers.ModelSerializer):
             "longitude",
             "tees",
         ]
+
+
+class TournamentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for tournaments.
+
+    Validates that the tee belongs to the course and that the window ends
+    after it starts.
+    """
+
+    class Meta:
+        model = Tournament
+        fields = ["id", "name", "course", "tee", "starts_at", "ends_at"]
+
+    def validate(self, data):
+        """
+        Check the tee and date window.
+
+        Args:
+            data (dict): Field values
+
+        Returns:
+            dict: The validated data
+
+        Raises:
+            ValidationError: If the tee or window is invalid
+        """
+        if data["tee"].course_id != data["course"].id:
+            raise serializers.ValidationError({"tee": "Tee is not on this course"})
+        if data["ends_at"] <= data["starts_at"]:
+            raise serializers.ValidationError(
+                {"ends_at": "ends_at must be after starts_at"}
+            )
+        return data
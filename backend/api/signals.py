@@ -0,0 +1,215 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Cache invalidation on round and score writes             ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module connects model signals that keep derived data in sync with
+round and user writes. It is imported from ApiConfig.ready().
+
+Daily rollups pick up most writes from updated_at on their own; the
+handlers here only record the old keys of deletes and moved rounds, which
+leave nothing newer behind (see rollups.py).
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import AUTH_VERSION_KEY, forget_user
+from .chat_context import invalidate_golfer_profile
+from .catalog import bump_catalog_version
+from .leaderboard import queue_leaderboard_update
+from .models import Course, Hole, HoleScore, Round, Tee, User
+from .rollups import record_stale_keys, round_keys
+from .score_packing import is_packing
+from .stats import invalidate_player_stats
+from .tournaments import queue_standings_update
+
+logger = logging.getLogger(__name__)
+
+
+def _round_player_id(score):
+    """
+    Find the player a hole score belongs to without reloading a cached round.
+
+    Args:
+        score: HoleScore instance
+
+    Returns:
+        int or None: ID of the player who played the round
+    """
+    if HoleScore.round.is_cached(score):
+        return score.round.player_id
+    return (
+        Round.objects.filter(pk=score.round_id)
+        .values_list("player_id", flat=True)
+        .first()
+    )
+
+
+def _queue_retrieval_update(round_id):
+    """Re-embed a round for chat retrieval, once per burst of writes."""
+    if not getattr(settings, "CHAT_RETRIEVAL_ENABLED", False):
+        return
+    if not cache.add(f"retrieval:pending:{round_id}", 1, timeout=60):
+        return
+
+    from .tasks import index_rounds_for_retrieval
+
+    try:
+        index_rounds_for_retrieval.delay([round_id])
+    except Exception as e:
+        cache.delete(f"retrieval:pending:{round_id}")
+        logger.warning("Unable to queue retrieval update for round %s: %s", round_id, e)
+
+
+def round_changed(player_id, round_id=None):
+    """
+    Invalidate everything derived from a player's rounds once the write commits.
+
+    Args:
+        player_id (int): ID of the player whose rounds changed
+        round_id (int, optional): ID of the round that changed
+    """
+    if player_id is None:
+        return
+
+    def invalidate():
+        invalidate_golfer_profile(player_id)
+        invalidate_player_stats(player_id)
+        queue_leaderboard_update()
+        if round_id is not None:
+            queue_standings_update(player_id, round_id)
+            _queue_retrieval_update(round_id)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver([post_save, post_delete], sender=Round)
+def round_saved_or_deleted(sender, instance, **kwargs):
+    """Refresh derived data when a round is written or removed."""
+    round_changed(instance.player_id, instance.id)
+
+
+@receiver([post_save, post_delete], sender=HoleScore)
+def hole_score_saved_or_deleted(sender, instance, **kwargs):
+    """Refresh derived data when a hole score is written or removed."""
+    if is_packing():
+        return  # moved into packed storage, nothing derived changes
+    round_changed(_round_player_id(instance), instance.round_id)
+
+
+@receiver(post_save, sender=HoleScore)
+def hole_score_totals(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the round's stored strokes_total and holes_played current.
+
+    Adds the change in strokes to the stored totals when the previous value
+    is known, so concurrent writers to one hole score should lock its row.
+    """
+    round_id, strokes = getattr(instance, "_loaded_score", (None, None))
+    if raw:
+        Round.refresh_totals([instance.round_id])
+    elif created:
+        Round.add_to_totals(instance.round_id, instance.strokes, 1)
+    elif round_id == instance.round_id and strokes is not None:
+        if instance.strokes != strokes:
+            Round.add_to_totals(instance.round_id, instance.strokes - strokes, 0)
+    else:
+        Round.refresh_totals({instance.round_id, round_id} - {None})
+    instance._loaded_score = instance.counted_score()
+
+
+@receiver(post_delete, sender=HoleScore)
+def hole_score_deleted_totals(sender, instance, origin=None, **kwargs):
+    """Take a deleted hole score out of its round's stored totals."""
+    if is_packing():
+        return  # pack_round() stores the totals itself
+    if isinstance(origin, Round) or getattr(origin, "model", None) is Round:
+        return  # the round itself is going away
+    round_id, strokes = getattr(instance, "_loaded_score", instance.counted_score())
+    if round_id is None or strokes is None:
+        Round.refresh_totals([instance.round_id])
+    else:
+        Round.add_to_totals(round_id, -strokes, -1)
+
+
+@receiver(pre_save, sender=Round)
+def round_moved_rollup_keys(sender, instance, raw=False, **kwargs):
+    """Queue a round's current rollup keys before it moves to other ones."""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    stored = (
+        Round.objects.filter(pk=instance.pk)
+        .values_list("player_id", "course_id", "date_played", "packed_scores")
+        .first()
+    )
+    if stored is None:
+        return
+    player_id, course_id, date_played, packed_scores = stored
+    moved = (
+        player_id != instance.player_id
+        or course_id != instance.course_id
+        or timezone.localdate(date_played) != timezone.localdate(instance.date_played)
+    )
+    if moved:
+        record_stale_keys(round_keys(instance.pk, packed=packed_scores is not None))
+
+
+@receiver(pre_delete, sender=Round)
+def round_deleted_rollup_keys(sender, instance, **kwargs):
+    """Queue a round's rollup keys before it disappears."""
+    packed = instance.packed_scores is not None
+    record_stale_keys(round_keys(instance.pk, packed=packed))
+
+
+@receiver(post_delete, sender=HoleScore)
+def hole_score_rollup_key(sender, instance, origin=None, **kwargs):
+    """Queue the rollup key of a deleted hole score."""
+    if is_packing():
+        return  # the rollups already include the packed scores
+    if isinstance(origin, Round) or getattr(origin, "model", None) is Round:
+        return  # round_deleted_rollup_keys queued the whole round
+    round_key = (
+        Round.objects.filter(pk=instance.round_id)
+        .annotate(day=TruncDate("date_played"))
+        .values_list("player_id", "course_id", "day")
+        .first()
+    )
+    if round_key is not None:
+        player_id, course_id, day = round_key
+        record_stale_keys([(player_id, course_id, instance.hole_id, day)])
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Tee)
+@receiver([post_save, post_delete], sender=Hole)
+def catalog_changed(sender, **kwargs):
+    """Rebuild the course catalog after a course, tee or hole write commits."""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Drop cached user state and publish the user's current auth_version."""
+    forget_user(instance.id, instance.auth_version)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Make tokens for a deleted user fail on their next request."""
+    forget_user(instance.id)
+    cache.delete(AUTH_VERSION_KEY.format(user_id=instance.id))
@@ -0,0 +1,587 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Cached player statistics for the profile page            ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module computes the statistics shown by UserStats: averages over a
+player's last ten rounds, a handicap estimate and the hole-by-hole scores
+list. The result is built from plain value tuples with two queries,
+stored in the cache backend and served from there until one of the
+player's rounds or hole scores changes (see signals.py).
+
+It also answers trend questions for PlayerTrendsView entirely in SQL:
+rolling 30/90/365-day averages with conditional aggregates, day, week or
+month series for any date range with one grouped query, and a per-day
+moving average of score with a window function. Windows, series and the
+score trend all read the daily rollup tables (see rollups.py) rather
+than raw hole scores, as does the course dashboard behind CourseStatsView. Hole difficulty reads
+the all-time HoleStats table the same way.
+"""
+
+import builtins
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, Sum, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import RowNumber, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import (
+    CourseDailyStats,
+    HoleDailyStats,
+    HoleScore,
+    HoleStats,
+    PlayerDailyStats,
+    Round,
+    User,
+)
+from .rollups import HOLE_STATS_FIELDS, ROLLUP_FIELDS
+from .score_packing import decode_rows
+
+STATS_KEY = "player-stats:{user_id}"
+RECENT_ROUNDS = 10
+
+# Hole score columns read for the stats, keyed by round
+SCORE_FIELDS = (
+    "round_id",
+    "hole__hole_number",
+    "hole__par",
+    "strokes",
+    "putts",
+    "fairway_hit",
+    "green_in_regulation",
+    "penalties",
+)
+
+PERIODS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+WINDOW_DAYS = (30, 90, 365)
+
+EMPTY_STATS = {
+    "handicap": None,
+    "avg_putts_per_round": 0,
+    "avg_penalities_per_round": 0,
+    "avg_score_per_round": 0,
+    "fairway_hit_percentage": 0,
+    "gir_percentage": 0,
+    "scores_list": [],
+}
+
+
+def _handicap(rounds):
+    """
+    Handicap estimate from a player's recent rounds.
+
+    Args:
+        rounds (list): (strokes, holes, course rating, slope rating) of each
+            of the player's last RECENT_ROUNDS rounds
+
+    Returns:
+        float or None: Handicap index, None without a 9 or 18-hole round
+    """
+    differentials = []
+    for strokes, holes, course_rating, slope_rating in rounds:
+        if holes == 9:
+            strokes *= 2
+        elif holes != 18:
+            continue
+        differentials.append((strokes - course_rating) * 113 / slope_rating)
+
+    best_differentials = sorted(differentials)[: max(1, len(rounds) // 2)]
+    if not best_differentials:
+        return None
+    return builtins.round((sum(best_differentials) / len(best_differentials)) * 0.96, 2)
+
+
+def build_player_stats(user_id):
+    """
+    Compute a player's statistics straight from the database.
+
+    Args:
+        user_id (int): ID of the player
+
+    Returns:
+        dict: Statistics in the UserStats response format, or None if the
+            player does not exist
+    """
+    rounds = list(
+        Round.objects.filter(player_id=user_id)
+        .order_by("-date_played")
+        .values_list(
+            "id",
+            "date_played",
+            "notes",
+            "course__course_name",
+            "tee__course_rating",
+            "tee__slope_rating",
+            "tee_id",
+            "packed_scores",
+        )[:RECENT_ROUNDS]
+    )
+    round_count = len(rounds)
+
+    if round_count == 0:
+        if not User.objects.filter(id=user_id).exists():
+            return None
+        return dict(EMPTY_STATS)
+
+    scores_by_round = {}
+    for round_id, *values in HoleScore.objects.filter(
+        round_id__in=[row[0] for row in rounds]
+    ).values_list(*SCORE_FIELDS):
+        scores_by_round.setdefault(round_id, []).append(values)
+    packed = decode_rows(
+        (row[0], user_id, None, row[6], row[1], row[7])
+        for row in rounds
+        if row[7] is not None
+    )
+    for row in packed:
+        scores_by_round.setdefault(row["round_id"], []).append(
+            [row[name] for name in SCORE_FIELDS[1:]]
+        )
+
+    p, pen, s, fir, gir = 0, 0, 0, 0, 0
+    handicap_rounds = []
+    scores_list = []
+
+    for row in rounds:
+        round_id, date_played, notes, course_name, course_rating, slope_rating = row[:6]
+        scores = scores_by_round.get(round_id, [])
+        num_holes = len(scores)
+        total_score = sum(score[2] for score in scores)
+        p += sum(score[3] for score in scores)
+        pen += sum(score[6] for score in scores)
+        s += total_score
+        if num_holes:
+            fir += builtins.round(sum(score[4] for score in scores) / num_holes * 100, 2)
+            gir += builtins.round(sum(score[5] for score in scores) / num_holes * 100, 2)
+
+        scores_list.append(
+            {
+                "round_id": round_id,
+                "date": date_played,
+                "course": course_name,
+                "scores": [
+                    {
+                        "hole": hole,
+                        "par": par,
+                        "strokes": strokes,
+                        "putts": putts,
+                        "fairway_hit": fairway_hit,
+                        "green_in_regulation": green_in_regulation,
+                        "penalties": penalties,
+                        "date": date_played,
+                    }
+                    for (
+                        hole,
+                        par,
+                        strokes,
+                        putts,
+                        fairway_hit,
+                        green_in_regulation,
+                        penalties,
+                    ) in scores
+                ],
+                "note": notes,
+            }
+        )
+
+        handicap_rounds.append((total_score, num_holes, course_rating, slope_rating))
+
+    return {
+        "handicap": _handicap(handicap_rounds),
+        "avg_putts_per_round": p / round_count,
+        "avg_penalities_per_round": pen / round_count,
+        "avg_score_per_round": s / round_count,
+        "fairway_hit_percentage": fir / round_count,
+        "gir_percentage": gir / round_count,
+        "scores_list": scores_list,
+    }
+
+
+def get_player_stats(user_id):
+    """
+    Return a player's cached statistics, building them if needed.
+
+    Args:
+        user_id (int): ID of the player
+
+    Returns:
+        dict: Statistics in the UserStats response format, or None if the
+            player does not exist
+    """
+    key = STATS_KEY.format(user_id=user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_player_stats(user_id)
+        if stats is not None:
+            cache.set(
+                key, stats, getattr(settings, "PLAYER_STATS_CACHE_TIMEOUT", 24 * 60 * 60)
+            )
+    return stats
+
+
+def player_handicaps(user_ids):
+    """
+    Handicap indexes of several players, as their stats report them.
+
+    Cached stats are read in one round trip; the other players' handicaps
+    come from the stored totals of their recent rounds in one query.
+
+    Args:
+        user_ids (iterable): IDs of the players
+
+    Returns:
+        dict: Player ID -> handicap index, or None without one
+    """
+    keys = {user_id: STATS_KEY.format(user_id=user_id) for user_id in set(user_ids)}
+    cached = cache.get_many(keys.values())
+    handicaps = {
+        user_id: cached[key]["handicap"]
+        for user_id, key in keys.items()
+        if key in cached
+    }
+    missing = [user_id for user_id in keys if user_id not in handicaps]
+    if not missing:
+        return handicaps
+
+    rows = list(
+        Round.objects.filter(player_id__in=missing)
+        .annotate(
+            recent=Window(
+                RowNumber(),
+                partition_by=F("player_id"),
+                order_by=F("date_played").desc(),
+            )
+        )
+        .filter(recent__lte=RECENT_ROUNDS)
+        .order_by("player_id", "recent")
+        .values_list(
+            "id",
+            "player_id",
+            "strokes_total",
+            "holes_played",
+            "tee__course_rating",
+            "tee__slope_rating",
+        )
+    )
+    # Rounds saved before totals were stored, until they are backfilled
+    backfill = Round.computed_totals(
+        [row[0] for row in rows if row[2] is None or row[3] is None]
+    )
+    recent = {}
+    for round_id, player_id, strokes, holes, course_rating, slope_rating in rows:
+        strokes, holes = backfill.get(round_id, (strokes, holes))
+        recent.setdefault(player_id, []).append(
+            (strokes, holes, course_rating, slope_rating)
+        )
+    for user_id in missing:
+        handicaps[user_id] = _handicap(recent.get(user_id, []))
+    return handicaps
+
+
+def invalidate_player_stats(user_id):
+    """
+    Drop a player's cached statistics so the next request rebuilds them.
+
+    Args:
+        user_id (int): ID of the player
+    """
+    cache.delete(STATS_KEY.format(user_id=user_id))
+
+
+def _totals(filter=None):
+    """
+    Sums of daily rollup columns, optionally restricted by a Q filter.
+
+    Args:
+        filter (Q, optional): Condition applied to every aggregate
+
+    Returns:
+        dict: Aggregate expressions keyed by rollup field
+    """
+    return {name: Sum(name, filter=filter) for name in ROLLUP_FIELDS}
+
+
+def _averages(totals):
+    """
+    Turn raw totals into per-round and percentage figures.
+
+    Args:
+        totals (dict): Output of the aggregates from _totals()
+
+    Returns:
+        dict: Rounds, average score, putts and penalties per round,
+            fairway and GIR percentages (None when there are no rounds)
+    """
+    rounds = totals["rounds"] or 0
+    holes = totals["holes"] or 0
+    if not rounds:
+        return {
+            "rounds": 0,
+            "avg_score": None,
+            "putts_per_round": None,
+            "penalties_per_round": None,
+            "fairway_pct": None,
+            "gir_pct": None,
+        }
+    return {
+        "rounds": rounds,
+        "avg_score": builtins.round(totals["strokes"] / rounds, 1),
+        "putts_per_round": builtins.round(totals["putts"] / rounds, 1),
+        "penalties_per_round": builtins.round(totals["penalties"] / rounds, 1),
+        "fairway_pct": builtins.round(totals["fairways"] / holes * 100, 1),
+        "gir_pct": builtins.round(totals["greens"] / holes * 100, 1),
+    }
+
+
+def rolling_windows(user_id, days=WINDOW_DAYS, end=None):
+    """
+    Averages over the last N days for several N, in one query.
+
+    Args:
+        user_id (int): ID of the player
+        days (tuple): Window lengths in days
+        end (date, optional): Last day of every window, defaults to today
+
+    Returns:
+        dict: Window length (as a string) -> averages from _averages()
+    """
+    end = end or timezone.localdate()
+    aggregates = {}
+    for window in days:
+        in_window = Q(day__gt=end - timedelta(days=window))
+        for name, expression in _totals(in_window).items():
+            aggregates[f"{name}_{window}"] = expression
+
+    row = PlayerDailyStats.objects.filter(player_id=user_id, day__lte=end).aggregate(
+        **aggregates
+    )
+
+    return {
+        str(window): _averages(
+            {name: row[f"{name}_{window}"] for name in _totals()}
+        )
+        for window in days
+    }
+
+
+def time_series(user_id, period, start, end):
+    """
+    Averages per day, week or month over a date range, in one query.
+
+    Args:
+        user_id (int): ID of the player
+        period (str): "day", "week" or "month"
+        start (date): First day included
+        end (date): Last day included
+
+    Returns:
+        dict: Parallel lists keyed by metric, one entry per bucket with rounds
+    """
+    rows = (
+        PlayerDailyStats.objects.filter(player_id=user_id, day__range=(start, end))
+        .annotate(bucket=PERIODS[period]("day"))
+        .values("bucket")
+        .annotate(**_totals())
+        .order_by("bucket")
+    )
+
+    series = {
+        "bucket": [],
+        "rounds": [],
+        "avg_score": [],
+        "putts_per_round": [],
+        "penalties_per_round": [],
+        "fairway_pct": [],
+        "gir_pct": [],
+    }
+    for row in rows:
+        series["bucket"].append(row["bucket"])
+        for name, value in _averages(row).items():
+            series[name].append(value)
+    return series
+
+
+def score_trend(user_id, start, end, window=5):
+    """
+    Each day's score with a moving average over the previous days played.
+
+    Read from the daily rollups like the windows and series, so the three
+    always agree. A day's score is its average over the rounds played
+    that day; the moving average is weighted by rounds.
+
+    Args:
+        user_id (int): ID of the player
+        start (date): First day included
+        end (date): Last day included
+        window (int): Days played in the moving average
+
+    Returns:
+        dict: Parallel lists of dates, scores and moving averages
+    """
+    frame = RowRange(start=-(window - 1), end=0)
+    rows = (
+        PlayerDailyStats.objects.filter(
+            player_id=user_id, day__range=(start, end), rounds__gt=0
+        )
+        .annotate(
+            window_strokes=Window(Sum("strokes"), order_by=F("day").asc(), frame=frame),
+            window_rounds=Window(Sum("rounds"), order_by=F("day").asc(), frame=frame),
+        )
+        .order_by("day")
+        .values_list("day", "strokes", "rounds", "window_strokes", "window_rounds")
+    )
+
+    trend = {"date": [], "score": [], "moving_avg": []}
+    for day, strokes, rounds, window_strokes, window_rounds in rows:
+        trend["date"].append(day)
+        trend["score"].append(builtins.round(strokes / rounds, 1))
+        trend["moving_avg"].append(builtins.round(window_strokes / window_rounds, 1))
+    return trend
+
+
+def player_trends(user_id, period="week", start=None, end=None, window=5):
+    """
+    Rolling windows, a bucketed series and a score trend for one player.
+
+    Args:
+        user_id (int): ID of the player
+        period (str): "day", "week" or "month"
+        start (date, optional): First day of the series, defaults to a year before end
+        end (date, optional): Last day of the series, defaults to today
+        window (int): Days played in the score moving average
+
+    Returns:
+        dict: Trends in the PlayerTrendsView response format
+    """
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=365)
+    return {
+        "period": period,
+        "start": start,
+        "end": end,
+        "windows": rolling_windows(user_id, end=end),
+        "series": time_series(user_id, period, start, end),
+        "trend": score_trend(user_id, start, end, window),
+    }
+
+
+def course_stats(course_id, start, end):
+    """
+    Scoring on a course over a date range, overall and per hole.
+
+    Args:
+        course_id (int): ID of the course
+        start (date): First day included
+        end (date): Last day included
+
+    Returns:
+        dict: Course averages and one entry per hole with scores, ordered by
+            tee and hole number
+    """
+    totals = CourseDailyStats.objects.filter(
+        course_id=course_id, day__range=(start, end)
+    ).aggregate(**_totals())
+
+    holes = []
+    rows = (
+        HoleDailyStats.objects.filter(
+            hole__tee__course_id=course_id, day__range=(start, end)
+        )
+        .values("hole_id", "hole__hole_number", "hole__par", "hole__tee__tee_name")
+        .annotate(**_totals())
+        .order_by("hole__tee__tee_name", "hole__hole_number")
+    )
+    for row in rows:
+        played = row["holes"]
+        holes.append(
+            {
+                "hole_id": row["hole_id"],
+                "tee": row["hole__tee__tee_name"],
+                "hole_number": row["hole__hole_number"],
+                "par": row["hole__par"],
+                "scores": played,
+                "avg_strokes": builtins.round(row["strokes"] / played, 2),
+                "avg_to_par": builtins.round((row["strokes"] - row["par"]) / played, 2),
+                "avg_putts": builtins.round(row["putts"] / played, 2),
+                "fairway_pct": builtins.round(row["fairways"] / played * 100, 1),
+                "gir_pct": builtins.round(row["greens"] / played * 100, 1),
+            }
+        )
+
+    summary = _averages(totals)
+    summary["avg_to_par"] = (
+        builtins.round((totals["strokes"] - totals["par"]) / totals["rounds"], 1)
+        if totals["rounds"]
+        else None
+    )
+    return {"start": start, "end": end, "summary": summary, "holes": holes}
+
+
+def hole_difficulty(course_id, tee_id=None):
+    """
+    How hard each hole on a course plays, from every score recorded on it.
+
+    Holes are ranked within their tee by average score over par, 1 being
+    the hardest, next to the stroke index the course publishes.
+
+    Args:
+        course_id (int): ID of the course
+        tee_id (int, optional): Only holes on this tee
+
+    Returns:
+        list: One entry per hole with scores, ordered by tee and hole number
+    """
+    rows = HoleStats.objects.filter(hole__tee__course_id=course_id, scores__gt=0)
+    if tee_id is not None:
+        rows = rows.filter(hole__tee_id=tee_id)
+    rows = rows.values(
+        "hole_id",
+        "hole__tee_id",
+        "hole__tee__tee_name",
+        "hole__hole_number",
+        "hole__par",
+        "hole__handicap",
+        *HOLE_STATS_FIELDS,
+    ).order_by("hole__tee__tee_name", "hole__tee_id", "hole__hole_number")
+
+    holes = []
+    for row in rows:
+        played = row["scores"]
+        holes.append(
+            {
+                "hole_id": row["hole_id"],
+                "tee_id": row["hole__tee_id"],
+                "tee": row["hole__tee__tee_name"],
+                "hole_number": row["hole__hole_number"],
+                "par": row["hole__par"],
+                "handicap": row["hole__handicap"],
+                "scores": played,
+                "avg_strokes": builtins.round(row["strokes"] / played, 2),
+                "avg_to_par": builtins.round(
+                    row["strokes"] / played - row["hole__par"], 2
+                ),
+                "avg_putts": builtins.round(row["putts"] / played, 2),
+                "fairway_pct": builtins.round(row["fairways"] / played * 100, 1),
+                "gir_pct": builtins.round(row["greens"] / played * 100, 1),
+                "blow_up_pct": builtins.round(row["blow_ups"] / played * 100, 1),
+            }
+        )
+
+    by_tee = {}
+    for hole in holes:
+        by_tee.setdefault(hole["tee_id"], []).append(hole)
+    for tee_holes in by_tee.values():
+        ranked = sorted(tee_holes, key=lambda h: (-h["avg_to_par"], h["hole_number"]))
+        for rank, hole in enumerate(ranked, start=1):
+            hole["difficulty_rank"] = rank
+    return holes
@@ -5,39 +5,179 @@
 ║ Author : Brodie Rogers                                             ║
 ║ Contact : Brodieman500@gmail.com                                   ║
 ║ Created : 05-06-2025                                               ║
-║ Purpose : Scheduled tasks for user status management               ║
+║ Purpose : Celery tasks for presence, rollups and background jobs   ║
 ║ Notes : Ollama is the best                                         ║
 ╚════════════════════════════════════════════════════════════════════╝
 
-This module contains Celery tasks for managing user online status.
-It automatically updates users to offline status after a period of inactivity.
+This module contains the app's Celery tasks: flushing presence heartbeats
+to the users table, refreshing the daily rollups, publishing leaderboard
+deltas, updating tournament standings, packing completed rounds, purging
+idempotency keys, keeping Ollama models warm and maintaining the chat
+retrieval index. Each task imports its module lazily and returns a short
+summary for the worker log.
 """
 
 from celery import shared_task
-from django.utils import timezone
-from django.conf import settings
-from datetime import timedelta
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
 
 
 @shared_task
-def update_user_status():
+def flush_user_presence():
     """
-    Celery task to update user online status.
+    Celery task to copy presence heartbeats to the users table.
 
-    Identifies users who have been inactive beyond the timeout period
-    (default: 15 minutes) and updates their status to offline.
+    Writes last_login for users seen since the previous run and marks users
+    offline once they have been inactive beyond the timeout (default: 15
+    minutes), in two bulk updates.
 
     Returns:
         str: Message indicating how many users were updated
     """
-    timeout = getattr(settings, "USER_ONLINE_TIMEOUT", 15 * 60)
-    cutoff_time = timezone.now() - timedelta(seconds=timeout)
+    from .presence import flush_to_database
+
+    updated, offline = flush_to_database()
+    return f"Updated last seen for {updated} users, {offline} users went offline"
+
+
+@shared_task
+def refresh_daily_rollups():
+    """
+    Celery task to bring the daily player, course and hole rollups up to date.
+
+    Recomputes the days touched by hole scores and rounds written since the
+    previous run, including late edits to old rounds and deletions.
+
+    Returns:
+        str: Message indicating how many rollup rows changed per scope
+    """
+    from .rollups import refresh_rollups
 
-    updated = User.objects.filter(is_online=True, last_login__lt=cutoff_time).update(
-        is_online=False
+    changed = refresh_rollups()
+    return "Daily rollups: " + ", ".join(
+        f"{scope}={count}" for scope, count in changed.items()
     )
 
-    return f"Updated {updated} users to offline status"
+
+@shared_task
+def publish_leaderboard():
+    """
+    Celery task to push a leaderboard delta to live watchers.
+
+    Returns:
+        str: Message indicating the published version, if any
+    """
+    from django.core.cache import cache
+
+    from .leaderboard import PENDING_KEY, publish_leaderboard as publish
+
+    # Writes from here on queue another run
+    cache.delete(PENDING_KEY)
+    delta = publish()
+    if delta is None:
+        return "Leaderboard ranks unchanged"
+    return f"Published leaderboard version {delta['version']}"
+
+
+@shared_task
+def update_tournament_standings(player_id, round_id):
+    """
+    Celery task to update a player's tournament standings after a round write.
+
+    Args:
+        player_id (int): ID of the player
+        round_id (int): ID of the round written
+
+    Returns:
+        str: Message indicating the round handled
+    """
+    from django.core.cache import cache
+
+    from .tournaments import PENDING_KEY, round_written
+
+    # Writes from here on queue another run
+    cache.delete(PENDING_KEY.format(round_id=round_id))
+    round_written(player_id, round_id)
+    return f"Updated tournament standings for round {round_id}"
+
+
+@shared_task
+def pack_completed_rounds():
+    """
+    Celery task to move old completed rounds' hole scores into packed storage.
+
+    Returns:
+        str: Message indicating how many rounds were packed
+    """
+    from .score_packing import pack_completed_rounds as pack
+
+    return f"Packed {pack()} rounds"
+
+
+@shared_task
+def purge_idempotency_keys():
+    """
+    Celery task to delete stored Idempotency-Key responses past their TTL.
+
+    Returns:
+        str: Message indicating how many keys were deleted
+    """
+    from .idempotency import purge_idempotency_keys as purge
+
+    return f"Purged {purge()} idempotency keys"
+
+
+@shared_task
+def warm_ollama_models():
+    """
+    Celery task to keep the app's Ollama models loaded.
+
+    Preloads configured models that are not resident and refreshes the
+    keep-alive of those that are, without evicting hot models at peak.
+
+    Returns:
+        str: Message summarizing the outcome per model
+    """
+    from .ollama_residency import warm_models
+
+    outcome = warm_models()
+    return "Ollama models: " + ", ".join(
+        f"{model}={state}" for model, state in outcome.items()
+    )
+
+
+@shared_task(bind=True, max_retries=12)
+def index_rounds_for_retrieval(self, round_ids):
+    """
+    Celery task to (re)embed changed rounds into the chat retrieval index.
+
+    Retried later when the gateway refuses the embedding model, e.g. because
+    loading it at peak would evict a hot chat model.
+
+    Args:
+        round_ids (list): IDs of rounds that were saved or deleted
+
+    Returns:
+        str: Message indicating how many rounds were indexed
+    """
+    from django.core.cache import cache
+    from .llm_gateway import GatewayBusy
+    from .retrieval import index_rounds
+
+    cache.delete_many([f"retrieval:pending:{round_id}" for round_id in round_ids])
+    try:
+        indexed = index_rounds(round_ids)
+    except GatewayBusy as e:
+        raise self.retry(exc=e, countdown=max(e.retry_after, 5 * 60))
+    return f"Indexed {indexed} rounds for retrieval"
+
+
+@shared_task
+def rebuild_retrieval_index():
+    """
+    Celery task to rebuild the chat retrieval index from scratch.
+
+    Returns:
+        str: Message indicating how many documents were indexed
+    """
+    from .retrieval import rebuild_index
+
+    return f"Indexed {rebuild_index()} documents for retrieval"
@@ -1,3 +1,1900 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework.test import APIClient
+
+from .authentication import (
+    StatelessJWTAuthentication,
+    TTLCache,
+    forget_user,
+    tokens_for_user,
+)
+from .fast_serializers import _load_orjson, course_catalog, dumps, user_rows
+from .leaderboard import diff_standings, standings
+from .leaderboard_stream import REBUILD_KEY, _snapshot, event
+from .llm_gateway import PRIORITY_CHAT, PRIORITY_VISION, GatewayBusy, LLMGateway
+from .model_router import CASUAL, STORY, TECHNICAL, classify, route_message
+from .models import (
+    Course,
+    CourseDailyStats,
+    Hole,
+    HoleDailyStats,
+    HoleScore,
+    HoleStats,
+    PlayerDailyStats,
+    RollupBacklog,
+    Round,
+    Tee,
+    Tournament,
+    User,
+)
+from .ollama_residency import can_schedule, mark_used, resident_models, warm_models
+from .presence import flush_to_database, online_user_ids, record_heartbeat
+from .query_budget import assert_query_budget, fingerprint
+from .retrieval import VectorIndex, embed
+from .response_cache import ResponseCache, context_hash, is_deterministic
+from .rollups import _changed_scores, rebuild_rollups, refresh_rollups
+from .score_packing import PackedScore, pack, pack_round, unpack
+from .chat_context import get_chat_context, get_golfer_profile
+from .serializers import CourseSerializer, UserSerializer
+from .stats import (
+    build_player_stats,
+    get_player_stats,
+    player_handicaps,
+    player_trends,
+)
+from .tournaments import REBUILD_KEY as STANDINGS_REBUILD_KEY
+from .tournaments import course_handicap
+
+
+def make_course(name="Test Course"):
+    """Create a course with one 18-hole tee and return (course, tee, holes)."""
+    course = Course.objects.create(
+        club_name=name,
+        course_name=name,
+        address="1 Fairway Dr",
+        city="Springfield",
+        state="IL",
+        country="USA",
+        latitude=0.0,
+        longitude=0.0,
+    )
+    tee = Tee.objects.create(
+        course=course,
+        tee_name="Blue",
+        gender="M",
+        course_rating=70.1,
+        slope_rating=120,
+        bogey_rating=92.0,
+        total_yards=6400,
+        total_meters=5850,
+        number_of_holes=18,
+        par_total=72,
+        front_course_rating=35.0,
+        front_slope_rating=118,
+        front_bogey_rating=46.0,
+        back_course_rating=35.1,
+        back_slope_rating=122,
+        back_bogey_rating=46.0,
+    )
+    holes = [
+        Hole.objects.create(tee=tee, hole_number=n, par=4, yardage=380, handicap=n)
+        for n in range(1, 19)
+    ]
+    return course, tee, holes
+
+
+class LazyImportTests(SimpleTestCase):
+    """Web workers start without loading OpenCV or the Ollama client."""
+
+    def test_url_conf_does_not_import_cv2_or_ollama(self):
+        script = (
+            "import sys, django; django.setup(); "
+            "from django.urls import resolve; resolve('/api/leaderboard/'); "
+            "print(sorted({'cv2', 'ollama'} & set(sys.modules)))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings")
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env,
+            text=True,
+        ).stdout
+        self.assertEqual(output.strip().splitlines()[-1], "[]")
+
+
+class ResponseCacheTests(SimpleTestCase):
+    """Deterministic answers are cached per prompt, model, options and context."""
+
+    def setUp(self):
+        cache.clear()
+        self.responses = ResponseCache(timeout=60, enabled=True)
+        self.digest = context_hash([{"role": "system", "content": "Be brief."}])
+
+    def key(self, prompt="Fix my slice?", model="mistral", options=None, digest=None):
+        return self.responses.make_key(
+            prompt, model, options or {"temperature": 0}, digest or self.digest
+        )
+
+    def test_key_ignores_case_and_spacing_only(self):
+        self.assertEqual(self.key(), self.key("  fix MY   slice? "))
+        self.assertNotEqual(self.key(), self.key("Fix my hook?"))
+        self.assertNotEqual(self.key(), self.key(model="gemma3"))
+        self.assertNotEqual(self.key(), self.key(options={"temperature": 0.7}))
+        self.assertNotEqual(
+            self.key(), self.key(digest=context_hash([], "Last round: 84"))
+        )
+
+    def test_only_pinned_temperature_is_deterministic(self):
+        self.assertTrue(is_deterministic({"temperature": 0}))
+        self.assertFalse(is_deterministic({"temperature": 0.2}))
+        self.assertFalse(is_deterministic({}))
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertIsNone(self.responses.get(self.key()))
+        self.responses.set(self.key(), "Strengthen your grip.")
+        self.assertEqual(self.responses.get(self.key()), "Strengthen your grip.")
+        self.assertEqual(
+            self.responses.stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        )
+
+    def test_disabled_cache_stores_nothing(self):
+        responses = ResponseCache(enabled=False)
+        responses.set(self.key(), "Strengthen your grip.")
+        self.assertIsNone(cache.get(self.key()))
+        self.assertIsNone(responses.get(self.key()))
+
+    @mock.patch(
+        "api.llm_gateway.LLMGateway.chat",
+        return_value={"message": {"content": "Strengthen your grip."}},
+    )
+    def test_repeated_question_is_answered_from_cache(self, chat):
+        from .ollama_chat import ChatBot
+
+        question = "How do I fix a slice with my driver?"
+        answers = [ChatBot(user_id=1).answer_question(question) for _ in range(2)]
+        self.assertEqual(answers, ["Strengthen your grip."] * 2)
+        self.assertEqual(chat.call_count, 1)
+
+
+class ModelRouterTests(SimpleTestCase):
+    """Only technical golf questions reach the large model."""
+
+    UNCLASSIFIED = "What do you think about the weather on the moon"
+
+    def test_stock_phrases_get_canned_replies(self):
+        for message in ("Hello there!", "thanks so much", "See ya"):
+            route = route_message(message, "mistral")
+            self.assertIsNone(route.model)
+            self.assertTrue(route.canned_reply)
+
+    def test_rules_classify_messages(self):
+        cases = {
+            "How do I stop slicing my driver?": TECHNICAL,
+            "I hit my driver into the trees on 7 yesterday": STORY,
+            "I birdied the last hole": STORY,
+            "how are you today": CASUAL,
+            "nice weather": CASUAL,
+            self.UNCLASSIFIED: None,
+        }
+        for message, interaction in cases.items():
+            with self.subTest(message=message):
+                self.assertEqual(classify(message), interaction)
+
+    @override_settings(CHAT_SMALL_MODEL="gemma3:1b")
+    @mock.patch("api.ollama_residency.can_schedule", return_value=True)
+    def test_models_by_interaction(self, can_schedule):
+        technical = route_message("How should I grip a putter?", "mistral")
+        casual = route_message("how are you doing", "mistral")
+        self.assertEqual(technical, (TECHNICAL, "mistral", None))
+        self.assertEqual(casual, (CASUAL, "gemma3:1b", None))
+
+    @mock.patch("api.ollama_residency.can_schedule", return_value=False)
+    def test_small_talk_stays_on_warm_model_when_small_would_evict(self, can_schedule):
+        self.assertEqual(route_message("how are you doing", "mistral").model, "mistral")
+
+    @override_settings(CHAT_ROUTER_CLASSIFIER_MODEL="")
+    def test_unclassified_message_goes_to_large_model(self):
+        route = route_message(self.UNCLASSIFIED, "mistral")
+        self.assertEqual(route, (TECHNICAL, "mistral", None))
+
+    @override_settings(CHAT_ROUTER_CLASSIFIER_MODEL="gemma3:270m")
+    @mock.patch("api.ollama_residency.can_schedule", return_value=True)
+    @mock.patch(
+        "api.llm_gateway.LLMGateway.chat",
+        return_value={"message": {"content": "Story."}},
+    )
+    def test_classifier_model_places_unclassified_message(self, chat, can_schedule):
+        route = route_message(self.UNCLASSIFIED, "mistral")
+        self.assertEqual(route.interaction, STORY)
+        self.assertEqual(chat.call_args.kwargs["model"], "gemma3:270m")
+
+
+@override_settings(OLLAMA_MAX_LOADED_MODELS=2, OLLAMA_PEAK_HOURS=(0, 24))
+class OllamaResidencyTests(SimpleTestCase):
+    """Cold models are not loaded at peak when they would evict a hot one."""
+
+    def setUp(self):
+        cache.clear()
+
+    def loaded(self, *names):
+        models = [
+            SimpleNamespace(model=name, size=1, size_vram=1, expires_at=None)
+            for name in names
+        ]
+        return SimpleNamespace(models=models)
+
+    @mock.patch("ollama.ps", side_effect=ConnectionError("refused"))
+    def test_unreachable_server_is_not_asked_on_every_call(self, ps):
+        with self.assertLogs("api.ollama_residency", "WARNING"):
+            self.assertIsNone(resident_models())
+        self.assertIsNone(resident_models())
+        self.assertTrue(can_schedule("mistral"))  # fails open
+        self.assertEqual(ps.call_count, 1)
+        with self.assertLogs("api.ollama_residency", "WARNING"):
+            resident_models(refresh=True)
+        self.assertEqual(ps.call_count, 2)
+
+    @mock.patch("ollama.ps")
+    def test_residency_is_cached(self, ps):
+        ps.return_value = self.loaded("mistral:latest")
+        self.assertEqual([m["name"] for m in resident_models()], ["mistral:latest"])
+        resident_models()
+        self.assertEqual(ps.call_count, 1)
+
+    @mock.patch("ollama.ps")
+    def test_cold_model_refused_only_when_it_would_evict_a_hot_one(self, ps):
+        ps.return_value = self.loaded("mistral:latest")
+        self.assertTrue(can_schedule("gemma3"))  # room for another model
+
+        cache.clear()
+        ps.return_value = self.loaded("mistral:latest", "gemma3:latest")
+        self.assertTrue(can_schedule("mistral"))  # already resident
+        self.assertTrue(can_schedule("gemma3:1b"))  # nothing hot to evict
+        mark_used("mistral")
+        self.assertFalse(can_schedule("gemma3:1b"))
+        with override_settings(OLLAMA_PEAK_HOURS=(0, 0)):
+            self.assertTrue(can_schedule("gemma3:1b"))
+
+    @mock.patch("api.ollama_residency.preload", return_value=0.1)
+    @mock.patch("ollama.ps")
+    def test_warm_models_refreshes_resident_and_skips_evicting(self, ps, preload):
+        ps.return_value = self.loaded("mistral:latest", "gemma3:latest")
+        mark_used("gemma3")
+        outcome = warm_models(["mistral", "gemma3:1b"])
+        self.assertEqual(outcome, {"mistral": "resident", "gemma3:1b": "skipped"})
+        preload.assert_called_once_with("mistral")
+
+
+class VectorIndexTests(SimpleTestCase):
+    """The retrieval index keeps vectors and metadata in step across writers."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.index = VectorIndex(self.directory)
+
+    def vector(self, *values):
+        vector = np.array(values, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def test_search_sees_own_and_shared_documents(self):
+        self.index.upsert(
+            [
+                ("round:1", 1, "Player 1 three-putted", self.vector(1, 0, 0)),
+                ("round:2", 2, "Player 2 sliced", self.vector(1, 0.1, 0)),
+                ("tip:1", None, "Keep the putter low", self.vector(0.8, 0.6, 0)),
+            ]
+        )
+        results = self.index.search(self.vector(1, 0, 0), owner=1, k=5)
+        self.assertEqual(
+            [text for _, text in results],
+            ["Player 1 three-putted", "Keep the putter low"],
+        )
+
+    def test_upsert_replaces_and_remove_deletes(self):
+        self.index.upsert([("round:1", 1, "old", self.vector(1, 0, 0))])
+        self.index.upsert([("round:1", 1, "new", self.vector(0, 1, 0))])
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(
+            self.index.search(self.vector(0, 1, 0), owner=1, k=1)[0][1], "new"
+        )
+        self.index.remove(["round:1"])
+        self.assertEqual(self.index.search(self.vector(0, 1, 0), owner=1, k=1), [])
+
+    def test_repeated_ids_in_one_upsert_keep_the_last(self):
+        self.index.upsert([("round:1", 1, "old", self.vector(1, 0, 0))])
+        loaded = self.index._vectors
+        self.index.upsert(
+            [
+                ("round:1", 1, "stale", self.vector(1, 1, 0)),
+                ("round:2", 1, "stale", self.vector(1, 1, 0)),
+                ("round:1", 1, "new", self.vector(0, 1, 0)),
+                ("round:2", 1, "newer", self.vector(0, 0, 1)),
+            ]
+        )
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search(self.vector(0, 1, 0), 1, k=1)[0][1], "new")
+        self.assertEqual(
+            self.index.search(self.vector(0, 0, 1), 1, k=1)[0][1], "newer"
+        )
+        # Rows a search already holds are not changed under it
+        np.testing.assert_array_equal(loaded, [self.vector(1, 0, 0)])
+
+    def test_other_process_reads_one_consistent_write(self):
+        reader = VectorIndex(self.directory)
+        self.index.upsert(
+            [
+                (f"round:{n}", 1, f"round {n}", self.vector(1, n, 0))
+                for n in range(3)
+            ]
+        )
+        self.assertEqual(len(reader), 3)
+        self.index.remove(["round:0", "round:1"])
+        os.utime(self.index.path, ns=(0, time.time_ns() + 10**9))
+        self.assertEqual(
+            reader.search(self.vector(1, 2, 0), owner=1, k=5)[0][1], "round 2"
+        )
+        self.assertEqual(sorted(os.listdir(self.directory)), [".lock", "index.npz"])
+
+
+@override_settings(CHAT_EMBEDDING_MODEL="nomic-embed-text")
+class RetrievalResidencyTests(TestCase):
+    """Embedding goes through the same hot-model guard as chat calls."""
+
+    @mock.patch("ollama.embed")
+    @mock.patch("api.ollama_residency.can_schedule", return_value=False)
+    def test_refused_embedding_does_not_reach_ollama(self, can_schedule, ollama_embed):
+        with self.assertRaises(GatewayBusy):
+            embed(["How do I stop three-putting?"])
+        ollama_embed.assert_not_called()
+        can_schedule.assert_called_with("nomic-embed-text")
+
+    @override_settings(CHAT_RETRIEVAL_ENABLED=True)
+    @mock.patch("ollama.embed")
+    @mock.patch("api.ollama_residency.can_schedule", return_value=False)
+    def test_refused_retrieval_falls_back_to_profile(self, can_schedule, ollama_embed):
+        cache.clear()
+        player = User.objects.create(username="golfer", email="g@example.com")
+        with self.assertLogs("api.chat_context", "WARNING"):
+            context = get_chat_context(player.id, "How do I stop three-putting?")
+        self.assertNotIn("Relevant rounds and tips", context)
+        ollama_embed.assert_not_called()
+
+    @mock.patch(
+        "ollama.embed", return_value={"embeddings": [[3.0, 4.0]], "eval_count": 1}
+    )
+    @mock.patch("api.ollama_residency.can_schedule", return_value=True)
+    def test_embeddings_are_unit_length(self, can_schedule, ollama_embed):
+        vectors = embed(["Fix my slice"])
+        np.testing.assert_allclose(vectors, [[0.6, 0.8]])
+        self.assertEqual(ollama_embed.call_args.kwargs["model"], "nomic-embed-text")
+
+
+class LLMGatewayTests(SimpleTestCase):
+    """Slots are handed out by priority, then round-robin across users."""
+
+    def setUp(self):
+        self.gateway = LLMGateway(
+            model_slots={"mistral": 1}, max_queue_depth=3, queue_timeout=5
+        )
+        self.granted = []
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def queue(self, label, priority=PRIORITY_CHAT, user_id=None):
+        """Start a call that waits for a slot, and return once it is queued."""
+        queued = self.gateway.snapshot()["mistral"]["queued"]
+
+        def call():
+            with self.gateway.slot("mistral", priority=priority, user_id=user_id):
+                self.granted.append(label)
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        self.threads.append(thread)
+        self.wait_for(lambda state: state["queued"] == queued + 1)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition(self.gateway.snapshot()["mistral"]):
+            self.assertLess(time.monotonic(), deadline, "gateway never reached state")
+            time.sleep(0.001)
+
+    def test_free_slot_is_taken_without_queueing(self):
+        with self.gateway.slot("mistral") as waited:
+            self.assertEqual(waited, 0.0)
+            self.assertEqual(self.gateway.snapshot()["mistral"]["active"], 1)
+        state = self.gateway.snapshot()["mistral"]
+        self.assertEqual((state["active"], state["completed"]), (0, 1))
+
+    def test_chat_is_served_before_vision(self):
+        self.gateway.acquire("mistral")
+        self.queue("vision", PRIORITY_VISION, user_id=1)
+        self.queue("chat", PRIORITY_CHAT, user_id=2)
+        self.gateway.release("mistral")
+        self.wait_for(lambda state: state["completed"] == 3)
+        self.assertEqual(self.granted, ["chat", "vision"])
+
+    def test_users_are_served_round_robin(self):
+        self.gateway.acquire("mistral")
+        self.queue("a1", user_id="a")
+        self.queue("a2", user_id="a")
+        self.queue("b1", user_id="b")
+        self.gateway.release("mistral")
+        self.wait_for(lambda state: state["completed"] == 4)
+        self.assertEqual(self.granted, ["a1", "b1", "a2"])
+
+    def test_full_queue_is_refused_with_retry_hint(self):
+        self.gateway.acquire("mistral")
+        for n in range(3):
+            self.queue(n, user_id=n)
+        with self.assertRaises(GatewayBusy) as busy:
+            self.gateway.acquire("mistral", user_id=9)
+        self.assertEqual(busy.exception.reason, "queue full")
+        self.assertGreaterEqual(busy.exception.retry_after, 1)
+        self.gateway.release("mistral")
+        self.wait_for(lambda state: state["completed"] == 4)
+        self.assertEqual(self.gateway.snapshot()["mistral"]["rejected"], 1)
+
+    def test_wait_times_out(self):
+        gateway = LLMGateway(model_slots={"mistral": 1}, queue_timeout=0.01)
+        gateway.acquire("mistral")
+        with self.assertRaises(GatewayBusy) as busy:
+            gateway.acquire("mistral")
+        self.assertEqual(busy.exception.reason, "timed out waiting")
+        state = gateway.snapshot()["mistral"]
+        self.assertEqual((state["queued"], state["timed_out"]), (0, 1))
+
+    def test_failed_call_frees_its_slot(self):
+        with self.assertRaises(ValueError):
+            with self.gateway.slot("mistral"):
+                raise ValueError("ollama went away")
+        state = self.gateway.snapshot()["mistral"]
+        self.assertEqual((state["active"], state["failed"]), (0, 1))
+
+
+class ChatGatewayBusyTests(TestCase):
+    """A refused chat call is reported as 503 with Retry-After."""
+
+    @mock.patch(
+        "api.llm_gateway.LLMGateway.chat", side_effect=GatewayBusy("mistral", 7)
+    )
+    def test_busy_gateway_returns_retry_after(self, chat):
+        cache.clear()
+        player = User.objects.create(username="golfer", email="g@example.com")
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(player).access_token}"
+        )
+        response = client.post(
+            reverse("chatbot"),
+            {"message": "How do I fix a slice with my driver?"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "7")
+        self.assertEqual(response.json()["retry_after"], 7)
+
+
+class StatelessJWTTests(TestCase):
+    """Requests authenticate from token claims; auth changes revoke tokens."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="golfer", email="g@example.com")
+        self.user.set_password("old-password")
+        self.user.save()
+        forget_user(self.user.id)
+
+    def authenticate(self, token):
+        request = RequestFactory().get(
+            "/api/leaderboard/", HTTP_AUTHORIZATION=f"Bearer {token.access_token}"
+        )
+        user, _ = StatelessJWTAuthentication().authenticate(request)
+        return user
+
+    def test_user_comes_from_claims(self):
+        token = tokens_for_user(self.user)
+        cache.clear()
+        with self.assertNumQueries(1):  # auth_version, cached afterwards
+            user = self.authenticate(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token).id, self.user.id)
+        self.assertEqual((user.id, user.username), (self.user.id, "golfer"))
+        self.assertFalse(user.is_staff)
+
+    def test_staff_flag_is_a_claim(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertTrue(self.authenticate(tokens_for_user(self.user)).is_staff)
+
+    def test_password_change_revokes_old_tokens(self):
+        old = tokens_for_user(self.user)
+        self.authenticate(old)
+        self.user.set_password("new-password")
+        self.user.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(old)
+        self.assertEqual(self.authenticate(tokens_for_user(self.user)).id, self.user.id)
+
+    def test_profile_edit_keeps_tokens(self):
+        token = tokens_for_user(self.user)
+        self.user.first_name = "Sam"
+        self.user.save()
+        self.assertEqual(self.authenticate(token).id, self.user.id)
+
+    def test_deleted_user_is_rejected(self):
+        token = tokens_for_user(self.user)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_revoked_token_gets_401(self):
+        token = tokens_for_user(self.user)
+        self.user.is_active = False
+        self.user.save()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.access_token}")
+        self.assertEqual(client.get(reverse("leaderboard")).status_code, 401)
+
+
+class MetricsAccessTests(TestCase):
+    """Metrics need the scrape token, or a staff user when none is set."""
+
+    def get(self, user=None, **headers):
+        client = APIClient()
+        if user is not None:
+            client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(user).access_token}"
+            )
+        return client.get(reverse("metrics"), headers=headers)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_staff_only_without_token(self):
+        staff = User.objects.create(
+            username="admin", email="a@example.com", is_staff=True
+        )
+        player = User.objects.create(username="golfer", email="g@example.com")
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(player).status_code, 403)
+        self.assertEqual(self.get(staff).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token_required_when_set(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(**{"X-Metrics-Token": "wrong"}).status_code, 403)
+        response = self.get(**{"X-Metrics-Token": "s3cret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+
+
+class GolferProfileTests(TestCase):
+    """The chat profile is cached per user and rebuilt after round writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_is_cached_until_a_round_is_written(self):
+        self.assertIn("No rounds recorded yet", get_golfer_profile(self.player.id))
+        with self.assertNumQueries(0):
+            get_golfer_profile(self.player.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            round_obj = Round.objects.create(
+                player=self.player, course=self.course, tee=self.tee
+            )
+            for hole in self.holes:
+                HoleScore.objects.create(round=round_obj, hole=hole, strokes=5, putts=2)
+        profile = get_golfer_profile(self.player.id)
+        self.assertIn("- Rounds recorded: 1", profile)
+        self.assertIn("- Average score: 90.0 per round", profile)
+        self.assertIn("Score: 90", profile)
+
+
+class PresenceTests(TestCase):
+    """Without Redis, heartbeats go to the users table every process reads."""
+
+    def setUp(self):
+        patcher = mock.patch("api.presence._last_written", TTLCache(60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.player = User.objects.create(username="golfer", email="g@example.com")
+
+    @override_settings(REDIS_URL="")
+    def test_heartbeat_is_written_once_per_interval(self):
+        record_heartbeat(self.player.id)
+        with self.assertNumQueries(0):
+            record_heartbeat(self.player.id)
+        self.player.refresh_from_db()
+        self.assertTrue(self.player.is_online)
+        self.assertEqual(online_user_ids(), {self.player.id})
+
+    @override_settings(REDIS_URL="", USER_ONLINE_TIMEOUT=60)
+    def test_flush_marks_idle_users_offline(self):
+        idle = User.objects.create(username="idle", email="i@example.com")
+        record_heartbeat(self.player.id)
+        record_heartbeat(idle.id, at=time.time() - 120)
+        self.assertEqual(flush_to_database(), (0, 1))
+        online = set(User.objects.filter(is_online=True).values_list("id", flat=True))
+        self.assertEqual(online, {self.player.id})
+
+
+class PlayerStatsCacheTests(TestCase):
+    """Player stats are cached until one of the player's rounds changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def setUp(self):
+        cache.clear()
+        self.round = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        for hole in self.holes:
+            HoleScore.objects.create(
+                round=self.round, hole=hole, strokes=5, putts=2, fairway_hit=True
+            )
+
+    def test_stats_are_built_once(self):
+        stats = get_player_stats(self.player.id)
+        self.assertEqual(stats["avg_score_per_round"], 90)
+        self.assertEqual(stats["avg_putts_per_round"], 36)
+        self.assertEqual(stats["fairway_hit_percentage"], 100)
+        # 18-hole differential (90 - 70.1) * 113 / 120, times 0.96
+        self.assertEqual(stats["handicap"], 17.99)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_player_stats(self.player.id), stats)
+
+    def test_score_edit_invalidates_after_commit(self):
+        get_player_stats(self.player.id)
+        score = HoleScore.objects.get(round=self.round, hole=self.holes[0])
+        score.strokes = 3
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+        self.assertEqual(get_player_stats(self.player.id)["avg_score_per_round"], 88)
+
+    def test_round_delete_invalidates(self):
+        get_player_stats(self.player.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.round.delete()
+        self.assertEqual(get_player_stats(self.player.id)["scores_list"], [])
+
+    def test_unknown_player(self):
+        self.assertIsNone(get_player_stats(self.player.id + 1000))
+
+
+class DailyRollupTests(TestCase):
+    """Incremental refreshes leave the rollups as a full rebuild would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [
+            User.objects.create(username=f"player{n}", email=f"p{n}@example.com")
+            for n in range(2)
+        ]
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def play(self, player, strokes=5):
+        round_obj = Round.objects.create(
+            player=player, course=self.course, tee=self.tee
+        )
+        for hole in self.holes:
+            HoleScore.objects.create(
+                round=round_obj, hole=hole, strokes=strokes, putts=2
+            )
+        return round_obj
+
+    def later(self, minutes):
+        return timezone.now() + datetime.timedelta(minutes=minutes)
+
+    def rollups(self):
+        fields = ("day", "rounds", "holes", "strokes", "par", "putts")
+        return (
+            sorted(PlayerDailyStats.objects.values_list("player_id", *fields)),
+            sorted(CourseDailyStats.objects.values_list("course_id", *fields)),
+            sorted(HoleDailyStats.objects.values_list("hole_id", *fields)),
+        )
+
+    def assertMatchesRebuild(self):
+        refreshed = self.rollups()
+        rebuild_rollups(self.later(60))
+        self.assertEqual(refreshed, self.rollups())
+        return refreshed
+
+    def test_refresh_sums_each_day(self):
+        self.play(self.players[0], strokes=5)
+        self.play(self.players[0], strokes=4)
+        self.play(self.players[1], strokes=6)
+        refresh_rollups(self.later(5))
+        players, courses, holes = self.assertMatchesRebuild()
+        today = timezone.localdate()
+        self.assertEqual(
+            players,
+            [
+                (self.players[0].id, today, 2, 36, 162, 144, 72),
+                (self.players[1].id, today, 1, 18, 108, 72, 36),
+            ],
+        )
+        self.assertEqual(courses, [(self.course.id, today, 3, 54, 270, 216, 108)])
+        self.assertEqual(len(holes), 18)
+
+    def test_edits_moves_and_deletes_are_picked_up(self):
+        kept = self.play(self.players[0])
+        moved = self.play(self.players[1])
+        rebuild_rollups()
+
+        score = HoleScore.objects.get(round=kept, hole=self.holes[0])
+        score.strokes = 9
+        score.save()
+        moved.date_played = timezone.now() - datetime.timedelta(days=3)
+        moved.save()
+        refresh_rollups(self.later(5))
+        self.assertEqual(
+            sorted(PlayerDailyStats.objects.values_list("player_id", "day", "strokes")),
+            [
+                (self.players[0].id, timezone.localdate(), 94),
+                (self.players[1].id, timezone.localdate(moved.date_played), 90),
+            ],
+        )
+
+        moved.delete()
+        refresh_rollups(self.later(10))
+        players, courses, _ = self.assertMatchesRebuild()
+        self.assertEqual(len(players), 1)
+        self.assertEqual(len(courses), 1)
+
+    def test_saves_that_keep_a_round_in_place_queue_nothing(self):
+        round_obj = self.play(self.players[0])
+        round_obj.notes = "Windy"
+        round_obj.is_complete = True
+        round_obj.save()
+        self.assertFalse(RollupBacklog.objects.exists())
+
+        round_obj.player = self.players[1]
+        round_obj.save()
+        self.assertTrue(RollupBacklog.objects.exists())
+
+    def test_refresh_twice_changes_nothing(self):
+        self.play(self.players[0])
+        refresh_rollups(self.later(5))
+        before = self.rollups()
+        refresh_rollups(self.later(10))
+        self.assertEqual(self.rollups(), before)
+
+
+class PlayerTrendsTests(TestCase):
+    """Windows, series and the score trend read the same rollups up to end."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+        cls.today = timezone.localdate()
+
+    def play(self, days_ago, strokes):
+        day = self.today - datetime.timedelta(days=days_ago)
+        round_obj = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        HoleScore.objects.bulk_create(
+            HoleScore(round=round_obj, hole=hole, strokes=strokes)
+            for hole in self.holes
+        )
+        played = datetime.datetime.combine(
+            day, datetime.time(12), tzinfo=timezone.get_current_timezone()
+        )
+        Round.objects.filter(pk=round_obj.pk).update(date_played=played)
+        return day
+
+    def test_all_parts_stop_at_end(self):
+        first = self.play(10, strokes=6)  # 108
+        second = self.play(5, strokes=5)  # 90
+        self.play(5, strokes=4)  # 72
+        self.play(1, strokes=5)  # after end
+        rebuild_rollups()
+
+        end = self.today - datetime.timedelta(days=2)
+        trends = player_trends(self.player.id, "month", end=end, window=2)
+        self.assertEqual(trends["windows"]["30"]["rounds"], 3)
+        self.assertEqual(trends["windows"]["30"]["avg_score"], 90.0)
+        self.assertEqual(sum(trends["series"]["rounds"]), 3)
+        self.assertEqual(
+            trends["trend"],
+            {
+                "date": [first, second],
+                "score": [108.0, 81.0],
+                "moving_avg": [108.0, 90.0],
+            },
+        )
+
+
+class RoundListTests(TestCase):
+    """The round list pages by cursor over stored totals and never writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+        cls.rounds = []
+        for n in range(3):
+            round_obj = Round.objects.create(
+                player=cls.player, course=cls.course, tee=cls.tee
+            )
+            for hole in cls.holes[: 9 * (n % 2 + 1)]:
+                HoleScore.objects.create(round=round_obj, hole=hole, strokes=4 + n)
+            cls.rounds.append(round_obj)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+
+    def page(self, **params):
+        return self.client.get(reverse("round"), params).json()
+
+    def test_pages_cover_every_round_newest_first(self):
+        fields = "id,total_score,holes_played"
+        first = self.page(limit=2, fields=fields)
+        second = self.page(limit=2, fields=fields, cursor=first["next_cursor"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(
+            first["rounds"] + second["rounds"],
+            [
+                {"id": self.rounds[2].id, "total_score": 54, "holes_played": 9},
+                {"id": self.rounds[1].id, "total_score": 90, "holes_played": 18},
+                {"id": self.rounds[0].id, "total_score": 36, "holes_played": 9},
+            ],
+        )
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse("round"), {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_missing_totals_are_computed_without_writing(self):
+        legacy = self.rounds[1]
+        Round.objects.filter(pk=legacy.pk).update(strokes_total=None, holes_played=None)
+
+        rows = self.page(fields="id,total_score")["rounds"]
+        self.assertIn({"id": legacy.id, "total_score": 90}, rows)
+        self.client.get(reverse("leaderboard"))
+        stored = Round.objects.values_list("strokes_total", "holes_played")
+        self.assertEqual(stored.get(pk=legacy.pk), (None, None))
+
+        call_command("backfill_round_totals", stdout=StringIO())
+        self.assertEqual(stored.get(pk=legacy.pk), (90, 18))
+
+
+class QueryPlanTests(TestCase):
+    """
+    The scoring hot paths must be answered from an index, not a table scan.
+
+    Plans are checked with EXPLAIN on SQLite and PostgreSQL. PostgreSQL is
+    told to avoid sequential scans, since on tables this small it would
+    otherwise prefer one whatever indexes exist.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="planner", email="p@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+        cls.round = Round.objects.create(
+            player=cls.player, course=cls.course, tee=cls.tee
+        )
+        for hole in cls.holes:
+            HoleScore.objects.create(round=cls.round, hole=hole, strokes=4, putts=2)
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, name, table=None):
+        """
+        Assert the plan for queryset uses the named index.
+
+        SQLite names the index behind a unique constraint on plain fields
+        sqlite_autoindex_<table>_N, so table is accepted in its place.
+        """
+        plan = self.explain(queryset)
+        names = [name]
+        if table and connection.vendor == "sqlite":
+            names.append(f"sqlite_autoindex_{table}_")
+        self.assertTrue(any(n in plan for n in names), f"{name} not used:\n{plan}")
+
+    def test_round_history_uses_player_index(self):
+        self.assertUsesIndex(
+            Round.objects.filter(player=self.player).order_by("-date_played", "-id"),
+            "round_player_history",
+        )
+
+    def test_round_history_page_uses_player_index(self):
+        rounds = Round.objects.filter(
+            player=self.player, date_played__lt=self.round.date_played
+        ).order_by("-date_played", "-id")
+        self.assertUsesIndex(rounds, "round_player_history")
+
+    def test_hole_score_lookup_uses_unique_index(self):
+        self.assertUsesIndex(
+            HoleScore.objects.filter(round=self.round, hole=self.holes[0]),
+            "unique_hole_score",
+            table="api_holescore",
+        )
+
+    def test_tee_name_lookup_uses_expression_index(self):
+        self.assertUsesIndex(
+            Tee.objects.filter(course=self.course).named("BLUE"), "unique_tee_name"
+        )
+
+    def test_hole_lookup_uses_unique_index(self):
+        self.assertUsesIndex(
+            Hole.objects.filter(tee=self.tee, hole_number=7),
+            "unique_hole_number",
+            table="api_hole",
+        )
+
+    def test_user_search_uses_name_indexes(self):
+        plan = self.explain(User.objects.search("Pla"))
+        for name in (
+            "user_username_lower",
+            "user_first_name_lower",
+            "user_last_name_lower",
+        ):
+            self.assertIn(name, plan)
+
+    def test_rollup_watermark_scans_use_updated_at_indexes(self):
+        since = self.round.updated_at
+        self.assertUsesIndex(
+            Round.objects.filter(updated_at__gt=since), "round_updated_at"
+        )
+        self.assertUsesIndex(
+            HoleScore.objects.filter(updated_at__gt=since), "hole_score_updated_at"
+        )
+
+    def test_rollup_refresh_key_queries_use_updated_at_indexes(self):
+        scores, rounds = _changed_scores(self.round.updated_at)
+        self.assertUsesIndex(scores, "hole_score_updated_at")
+        self.assertUsesIndex(rounds, "round_updated_at")
+
+
+class ScoringConstraintTests(TestCase):
+    """Unique constraints on the scoring keys, and the upserts they allow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def test_tee_names_are_unique_ignoring_case(self):
+        tee = Tee.objects.get(pk=self.tee.pk)
+        tee.pk = None
+        tee.tee_name = "BLUE"
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            tee.save()
+
+    def test_same_tee_name_allowed_for_other_gender(self):
+        tee = Tee.objects.get(pk=self.tee.pk)
+        tee.pk = None
+        tee.gender = "F"
+        tee.save()
+        self.assertEqual(Tee.objects.filter(course=self.course).named("blue").count(), 2)
+
+    def test_hole_numbers_are_unique_per_tee(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Hole.objects.create(tee=self.tee, hole_number=1, par=3, yardage=150, handicap=1)
+
+    def test_hole_upsert_updates_in_place(self):
+        Hole.objects.bulk_create(
+            [Hole(tee=self.tee, hole_number=1, par=5, yardage=510, handicap=3)],
+            update_conflicts=True,
+            unique_fields=["tee", "hole_number"],
+            update_fields=["par", "yardage", "handicap"],
+        )
+        self.assertEqual(Hole.objects.filter(tee=self.tee).count(), 18)
+        self.assertEqual(Hole.objects.get(tee=self.tee, hole_number=1).par, 5)
+
+    def test_one_score_per_hole_per_round(self):
+        round_obj = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        HoleScore.objects.create(round=round_obj, hole=self.holes[0], strokes=4)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            HoleScore.objects.create(round=round_obj, hole=self.holes[0], strokes=5)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Hot endpoints must stay within their QUERY_BUDGETS entry.
+
+    Every player has several rounds on two courses, so a query per round,
+    hole or course shows up as a budget failure. Caches are cleared first
+    so each request is measured cold.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        courses = [make_course(f"Course {n}") for n in range(2)]
+        cls.players = [
+            User.objects.create(username=f"player{n}", email=f"p{n}@example.com")
+            for n in range(3)
+        ]
+        for player in cls.players:
+            for n in range(4):
+                course, tee, holes = courses[n % 2]
+                round_obj = Round.objects.create(player=player, course=course, tee=tee)
+                for hole in holes:
+                    HoleScore.objects.create(
+                        round=round_obj, hole=hole, strokes=4 + hole.hole_number % 3
+                    )
+        cls.player = cls.players[0]
+        cls.round = Round.objects.filter(player=cls.player).first()
+
+    def setUp(self):
+        cache.clear()
+        for player in self.players:
+            forget_user(player.id)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+
+    def assertWithinBudget(self, url_name, request, method="GET", status_code=200):
+        with assert_query_budget(url_name, method=method):
+            response = request()
+        self.assertEqual(
+            response.status_code, status_code, getattr(response, "data", None)
+        )
+        return response
+
+    def test_round_list(self):
+        response = self.assertWithinBudget(
+            "round", lambda: self.client.get(reverse("round"))
+        )
+        self.assertEqual(len(response.data["rounds"]), 4)
+
+    def test_round_create(self):
+        tee = self.round.tee
+        holes = list(tee.holes.all())
+        response = self.assertWithinBudget(
+            "round",
+            lambda: self.client.post(
+                reverse("round"),
+                {
+                    "course_id": self.round.course_id,
+                    "tee_name": tee.tee_name,
+                    "hole_scores": [
+                        {"hole_id": hole.id, "strokes": 4} for hole in holes
+                    ],
+                },
+                format="json",
+            ),
+            method="POST",
+            status_code=201,
+        )
+        self.assertEqual(response.data["total_score"], 72)
+
+    def test_round_detail(self):
+        response = self.assertWithinBudget(
+            "round_detail",
+            lambda: self.client.get(reverse("round_detail", args=[self.round.id])),
+        )
+        self.assertEqual(len(response.data["hole_scores"]), 18)
+
+    def test_player_stats(self):
+        response = self.assertWithinBudget(
+            "player_stats",
+            lambda: self.client.get(reverse("player_stats", args=[self.player.id])),
+        )
+        self.assertEqual(len(response.data["scores_list"]), 4)
+
+    def test_leaderboard(self):
+        response = self.assertWithinBudget(
+            "leaderboard", lambda: self.client.get(reverse("leaderboard"))
+        )
+        self.assertEqual(len(response.data), 3)
+
+    def test_saved_courses(self):
+        response = self.assertWithinBudget(
+            "courses", lambda: self.client.get(reverse("courses"))
+        )
+        self.assertEqual(len(response.json()), 2)
+
+    @mock.patch("ollama.ps", return_value=mock.Mock(models=[]))
+    @mock.patch(
+        "ollama.chat",
+        return_value={"message": {"content": "Keep your head still."}, "eval_count": 5},
+    )
+    def test_chat(self, chat, ps):
+        response = self.assertWithinBudget(
+            "chatbot",
+            lambda: self.client.post(
+                reverse("chatbot"),
+                {"message": "How do I stop slicing my long irons?"},
+                format="json",
+            ),
+            method="POST",
+        )
+        self.assertEqual(b"".join(response.streaming_content), b"Keep your head still.")
+
+    @mock.patch("ollama.ps", return_value=mock.Mock(models=[]))
+    @mock.patch(
+        "ollama.chat",
+        return_value={"message": {"content": "Finish your turn."}, "eval_count": 5},
+    )
+    def test_vision_chat(self, chat, ps):
+        response = self.assertWithinBudget(
+            "vision_chatbot",
+            lambda: self.client.post(
+                reverse("vision_chatbot"),
+                {"message": "How should my follow-through look?"},
+                format="json",
+            ),
+            method="POST",
+        )
+        self.assertEqual(response.data["response"], "Finish your turn.")
+
+    def test_budget_failure_reports_repeated_queries(self):
+        with self.assertRaisesMessage(AssertionError, "12x SELECT"):
+            with assert_query_budget("round", budget=4):
+                for round_obj in Round.objects.all():
+                    round_obj.course.course_name
+
+    def test_middleware_reports_queries_in_debug(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("leaderboard"))
+        self.assertEqual(response["X-DB-Query-Budget"], "5")
+        self.assertLessEqual(int(response["X-DB-Queries"]), 5)
+        self.assertEqual(response["X-DB-Repeated-Queries"], "0")
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (1, 2, 3) AND "name" = \'x\''),
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (7) AND "name" = \'y\''),
+        )
+
+
+class CourseCatalogTests(TestCase):
+    """The saved course list is served from a versioned, pre-serialized cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="browser", email="b@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+
+    def test_repeat_load_with_etag_is_not_modified(self):
+        first = self.client.get(reverse("courses"))
+        self.assertEqual(first.status_code, 200)
+        with assert_query_budget("courses", budget=1):  # authentication only
+            second = self.client.get(
+                reverse("courses"), HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.content, b"")
+
+    def test_gzip_when_accepted(self):
+        response = self.client.get(reverse("courses"), HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        catalog = json.loads(gzip.decompress(response.content))
+        self.assertEqual(catalog[0]["course_name"], self.course.course_name)
+        self.assertEqual(len(catalog[0]["tees"][0]["holes"]), 18)
+
+
+class RoundHoleScoreTests(TestCase):
+    """Hole-by-hole scoring keeps round totals current and writes once per key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def setUp(self):
+        self.round = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+
+    def score(self, hole_number, key=None, **fields):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        url = reverse(
+            "round_hole_score",
+            kwargs={"round_id": self.round.id, "hole_number": hole_number},
+        )
+        return self.client.patch(url, fields, format="json", **headers)
+
+    def stored_totals(self):
+        self.round.refresh_from_db()
+        return self.round.strokes_total, self.round.holes_played
+
+    def test_totals_follow_creates_edits_and_deletes(self):
+        self.assertEqual(self.score(1, strokes=5, putts=2).status_code, 201)
+        self.assertEqual(self.score(2, strokes=4).status_code, 201)
+        response = self.score(1, strokes=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["putts"], 2)
+        self.assertEqual(response.json()["total_score"], 7)
+        HoleScore.objects.get(round=self.round, hole=self.holes[1]).delete()
+        self.assertEqual(self.stored_totals(), (3, 1))
+
+        Round.refresh_totals([self.round.id])
+        self.assertEqual(self.stored_totals(), (3, 1))
+
+    def test_scorecard_post_stores_totals(self):
+        response = self.client.post(
+            reverse("round"),
+            {
+                "course_id": self.course.id,
+                "tee_name": self.tee.tee_name,
+                "hole_scores": [
+                    {"hole_id": hole.id, "strokes": 4 + hole.hole_number % 2}
+                    for hole in self.holes
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            Round.objects.values_list("strokes_total", "holes_played").get(
+                pk=response.json()["id"]
+            ),
+            (81, 18),
+        )
+
+    def test_round_completes_when_every_hole_is_scored(self):
+        for hole in self.holes[:-1]:
+            response = self.score(hole.hole_number, strokes=4)
+            self.assertFalse(response.json()["is_complete"])
+        self.assertTrue(self.score(18, strokes=4).json()["is_complete"])
+        self.round.refresh_from_db()
+        self.assertTrue(self.round.is_complete)
+        self.assertFalse(self.score(18, is_complete=False).json()["is_complete"])
+
+    def test_retry_with_same_key_is_replayed(self):
+        first = self.score(1, key="hole-1", strokes=5)
+        # No score writes
+        with assert_query_budget("round_hole_score", budget=7, method="PATCH"):
+            retry = self.score(1, key="hole-1", strokes=5)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(self.stored_totals(), (5, 1))
+
+    def test_key_reused_for_different_request_is_rejected(self):
+        self.score(1, key="hole-1", strokes=5)
+        self.assertEqual(self.score(1, key="hole-1", strokes=6).status_code, 422)
+        self.assertEqual(self.stored_totals(), (5, 1))
+
+    def test_invalid_writes_are_rejected(self):
+        self.assertEqual(self.score(1, putts=2).status_code, 400)  # no strokes yet
+        self.assertEqual(self.score(1, strokes=0).status_code, 400)
+        self.assertEqual(self.score(1, strokes=4, fairway_hit="yes").status_code, 400)
+        self.assertEqual(self.score(19, strokes=4).status_code, 404)
+        self.assertFalse(HoleScore.objects.filter(round=self.round).exists())
+
+    def test_within_query_budget(self):
+        self.score(1, strokes=4)
+        forget_user(self.player.id)
+        with assert_query_budget("round_hole_score", method="PATCH"):
+            response = self.score(2, key="hole-2", strokes=4)
+        self.assertEqual(response.status_code, 201)
+
+
+class LeaderboardStreamTests(TestCase):
+    """Live leaderboard deltas are published only when a rank changes."""
+
+    def entry(self, user_id, average_score):
+        return {
+            "user_id": user_id,
+            "username": f"player{user_id}",
+            "average_score": average_score,
+            "handicap": None,
+            "total_rounds": 3,
+        }
+
+    def test_figures_without_rank_change_are_not_a_change(self):
+        old = standings([self.entry(1, 80.0), self.entry(2, 85.0)])
+        new = standings([self.entry(1, 79.0), self.entry(2, 85.0)])
+        ranks_changed, changed, removed = diff_standings(old, new)
+        self.assertFalse(ranks_changed)
+        self.assertEqual([entry["user_id"] for entry in changed], [1])
+        self.assertEqual(removed, [])
+
+    def test_rank_change_lists_moved_and_removed_players(self):
+        old = standings([self.entry(1, 80.0), self.entry(2, 85.0), self.entry(3, 90.0)])
+        new = standings([self.entry(2, 78.0), self.entry(1, 80.0)])
+        ranks_changed, changed, removed = diff_standings(old, new)
+        self.assertTrue(ranks_changed)
+        self.assertEqual([(e["user_id"], e["rank"]) for e in changed], [(2, 1), (1, 2)])
+        self.assertEqual(removed, [3])
+
+    def test_event_format(self):
+        self.assertEqual(
+            event("delta", 7, {"version": 7}),
+            'id: 7\nevent: delta\ndata: {"version":7}\n\n',
+        )
+
+    @override_settings(REDIS_URL="redis://localhost:6379/9")
+    async def test_stream_requires_authentication(self):
+        response = await AsyncClient().get(reverse("leaderboard_stream"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get(reverse("leaderboard_stream"))
+        self.assertEqual(response.status_code, 501)
+
+    class Redis:
+        """Async client stand-in returning one stored snapshot per get()."""
+
+        def __init__(self, *values):
+            self.values = list(values)
+
+        async def get(self, key):
+            return self.values.pop(0)
+
+    SNAPSHOT = '{"version":1,"standings":[]}'
+
+    @mock.patch("api.leaderboard_stream.publish_leaderboard")
+    async def test_first_snapshot_is_published_under_a_lock(self, publish):
+        cache.delete(REBUILD_KEY)
+        snapshot = await _snapshot(self.Redis(None, self.SNAPSHOT))
+        self.assertEqual(snapshot, {"version": 1, "standings": []})
+        publish.assert_called_once_with()
+        self.assertIsNone(cache.get(REBUILD_KEY))
+
+    @mock.patch("api.leaderboard_stream.REBUILD_POLL_SECONDS", 0)
+    @mock.patch("api.leaderboard_stream.publish_leaderboard")
+    async def test_other_watchers_wait_for_the_first_snapshot(self, publish):
+        cache.set(REBUILD_KEY, 1, 60)
+        self.addCleanup(cache.delete, REBUILD_KEY)
+        snapshot = await _snapshot(self.Redis(None, None, self.SNAPSHOT))
+        self.assertEqual(snapshot["version"], 1)
+        publish.assert_not_called()
+
+
+class HoleDifficultyTests(TestCase):
+    """Hole stats are materialized from every score and refreshed incrementally."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def play(self, strokes):
+        round_ = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        return HoleScore.objects.bulk_create(
+            HoleScore(
+                round=round_,
+                hole=hole,
+                strokes=count,
+                putts=2,
+                green_in_regulation=count <= hole.par,
+            )
+            for hole, count in zip(self.holes, strokes)
+        )
+
+    def later(self, minutes):
+        return timezone.now() + datetime.timedelta(minutes=minutes)
+
+    def test_rebuild_and_incremental_refresh(self):
+        self.play([4, 6])
+        self.play([4, 4])
+        rebuild_rollups()
+        first, second = (HoleStats.objects.get(hole=h) for h in self.holes[:2])
+        self.assertEqual((first.scores, first.strokes, first.greens), (2, 8, 2))
+        self.assertEqual((second.strokes, second.blow_ups), (10, 1))
+
+        # A new round and an edit are picked up
+        scores = self.play([8])
+        HoleScore.objects.filter(pk=scores[0].pk).update(
+            strokes=7, updated_at=timezone.now()
+        )
+        refresh_rollups(self.later(5))
+        first.refresh_from_db()
+        self.assertEqual((first.scores, first.strokes, first.blow_ups), (3, 15, 1))
+
+        # Deletes reach the table through the rollup backlog
+        HoleScore.objects.get(pk=scores[0].pk).delete()
+        refresh_rollups(self.later(10))
+        first.refresh_from_db()
+        self.assertEqual((first.scores, first.strokes), (2, 8))
+
+    def test_difficulty_ranks_holes_by_scoring_against_par(self):
+        self.play([4, 6, 5])
+        self.play([5, 7, 4])
+        rebuild_rollups()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+        url = reverse("course_hole_difficulty", kwargs={"course_id": self.course.id})
+        # Without Redis, the first request per interval writes the heartbeat
+        with mock.patch("api.presence._last_written", TTLCache(60)):
+            with self.assertNumQueries(3):
+                holes = client.get(url, {"tee_id": self.tee.id}).json()["holes"]
+        self.assertEqual(
+            [(h["hole_number"], h["avg_to_par"], h["difficulty_rank"]) for h in holes],
+            [(1, 0.5, 2), (2, 2.5, 1), (3, 0.5, 3)],
+        )
+        self.assertEqual((holes[1]["blow_up_pct"], holes[1]["gir_pct"]), (100.0, 0.0))
+        self.assertEqual(client.get(url, {"tee_id": "x"}).status_code, 400)
+
+
+class ScorePackingTests(TestCase):
+    """Packed rounds read the same as rounds stored as hole score rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create(username="golfer", email="g@example.com")
+        cls.course, cls.tee, cls.holes = make_course()
+
+    def setUp(self):
+        self.round = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee, is_complete=True
+        )
+        HoleScore.objects.bulk_create(
+            HoleScore(
+                round=self.round,
+                hole=hole,
+                strokes=3 + hole.hole_number % 4,
+                putts=hole.hole_number % 3,
+                fairway_hit=hole.hole_number % 2 == 0,
+                green_in_regulation=hole.hole_number % 3 == 0,
+                penalties=hole.hole_number % 5 == 0,
+            )
+            for hole in self.holes
+        )
+        Round.refresh_totals([self.round.id])
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.player).access_token}"
+        )
+
+    def detail(self):
+        url = reverse("round_detail", kwargs={"round_id": self.round.id})
+        return self.client.get(url).json()
+
+    def test_pack_round_trip_and_limits(self):
+        scores = [
+            PackedScore(1, 4, 2, True, False, 0),
+            PackedScore(18, 255, 15, False, True, 15),
+        ]
+        data = pack(scores)
+        self.assertEqual(len(data), 1 + 3 * len(scores))
+        self.assertEqual(unpack(memoryview(data)), scores)
+        with self.assertRaises(ValueError):
+            pack([PackedScore(1, 4, 16, False, False, 0)])
+        with self.assertRaises(ValueError):
+            unpack(b"\x09abc")
+
+    def test_packed_round_reads_like_hole_score_rows(self):
+        before = self.detail()
+        rebuild_rollups()
+        rollups = list(PlayerDailyStats.objects.values("rounds", "holes", "strokes"))
+
+        self.assertTrue(pack_round(self.round.id))
+        self.assertFalse(HoleScore.objects.filter(round=self.round).exists())
+        self.assertEqual(self.detail(), before)
+        rebuild_rollups()
+        self.assertEqual(
+            list(PlayerDailyStats.objects.values("rounds", "holes", "strokes")), rollups
+        )
+        self.assertFalse(pack_round(self.round.id))  # already packed
+
+    def test_round_with_scores_on_another_tee_stays_unpacked(self):
+        _, _, other_holes = make_course("Ridge")
+        HoleScore.objects.filter(round=self.round, hole=self.holes[0]).update(
+            hole=other_holes[0]
+        )
+        before = self.detail()
+        self.assertFalse(pack_round(self.round.id))
+        self.round.refresh_from_db()
+        self.assertIsNone(self.round.packed_scores)
+        self.assertEqual(HoleScore.objects.filter(round=self.round).count(), 18)
+        self.assertEqual(self.detail(), before)
+
+    def test_packing_leaves_derived_data_and_history_undecoded(self):
+        old = timezone.now() - datetime.timedelta(days=40)
+        Round.objects.filter(pk=self.round.pk).update(date_played=old)
+        rebuild_rollups()
+        first = HoleStats.objects.get(hole=self.holes[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(pack_round(self.round.id))
+        self.assertEqual(callbacks, [])
+        self.assertFalse(RollupBacklog.objects.exists())
+        self.round.refresh_from_db()
+        self.assertEqual((self.round.strokes_total, self.round.holes_played), (81, 18))
+
+        # Today's scores on the same holes do not decode the old packed round
+        today = Round.objects.create(
+            player=self.player, course=self.course, tee=self.tee
+        )
+        HoleScore.objects.create(round=today, hole=self.holes[0], strokes=9)
+        with mock.patch("api.score_packing.unpack", wraps=unpack) as decoded:
+            refresh_rollups(timezone.now() + datetime.timedelta(minutes=5))
+        decoded.assert_not_called()
+        stats = HoleStats.objects.get(hole=self.holes[0])
+        self.assertEqual(
+            (stats.scores, stats.strokes, stats.blow_ups),
+            (first.scores + 1, first.strokes + 9, first.blow_ups + 1),
+        )
+
+    def test_write_unpacks_round(self):
+        before = self.detail()
+        pack_round(self.round.id)
+        url = reverse(
+            "round_hole_score", kwargs={"round_id": self.round.id, "hole_number": 1}
+        )
+        response = self.client.patch(url, {"putts": 0}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.round.refresh_from_db()
+        self.assertIsNone(self.round.packed_scores)
+        self.assertEqual(HoleScore.objects.filter(round=self.round).count(), 18)
+        before["putt_total"] -= before["hole_scores"][0]["putts"]
+        after = self.detail()
+        self.assertEqual(after["putt_total"], before["putt_total"])
+        self.assertEqual(after["total_score"], before["total_score"])
+
+
+class TournamentTests(TestCase):
+    """Tournament standings rank each player's best eligible round."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course, cls.tee, cls.holes = make_course()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cls.tournament = Tournament.objects.create(
+            name="Club Championship",
+            course=cls.course,
+            tee=cls.tee,
+            starts_at=now - datetime.timedelta(days=1),
+            ends_at=now + datetime.timedelta(days=1),
+        )
+        cls.players = [
+            User.objects.create(username=name, email=f"{name}@example.com")
+            for name in ("ann", "bob", "cal", "dee")
+        ]
+        cls.staff = User.objects.create(
+            username="director", email="d@example.com", is_staff=True
+        )
+
+    def play(self, player, strokes, played=None):
+        """Record a round with the given strokes on the first holes."""
+        round_ = Round.objects.create(player=player, course=self.course, tee=self.tee)
+        HoleScore.objects.bulk_create(
+            HoleScore(round=round_, hole=hole, strokes=count)
+            for hole, count in zip(self.holes, strokes)
+        )
+        Round.refresh_totals([round_.pk])
+        if played is not None:
+            Round.objects.filter(pk=round_.pk).update(date_played=played)
+        return round_
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(user).access_token}"
+        )
+        return client
+
+    def standings(self, user, **params):
+        url = reverse(
+            "tournament_standings", kwargs={"tournament_id": self.tournament.id}
+        )
+        handicaps = {player.id: 10.0 * n for n, player in enumerate(self.players)}
+        with mock.patch(
+            "api.stats.player_handicaps",
+            side_effect=lambda ids: {user_id: handicaps.get(user_id) for user_id in ids},
+        ):
+            return self.client_for(user).get(url, params)
+
+    def test_course_handicap(self):
+        self.assertAlmostEqual(course_handicap(10.0, self.tee), 8.72, places=2)
+        self.assertEqual(course_handicap(None, self.tee), 0.0)
+
+    def test_gross_standings_use_best_round_with_shared_ranks(self):
+        ann, bob, cal, dee = self.players
+        self.play(ann, [5] * 18)  # +18
+        best = self.play(ann, [4] * 18)  # level
+        self.play(bob, [4] * 18)  # level
+        self.play(cal, [3] * 9)  # -9 through 9
+        before = self.tournament.starts_at - datetime.timedelta(days=2)
+        self.play(dee, [3] * 18, played=before)  # outside the window
+
+        data = self.standings(ann).json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(
+            [(e["username"], e["rank"], e["gross"]) for e in data["standings"]],
+            [("cal", 1, -9), ("ann", 2, 0), ("bob", 2, 0)],
+        )
+        self.assertEqual(data["standings"][1]["round_id"], best.id)
+        self.assertEqual((data["me"]["rank"], data["me"]["thru"]), (2, 18))
+
+        page = self.standings(dee, offset=1, limit=1).json()
+        self.assertEqual([e["username"] for e in page["standings"]], ["ann"])
+        self.assertIsNone(page["me"])
+
+    def test_net_standings_subtract_pro_rated_course_handicap(self):
+        ann, bob, cal, _ = self.players
+        self.play(ann, [4] * 18)  # index 0 on a tee rated under par: gives 2
+        self.play(bob, [5] * 18)  # index 10: +18 less 9 strokes
+        self.play(cal, [5] * 9)  # index 20: +9 less 10 strokes for 9 holes
+
+        data = self.standings(ann, type="net").json()
+        self.assertEqual(
+            [(e["username"], e["rank"], e["net"]) for e in data["standings"]],
+            [("cal", 1, -1), ("ann", 2, 2), ("bob", 3, 9)],
+        )
+        self.assertEqual(self.standings(ann, type="stableford").status_code, 400)
+
+    def test_ties_are_ordered_as_redis_orders_them(self):
+        # Redis orders tied members as strings, so "100" comes before "99"
+        for user_id in (99, 100):
+            player = User.objects.create(
+                id=user_id, username=f"p{user_id}", email=f"p{user_id}@example.com"
+            )
+            self.play(player, [4] * 18)
+        data = self.standings(self.players[0]).json()
+        self.assertEqual([e["user_id"] for e in data["standings"]], [100, 99])
+
+    def test_handicaps_are_read_for_all_entrants_at_once(self):
+        ann, bob, cal, _ = self.players
+        for strokes in (4, 5, 4):
+            self.play(ann, [strokes] * 18)
+        self.play(bob, [5] * 9)
+        cache.clear()
+        cache.set(f"player-stats:{cal.id}", {"handicap": 3.5})
+        with self.assertNumQueries(1):
+            handicaps = player_handicaps([ann.id, bob.id, cal.id])
+        self.assertEqual(
+            handicaps,
+            {
+                ann.id: build_player_stats(ann.id)["handicap"],
+                bob.id: build_player_stats(bob.id)["handicap"],
+                cal.id: 3.5,
+            },
+        )
+        self.assertIsNotNone(handicaps[ann.id])
+
+    @override_settings(REDIS_URL="redis://localhost:6379/9")
+    def test_readers_do_not_rebuild_while_another_process_does(self):
+        self.play(self.players[0], [4] * 18)
+        client = mock.Mock()
+        client.exists.return_value = False
+        cache.set(STANDINGS_REBUILD_KEY.format(id=self.tournament.id), 1, 60)
+        self.addCleanup(cache.clear)
+        with mock.patch("api.tournaments._redis", return_value=client), mock.patch(
+            "api.tournaments.rebuild_standings"
+        ) as rebuild:
+            data = self.standings(self.players[0]).json()
+        rebuild.assert_not_called()
+        self.assertEqual([e["username"] for e in data["standings"]], ["ann"])
+
+    def test_only_staff_create_tournaments(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        body = {
+            "name": "Spring Medal",
+            "course": self.course.id,
+            "tee": self.tee.id,
+            "starts_at": now.isoformat(),
+            "ends_at": (now + datetime.timedelta(hours=6)).isoformat(),
+        }
+        url = reverse("tournaments")
+        self.assertEqual(
+            self.client_for(self.players[0]).post(url, body, format="json").status_code,
+            403,
+        )
+        staff = self.client_for(self.staff)
+        self.assertEqual(staff.post(url, body, format="json").status_code, 201)
+        body["ends_at"] = body["starts_at"]
+        self.assertEqual(staff.post(url, body, format="json").status_code, 400)
+        names = [t["name"] for t in self.client_for(self.players[0]).get(url).json()]
+        self.assertEqual(names, ["Spring Medal", "Club Championship"])
+
+
+class UserListTests(TestCase):
+    """The user list is paged by cursor and searchable by name prefix."""
+
+    @classmethod
+    def setUpTestData(cls):
+        names = [
+            ("alice", "Alice", "Smith"),
+            ("bob", "Robert", "Smithers"),
+            ("carol", "Carol", "Jones"),
+            ("dave", "Dave", "Smith"),
+            ("smitty", "Sam", "Brown"),
+        ]
+        cls.users = [
+            User.objects.create(
+                username=username,
+                email=f"{username}@example.com",
+                first_name=first,
+                last_name=last,
+            )
+            for username, first, last in names
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.users[0]).access_token}"
+        )
+
+    def list_users(self, **params):
+        response = self.client.get(reverse("users"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_user_once(self):
+        seen, params = [], {"limit": 2}
+        while True:
+            page = self.list_users(**params)
+            self.assertLessEqual(len(page["users"]), 2)
+            seen.extend(user["username"] for user in page["users"])
+            if not page["next_cursor"]:
+                break
+            params["cursor"] = page["next_cursor"]
+        self.assertEqual(seen, sorted(user.username for user in self.users))
+
+    def test_search_matches_name_prefixes_ignoring_case(self):
+        page = self.list_users(search="SMI")
+        self.assertEqual(
+            [user["username"] for user in page["users"]],
+            ["alice", "bob", "dave", "smitty"],
+        )
+        self.assertEqual(
+            [user["username"] for user in self.list_users(search="rob")["users"]],
+            ["bob"],
+        )
+        self.assertEqual(self.list_users(search="smithx")["users"], [])
+
+    def test_search_pages_by_cursor(self):
+        first = self.list_users(search="smi", limit=3)
+        second = self.list_users(search="smi", limit=3, cursor=first["next_cursor"])
+        self.assertEqual([user["username"] for user in second["users"]], ["smitty"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_list_within_query_budget(self):
+        forget_user(self.users[0].id)
+        with assert_query_budget("users"):
+            page = self.list_users(search="a", limit=2)
+        self.assertEqual(
+            page["users"][0],
+            {
+                "username": "alice",
+                "email": "alice@example.com",
+                "first_name": "Alice",
+                "last_name": "Smith",
+            },
+        )
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get(reverse("users"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class FastSerializerTests(TestCase):
+    """The values()-based payloads render exactly what the DRF serializers do."""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_course("Pebble")
+        make_course("Ridge")
+        User.objects.create(username="zoë", email="z@example.com", first_name="Zoë\u2028")
+        User.objects.create(username="sam", email="s@example.com", last_name="Lee")
+
+    def test_course_catalog_matches_course_serializer(self):
+        courses = Course.objects.prefetch_related("tees__holes").all()
+        expected = JSONRenderer().render(CourseSerializer(courses, many=True).data)
+        with self.assertNumQueries(3):
+            catalog = course_catalog()
+        self.assertEqual(dumps(catalog), expected)
+
+    def test_user_rows_match_user_serializer(self):
+        expected = JSONRenderer().render(
+            {"users": UserSerializer(User.objects.all(), many=True).data}
+        )
+        self.assertEqual(dumps({"users": user_rows(User.objects.all())}), expected)
+
+    def test_dumps_matches_json_renderer(self):
+        payload = {
+            "date": datetime.date(2025, 6, 1),
+            "at": datetime.datetime(
+                2025, 6, 1, 9, 30, 5, 120, tzinfo=datetime.timezone.utc
+            ),
+            "score": 71.5,
+            "note": "Birdie on 7 \u2029",
+            "flags": [True, False, None],
+        }
+        self.assertEqual(dumps(payload), JSONRenderer().render(payload))
+
+    @skipUnless(_load_orjson(), "orjson is not installed")
+    def test_orjson_output_matches_json_renderer(self):
+        payload = {
+            7: "hole",
+            None: 0,
+            "rating": decimal.Decimal("71.20"),
+            "tee_time": datetime.time(8, 10, 30, 500),
+            "at": datetime.datetime(2025, 6, 1, 9, 30, 5),
+        }
+        self.assertEqual(dumps(payload), JSONRenderer().render(payload))
+        # Where JSONRenderer refuses non-finite floats, orjson writes null
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"avg": float("nan")})
+        self.assertEqual(dumps({"avg": float("nan")}), b'{"avg":null}')
+
+
+class CourseCatalogVersionTests(TransactionTestCase):
+    """Course data writes bump the catalog version once they commit."""
+
+    def test_tee_change_invalidates_etag(self):
+        player = User.objects.create(username="browser", email="b@example.com")
+        course, tee, holes = make_course()
+        cache.clear()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(player).access_token}"
+        )
+        etag = client.get(reverse("courses"))["ETag"]
+
+        tee.tee_name = "Black"
+        tee.save()
+
+        response = client.get(reverse("courses"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[0]["tees"][0]["tee_name"], "Black")
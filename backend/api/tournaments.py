@@ -0,0 +1,411 @@
+"""
+╔════════════════════════════════════════════════════════════════════╗
+║ Python Script                                                      ║
+╠════════════════════════════════════════════════════════════════════╣
+║ Author : Brodie Rogers                                             ║
+║ Contact : Brodieman500@gmail.com                                   ║
+║ Created : 05-06-2025                                               ║
+║ Purpose : Live tournament standings in Redis sorted sets           ║
+║ Notes : Ollama is the best                                         ║
+╚════════════════════════════════════════════════════════════════════╝
+
+
+This module keeps gross and net standings for each Tournament.
+
+A player's entry is their best eligible round, scored to par over the
+holes played so far so rounds in progress rank fairly. Net subtracts the
+player's course handicap (from their handicap index, the tee's slope and
+rating), pro-rated for the holes played.
+
+With Redis each tournament has two sorted sets, scored by gross and net to
+par, and a hash of entry details:
+
+    tournament:<id>:gross     player id -> gross to par
+    tournament:<id>:net       player id -> net to par
+    tournament:<id>:entries   player id -> entry JSON
+    tournament:<id>:built     present once the keys hold a full build
+    tournament:<id>:pending   players updated while the keys were unbuilt
+
+Rank lookups and top-N pages are ZCOUNT/ZRANGE calls, O(log n) plus the
+page. Members tied on score are ordered by player id as a string, as
+Redis orders them, and the database fallback sorts the same way. Round
+and hole score writes queue an update of the writer's entry once they
+commit; other players' net figures keep the handicap they had when their
+entry was last written. Keys are rebuilt from the database on demand: on
+the first read after they are lost, by one process under a cache lock
+while concurrent readers fall back to the database, or through the
+rebuild endpoint. Updates that land while a rebuild reads the database
+are queued in the pending set and applied once it has written the keys.
+Without REDIS_URL standings are computed from the database per request.
+"""
+
+import builtins
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .fast_serializers import dumps
+from .leaderboard import _redis
+from .score_packing import packed_score_rows
+
+logger = logging.getLogger(__name__)
+
+KEY = "tournament:{id}:{part}"
+# Events whose standings count a round, to update when it moves or goes
+ROUND_KEY = "tournament:round:{round_id}"
+PENDING_KEY = "tournament:pending:{round_id}"
+REBUILD_KEY = "tournament:rebuild:{id}"
+KINDS = ("gross", "net")
+
+# Seconds the rebuild lock and a queued pending player are kept
+REBUILD_TIMEOUT = 5 * 60
+
+
+def _key(tournament_id, part):
+    return KEY.format(id=tournament_id, part=part)
+
+
+def course_handicap(handicap_index, tee):
+    """
+    Strokes a player receives on a tee.
+
+    Args:
+        handicap_index (float or None): Player's handicap index
+        tee: Tee played
+
+    Returns:
+        float: Course handicap, 0 without a handicap index
+    """
+    if handicap_index is None:
+        return 0.0
+    rating_offset = tee.course_rating - tee.par_total
+    return handicap_index * tee.slope_rating / 113 + rating_offset
+
+
+def compute_entries(tournament, player_ids=None):
+    """
+    Each player's best round in a tournament, from the database.
+
+    Args:
+        tournament: Tournament to score
+        player_ids (iterable, optional): Limit to these players
+
+    Returns:
+        dict: Player ID -> entry dict
+    """
+    from .models import Round
+    from .stats import player_handicaps
+
+    rounds = Round.objects.filter(
+        course_id=tournament.course_id,
+        tee_id=tournament.tee_id,
+        date_played__gte=tournament.starts_at,
+        date_played__lte=tournament.ends_at,
+    )
+    if player_ids is not None:
+        rounds = rounds.filter(player_id__in=list(player_ids))
+    rows = (
+        rounds.annotate(
+            strokes=Coalesce(Sum("hole_scores__strokes"), 0),
+            par_played=Coalesce(Sum("hole_scores__hole__par"), 0),
+            holes=Count("hole_scores"),
+        )
+        .filter(holes__gt=0)
+        .order_by("id")
+        .values_list(
+            "id", "player_id", "player__username", "strokes", "par_played", "holes"
+        )
+    )
+
+    rows = list(rows)
+
+    # Packed rounds have no hole score rows; total them from their scores
+    packed = {}
+    for row in packed_score_rows(rounds):
+        entry = packed.setdefault(row["round_id"], [row["round__player_id"], 0, 0, 0])
+        entry[1] += row["strokes"]
+        entry[2] += row["hole__par"]
+        entry[3] += 1
+    if packed:
+        from .models import User
+
+        usernames = dict(
+            User.objects.filter(
+                id__in={entry[0] for entry in packed.values()}
+            ).values_list("id", "username")
+        )
+        rows += [
+            (round_id, player_id, usernames.get(player_id), strokes, par, holes)
+            for round_id, (player_id, strokes, par, holes) in packed.items()
+        ]
+        rows.sort()
+
+    best = {}
+    for round_id, player_id, username, strokes, par_played, holes in rows:
+        gross = strokes - par_played
+        current = best.get(player_id)
+        # Lower to par wins; more holes played breaks a tie
+        if current is None or (gross, -holes) < (current["gross"], -current["thru"]):
+            best[player_id] = {
+                "user_id": player_id,
+                "username": username,
+                "round_id": round_id,
+                "strokes": strokes,
+                "gross": gross,
+                "thru": holes,
+            }
+
+    tee = tournament.tee
+    handicaps = player_handicaps(best)
+    for player_id, entry in best.items():
+        allowance = course_handicap(handicaps.get(player_id), tee)
+        allowance *= entry["thru"] / tee.number_of_holes
+        entry["net"] = entry["gross"] - builtins.round(allowance)
+    return best
+
+
+def _ranked(entries, kind):
+    """Entries sorted for a standings kind, with tied ranks."""
+    # Ties in the order Redis keeps equal scores: by member, a string
+    ordered = sorted(entries, key=lambda entry: (entry[kind], str(entry["user_id"])))
+    ranked, previous = [], None
+    for position, entry in enumerate(ordered, start=1):
+        if previous is None or entry[kind] != previous[kind]:
+            rank = position
+        ranked.append({"rank": rank, **entry})
+        previous = entry
+    return ranked
+
+
+def rebuild_standings(tournament):
+    """
+    Replace a tournament's Redis standings with a fresh build.
+
+    The keys read as unbuilt while the database is read, so concurrent
+    updates queue their player instead of being overwritten; those players
+    are updated once the build is written.
+
+    Args:
+        tournament: Tournament to rebuild
+
+    Returns:
+        int: Number of entries
+    """
+    client = _redis()
+    if client is None:
+        return len(compute_entries(tournament))
+
+    client.delete(_key(tournament.id, "built"))
+    entries = compute_entries(tournament)
+
+    pipe = client.pipeline()
+    for part in (*KINDS, "entries", "built"):
+        pipe.delete(_key(tournament.id, part))
+    for kind in KINDS:
+        if entries:
+            pipe.zadd(
+                _key(tournament.id, kind),
+                {player_id: entry[kind] for player_id, entry in entries.items()},
+            )
+    if entries:
+        pipe.hset(
+            _key(tournament.id, "entries"),
+            mapping={player_id: dumps(entry) for player_id, entry in entries.items()},
+        )
+    for entry in entries.values():
+        pipe.sadd(ROUND_KEY.format(round_id=entry["round_id"]), tournament.id)
+    pipe.set(_key(tournament.id, "built"), 1)
+    pipe.execute()
+
+    pending = _key(tournament.id, "pending")
+    while True:
+        player_ids = client.spop(pending, 100)
+        if not player_ids:
+            break
+        for player_id in player_ids:
+            update_player(tournament, int(player_id))
+    return len(entries)
+
+
+def update_player(tournament, player_id):
+    """
+    Recompute one player's entry and write it to Redis.
+
+    Until the tournament's keys have been built the player is only queued
+    in the pending set, for a rebuild in progress to apply; the first read
+    builds them with this player's rounds included otherwise.
+
+    Args:
+        tournament: Tournament the player's rounds count for
+        player_id (int): ID of the player
+    """
+    client = _redis()
+    if client is None:
+        return
+    built = _key(tournament.id, "built")
+    if not client.exists(built):
+        pending = _key(tournament.id, "pending")
+        pipe = client.pipeline()
+        pipe.sadd(pending, player_id)
+        pipe.expire(pending, REBUILD_TIMEOUT)
+        pipe.execute()
+        # A rebuild that finished meanwhile may have missed the queued player
+        if not client.exists(built):
+            return
+    entry = compute_entries(tournament, [player_id]).get(player_id)
+    previous = client.hget(_key(tournament.id, "entries"), player_id)
+    pipe = client.pipeline()
+    if previous is not None:
+        previous_round = json.loads(previous)["round_id"]
+        if entry is None or entry["round_id"] != previous_round:
+            pipe.srem(ROUND_KEY.format(round_id=previous_round), tournament.id)
+    if entry is None:
+        for kind in KINDS:
+            pipe.zrem(_key(tournament.id, kind), player_id)
+        pipe.hdel(_key(tournament.id, "entries"), player_id)
+    else:
+        for kind in KINDS:
+            pipe.zadd(_key(tournament.id, kind), {player_id: entry[kind]})
+        pipe.hset(_key(tournament.id, "entries"), player_id, dumps(entry))
+        pipe.sadd(ROUND_KEY.format(round_id=entry["round_id"]), tournament.id)
+    pipe.execute()
+
+
+def round_written(player_id, round_id):
+    """
+    Update a player's standings in the events a round affects.
+
+    Those are the events the round is eligible for now, plus any whose
+    standings already count it, in case it was moved or deleted.
+
+    Args:
+        player_id (int): ID of the player
+        round_id (int): ID of the round written
+    """
+    from .models import Round, Tournament
+
+    client = _redis()
+    if client is None:
+        return
+    try:
+        members = client.smembers(ROUND_KEY.format(round_id=round_id))
+        counted = {int(tournament_id) for tournament_id in members}
+        scope = (
+            Round.objects.filter(pk=round_id)
+            .values_list("course_id", "tee_id", "date_played")
+            .first()
+        )
+        eligible = Q(pk__in=counted)
+        if scope is not None:
+            course_id, tee_id, date_played = scope
+            eligible |= Q(
+                course_id=course_id,
+                tee_id=tee_id,
+                starts_at__lte=date_played,
+                ends_at__gte=date_played,
+            )
+        for tournament in Tournament.objects.select_related("tee").filter(eligible):
+            update_player(tournament, player_id)
+    except Exception as e:
+        logger.warning("Tournament standings not updated for round %s: %s", round_id, e)
+
+
+def queue_standings_update(player_id, round_id):
+    """
+    Queue round_written for a round, once per burst of writes to it.
+
+    Args:
+        player_id (int): ID of the player
+        round_id (int): ID of the round written
+    """
+    if not getattr(settings, "REDIS_URL", ""):
+        return
+    if not cache.add(PENDING_KEY.format(round_id=round_id), 1, timeout=60):
+        return
+
+    from .tasks import update_tournament_standings
+
+    try:
+        update_tournament_standings.delay(player_id, round_id)
+    except Exception as e:
+        cache.delete(PENDING_KEY.format(round_id=round_id))
+        logger.warning("Unable to queue standings update for round %s: %s", round_id, e)
+
+
+def _database_standings(tournament, kind, offset, limit, player_id):
+    """A page of standings computed from the database (see standings())."""
+    ranked = _ranked(compute_entries(tournament).values(), kind)
+    me = next((entry for entry in ranked if entry["user_id"] == player_id), None)
+    return {
+        "total": len(ranked),
+        "standings": ranked[offset : offset + limit],
+        "me": me,
+    }
+
+
+def standings(tournament, kind="gross", offset=0, limit=50, player_id=None):
+    """
+    A page of a tournament's standings.
+
+    Args:
+        tournament: Tournament to read
+        kind (str): "gross" or "net"
+        offset (int): Entries to skip
+        limit (int): Entries to return
+        player_id (int, optional): Player whose own entry is also returned
+
+    Returns:
+        dict: {"total": int, "standings": [...], "me": entry or None}; each
+            entry has rank (tied players share one), user_id, username,
+            round_id, strokes, gross, net and thru
+    """
+    client = _redis()
+    if client is None:
+        return _database_standings(tournament, kind, offset, limit, player_id)
+
+    if not client.exists(_key(tournament.id, "built")):
+        lock = REBUILD_KEY.format(id=tournament.id)
+        if not cache.add(lock, 1, timeout=REBUILD_TIMEOUT):
+            # Another process is rebuilding; answer from the database
+            return _database_standings(tournament, kind, offset, limit, player_id)
+        try:
+            rebuild_standings(tournament)
+        finally:
+            cache.delete(lock)
+
+    ranking = _key(tournament.id, kind)
+    members = client.zrange(ranking, offset, offset + limit - 1, withscores=True)
+    pipe = client.pipeline()
+    pipe.zcard(ranking)
+    if members:
+        # Rank of the first entry on the page counts everyone strictly ahead
+        pipe.zcount(ranking, "-inf", f"({members[0][1]}")
+        pipe.hmget(_key(tournament.id, "entries"), [member for member, _ in members])
+    if player_id is not None:
+        pipe.zscore(ranking, player_id)
+        pipe.hget(_key(tournament.id, "entries"), player_id)
+    results = pipe.execute()
+
+    total = results.pop(0)
+    page = []
+    if members:
+        ahead, details = results.pop(0), results.pop(0)
+        rank, previous = ahead + 1, None
+        for position, ((member, score), raw) in enumerate(zip(members, details)):
+            if previous is not None and score != previous:
+                rank = offset + position + 1
+            previous = score
+            if raw is not None:
+                page.append({"rank": rank, **json.loads(raw)})
+
+    me = None
+    if player_id is not None:
+        score, raw = results
+        if score is not None and raw is not None:
+            ahead = client.zcount(ranking, "-inf", f"({score}")
+            me = {"rank": ahead + 1, **json.loads(raw)}
+    return {"total": total, "standings": page, "me": me}
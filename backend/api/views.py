@@ -10,7 +10,7 @@
 
 
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import User
+from .models import User, Course, Tee, Hole, Round, HoleScore, Tournament
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
@@ -19,25 +19,94 @@ from .serializers import (
     UserSerializer,
     LoginSerializer,
     CourseSerializer,
+    TournamentSerializer,
 )
-from django.http import StreamingHttpResponse
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.conf import settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+import hmac
 import os
 import requests
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import tokens_for_user
+from .catalog import bump_catalog_version, get_catalog
+from .leaderboard import build_leaderboard
+from .fast_serializers import USER_FIELDS, user_rows
+from .idempotency import idempotent
 from django.db import transaction
-from .chat_bot import ChatBot
-from .ollama_vision import ChatBot as VisionChatBot
+from django.db.models import Prefetch
+from .response_cache import replay
+from .score_packing import unpack_round
+from .llm_gateway import GatewayBusy
+from .chat_context import get_chat_context
+from .ollama_residency import residency_report
+from .metrics import registry
+from .pagination import after, decode_cursor, encode_cursor, page_size
+from .presence import record_heartbeat
+from .stats import (
+    PERIODS,
+    course_stats,
+    get_player_stats,
+    hole_difficulty,
+    player_trends,
+)
+from .tournaments import KINDS, rebuild_standings, standings
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils import timezone
+from datetime import timedelta
 import tempfile
-import builtins
 import logging
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
 
+def gateway_busy_response(exc):
+    """
+    Build a 503 response for a request the LLM gateway refused to admit.
+
+    Args:
+        exc: The GatewayBusy error raised by the gateway
+
+    Returns:
+        Response: Error payload with a Retry-After header
+    """
+    response = Response(
+        {
+            "error": "The AI coach is busy right now, please try again shortly.",
+            "retry_after": exc.retry_after,
+        },
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+def date_param(request, name):
+    """
+    Parse an optional YYYY-MM-DD query parameter.
+
+    Args:
+        request: HTTP request
+        name (str): Query parameter name
+
+    Returns:
+        date or None: The parsed date, or None if the parameter is absent
+
+    Raises:
+        ValueError: If the parameter is not a valid date
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(name)
+    return parsed
+
+
 class HealthCheckView(APIView):
     """
     Health check endpoint to verify if the API is running.
@@ -105,8 +174,9 @@ class LoginUserView(APIView):
             user.is_online = True
             user.last_login = timezone.now()
             user.save()
+            record_heartbeat(user.id)
 
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
 
             return Response(
                 {
@@ -130,29 +200,63 @@ class UsersView(APIView):
     """
     API endpoint for retrieving user information.
 
-    Allows fetching details for a specific user or listing all users.
-    Requires authentication to access.
+    Allows fetching details for a specific user or paging through users,
+    optionally filtered by a name prefix. Requires authentication to access.
     """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request, user_id=None):
         """
-        Retrieve user data for a specific user or list all users.
+        Retrieve user data for a specific user or a page of users.
+
+        Users are listed by username and paged by cursor, so each page is a
+        bounded index scan however many members there are.
+
+        Query Parameters:
+            search (str): Prefix of a username, first or last name (optional)
+            cursor (str): next_cursor from the previous page (optional)
+            limit (int): Users per page (default: USER_PAGE_SIZE)
 
         Args:
             request: HTTP request
             user_id: Optional ID of specific user to retrieve
 
         Returns:
-            Response: Serialized user data
+            Response: {"user": {...}} or {"users": [...], "next_cursor": str or None}
         """
         if user_id:
-            user = get_object_or_404(User, pk=user_id)
-            return Response({"user": UserSerializer(user).data})
-        else:
-            users = User.objects.all()
-            return Response({"users": UserSerializer(users, many=True).data})
+            user = get_object_or_404(User.objects.values(*USER_FIELDS), pk=user_id)
+            return Response({"user": user})
+
+        users = User.objects.all()
+        search = request.query_params.get("search", "").strip()
+        if search:
+            users = users.search(search)
+        try:
+            limit = page_size(
+                request,
+                getattr(settings, "USER_PAGE_SIZE", 50),
+                getattr(settings, "USER_PAGE_SIZE_MAX", 200),
+            )
+            cursor = request.query_params.get("cursor")
+            if cursor:
+                (username,) = decode_cursor(cursor, 1)
+                if not isinstance(username, str):
+                    raise ValueError("cursor")
+                users = users.filter(after(["username"], [username], descending=False))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "cursor must come from next_cursor and limit be a positive number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        page = user_rows(users.order_by("username")[: limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor([page[-1]["username"]])
+        return Response({"users": page, "next_cursor": next_cursor})
 
 
 class CourseSearchAPIView(APIView):
@@ -232,6 +336,10 @@ class CourseSearchAPIView(APIView):
 
                     traceback.print_exc()
 
+            # Hole upserts bypass model signals, so refresh the catalog here too
+            if saved_courses:
+                bump_catalog_version()
+
             return Response(data)
 
         except requests.RequestException as e:
@@ -307,37 +415,49 @@ class CourseSearchAPIView(APIView):
                 f"Processing tee: {tee_name} ({gender}) for course {course.course_name}"
             )
 
-            tee, created = Tee.objects.update_or_create(
-                course=course,
-                tee_name=tee_name,
-                gender=gender,
-                defaults={
-                    "course_rating": tee_data.get("course_rating", 0.0),
-                    "slope_rating": tee_data.get("slope_rating", 0),
-                    "bogey_rating": tee_data.get("bogey_rating", 0.0),
-                    "total_yards": tee_data.get("total_yards", 0),
-                    "total_meters": tee_data.get("total_meters", 0),
-                    "number_of_holes": tee_data.get("number_of_holes", 18),
-                    "par_total": tee_data.get("par_total", 72),
-                    "front_course_rating": tee_data.get("front_course_rating", 0.0),
-                    "front_slope_rating": tee_data.get("front_slope_rating", 0),
-                    "front_bogey_rating": tee_data.get("front_bogey_rating", 0.0),
-                    "back_course_rating": tee_data.get("back_course_rating", 0.0),
-                    "back_slope_rating": tee_data.get("back_slope_rating", 0),
-                    "back_bogey_rating": tee_data.get("back_bogey_rating", 0.0),
-                },
-            )
+            defaults = {
+                "course_rating": tee_data.get("course_rating", 0.0),
+                "slope_rating": tee_data.get("slope_rating", 0),
+                "bogey_rating": tee_data.get("bogey_rating", 0.0),
+                "total_yards": tee_data.get("total_yards", 0),
+                "total_meters": tee_data.get("total_meters", 0),
+                "number_of_holes": tee_data.get("number_of_holes", 18),
+                "par_total": tee_data.get("par_total", 72),
+                "front_course_rating": tee_data.get("front_course_rating", 0.0),
+                "front_slope_rating": tee_data.get("front_slope_rating", 0),
+                "front_bogey_rating": tee_data.get("front_bogey_rating", 0.0),
+                "back_course_rating": tee_data.get("back_course_rating", 0.0),
+                "back_slope_rating": tee_data.get("back_slope_rating", 0),
+                "back_bogey_rating": tee_data.get("back_bogey_rating", 0.0),
+            }
 
-            for i, hole_data in enumerate(tee_data.get("holes", []), 1):
-                hole, hole_created = Hole.objects.update_or_create(
-                    tee=tee,
-                    hole_number=i,
-                    defaults={
-                        "par": hole_data.get("par", 4),
-                        "yardage": hole_data.get("yardage", 0),
-                        "handicap": hole_data.get("handicap", 0),
-                    },
+            # Tee names are unique per course and gender ignoring case
+            tee = Tee.objects.filter(course=course, gender=gender).named(tee_name).first()
+            if tee is None:
+                tee = Tee.objects.create(
+                    course=course, tee_name=tee_name, gender=gender, **defaults
                 )
+            else:
+                for field, value in defaults.items():
+                    setattr(tee, field, value)
+                tee.save()
+
+            # One upsert for every hole, keyed on (tee, hole_number)
+            Hole.objects.bulk_create(
+                [
+                    Hole(
+                        tee=tee,
+                        hole_number=i,
+                        par=hole_data.get("par", 4),
+                        yardage=hole_data.get("yardage", 0),
+                        handicap=hole_data.get("handicap", 0),
+                    )
+                    for i, hole_data in enumerate(tee_data.get("holes", []), 1)
+                ],
+                update_conflicts=True,
+                unique_fields=["tee", "hole_number"],
+                update_fields=["par", "yardage", "handicap", "updated_at"],
+            )
 
             return tee
         except Exception as e:
@@ -353,6 +473,9 @@ class SavedCourseView(APIView):
     API endpoint for retrieving saved golf courses.
 
     Returns a list of all courses stored in the database with their associated tees and holes.
+    The list is served pre-serialized from a versioned cache (see catalog.py)
+    with an ETag, so clients that send If-None-Match get a 304 when nothing
+    changed, and gzip when they accept it.
     """
 
     permission_classes = [IsAuthenticated]
@@ -365,11 +488,39 @@ class SavedCourseView(APIView):
             request: HTTP request
 
         Returns:
-            Response: List of serialized course data
+            HttpResponse: Course catalog JSON, or 304 Not Modified
         """
-        courses = Course.objects.prefetch_related("tees__holes").all()
-        serializer = CourseSerializer(courses, many=True)
-        return Response(serializer.data)
+        catalog = get_catalog()
+        etag = catalog["etag"]
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        client_etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        if "*" in client_etags or etag in client_etags:
+            response = HttpResponseNotModified()
+        elif "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(catalog["gzip"], content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(catalog["json"], content_type="application/json")
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Accept-Encoding", "Authorization"])
+        return response
+
+
+# Round list fields a client may ask for, mapped to the column each is read from
+ROUND_LIST_FIELDS = {
+    "id": "id",
+    "date_played": "date_played",
+    "course": "course__course_name",
+    "course_id": "course_id",
+    "tee": "tee__tee_name",
+    "total_score": "strokes_total",
+    "holes_played": "holes_played",
+    "is_complete": "is_complete",
+}
+DEFAULT_ROUND_LIST_FIELDS = ("id", "date_played", "course", "tee", "total_score")
 
 
 class RoundView(APIView):
@@ -381,6 +532,7 @@ class RoundView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     @transaction.atomic
     def post(self, request, round_id=None):
         """
@@ -423,9 +575,7 @@ class RoundView(APIView):
                 course = Course.objects.get(id=course_id)
                 logger.info("Found course: %s (ID: %d)", course.course_name, course.id)
 
-                tee = Tee.objects.filter(
-                    course=course, tee_name__iexact=tee_name
-                ).first()
+                tee = Tee.objects.filter(course=course).named(tee_name).first()
 
                 if not tee:
                     available_tees = Tee.objects.filter(course=course)
@@ -460,8 +610,17 @@ class RoundView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            holes = Hole.objects.in_bulk(
+                [
+                    score_data["hole_id"]
+                    for score_data in hole_scores_data
+                    if score_data.get("hole_id")
+                ]
+            )
+
             if round_id is not None:
-                round_obj = get_object_or_404(Round, id=round_id, player=request.user)
+                round_obj = get_object_or_404(Round, id=round_id, player_id=request.user.id)
+                unpack_round(round_obj)
                 round_obj.tee = tee
                 round_obj.course = course
 
@@ -478,7 +637,9 @@ class RoundView(APIView):
                     if not hole_id:
                         continue
 
-                    hole = get_object_or_404(Hole, id=hole_id)
+                    hole = holes.get(hole_id)
+                    if hole is None:
+                        raise Hole.DoesNotExist(f"Hole with ID {hole_id} not found")
 
                     HoleScore.objects.update_or_create(
                         round=round_obj,
@@ -500,7 +661,7 @@ class RoundView(APIView):
             else:
                 round_obj = Round.objects.create(
                     tee=tee,
-                    player=request.user,
+                    player_id=request.user.id,
                     course=course,
                     notes=data.get("notes", ""),
                 )
@@ -511,15 +672,19 @@ class RoundView(APIView):
 
                 logger.info("Created new round: %d", round_obj.id)
 
+                new_scores = []
                 for score_data in hole_scores_data:
                     hole_id = score_data.get("hole_id")
                     if not hole_id:
                         continue
 
-                    try:
-                        hole = Hole.objects.get(id=hole_id)
+                    hole = holes.get(hole_id)
+                    if hole is None:
+                        logger.warning("Hole with ID %s not found. Skipping.", hole_id)
+                        continue
 
-                        HoleScore.objects.create(
+                    new_scores.append(
+                        HoleScore(
                             round=round_obj,
                             hole=hole,
                             strokes=score_data.get("strokes", 0),
@@ -530,9 +695,16 @@ class RoundView(APIView):
                             ),
                             penalties=score_data.get("penalties", 0),
                         )
-                    except Hole.DoesNotExist:
-                        logger.warning("Hole with ID %d not found. Skipping.", hole_id)
-                        continue
+                    )
+
+                # One insert for the scorecard; bulk_create skips the per-score
+                # signals, and the round's own save already queued invalidation
+                HoleScore.objects.bulk_create(new_scores)
+                Round.add_to_totals(
+                    round_obj.id,
+                    sum(score.strokes for score in new_scores),
+                    len(new_scores),
+                )
 
                 message = "Scorecard created successfully"
                 status_code = status.HTTP_201_CREATED
@@ -581,11 +753,20 @@ class RoundView(APIView):
         """
         if round_id:
             try:
-                round_obj = Round.objects.prefetch_related("hole_scores__hole").get(
-                    id=round_id
+                round_obj = (
+                    Round.objects.select_related("course", "tee")
+                    .prefetch_related(
+                        Prefetch(
+                            "hole_scores",
+                            queryset=HoleScore.objects.select_related("hole").order_by(
+                                "hole__hole_number"
+                            ),
+                        )
+                    )
+                    .get(id=round_id)
                 )
 
-                if round_obj.player != request.user:
+                if round_obj.player_id != request.user.id:
                     return Response(
                         {"error": "You are not permitted to view this round"},
                         status=status.HTTP_403_FORBIDDEN,
@@ -594,7 +775,7 @@ class RoundView(APIView):
                 return Response(
                     {
                         "id": round_obj.id,
-                        "player": round_obj.player.username,
+                        "player": request.user.username,
                         "date_played": round_obj.date_played,
                         "course": round_obj.course.course_name,
                         "tee": round_obj.tee.tee_name,
@@ -620,9 +801,7 @@ class RoundView(APIView):
                                 "green_in_regulation": score.green_in_regulation,
                                 "penalties": score.penalties,
                             }
-                            for score in round_obj.hole_scores.all().order_by(
-                                "hole__hole_number"
-                            )
+                            for score in round_obj.scores()
                         ],
                     },
                     status=status.HTTP_200_OK,
@@ -633,22 +812,223 @@ class RoundView(APIView):
                     status=status.HTTP_404_NOT_FOUND,
                 )
         else:
-            rounds = Round.objects.filter(player=request.user).order_by("-date_played")
+            return self.list_rounds(request)
+
+    def list_rounds(self, request):
+        """
+        Page through the current user's rounds, newest first.
 
+        Rounds are ordered by (date_played, id) and paged by cursor, so every
+        page costs the same however far back the history goes. Totals come
+        from the stored Round.strokes_total and Round.holes_played columns.
+
+        Query Parameters:
+            cursor (str): next_cursor from the previous page (optional)
+            limit (int): Rounds per page (default: ROUND_PAGE_SIZE)
+            fields (str): Comma-separated subset of ROUND_LIST_FIELDS (optional)
+
+        Args:
+            request: HTTP request
+
+        Returns:
+            Response: {"rounds": [...], "next_cursor": str or None}
+        """
+        requested = request.query_params.get("fields")
+        fields = (
+            [name.strip() for name in requested.split(",") if name.strip()]
+            if requested
+            else list(DEFAULT_ROUND_LIST_FIELDS)
+        )
+        unknown = [name for name in fields if name not in ROUND_LIST_FIELDS]
+        if unknown or not fields:
             return Response(
-                [
-                    {
-                        "id": round_obj.id,
-                        "date_played": round_obj.date_played,
-                        "course": round_obj.course.course_name,
-                        "tee": round_obj.tee.tee_name,
-                        "total_score": round_obj.total_score,
-                    }
-                    for round_obj in rounds
+                {"error": f"fields must be from {', '.join(ROUND_LIST_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rounds = Round.objects.filter(player_id=request.user.id)
+        try:
+            limit = page_size(
+                request,
+                getattr(settings, "ROUND_PAGE_SIZE", 50),
+                getattr(settings, "ROUND_PAGE_SIZE_MAX", 200),
+            )
+            cursor = request.query_params.get("cursor")
+            if cursor:
+                played, last_id = decode_cursor(cursor, 2)
+                played = parse_datetime(played)
+                if played is None or not isinstance(last_id, int):
+                    raise ValueError("cursor")
+                rounds = rounds.filter(after(["date_played", "id"], [played, last_id]))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "cursor must come from next_cursor and limit be a positive number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        columns = {ROUND_LIST_FIELDS[name] for name in fields}
+        columns.update(("id", "date_played"))
+        if "total_score" in fields or "holes_played" in fields:
+            columns.update(("strokes_total", "holes_played"))
+        page = list(
+            rounds.order_by("-date_played", "-id").values(*columns)[: limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        # Rounds saved before totals were stored, until they are backfilled
+        missing = [row["id"] for row in page if row.get("holes_played", 0) is None]
+        if missing:
+            totals = Round.computed_totals(missing)
+            for row in page:
+                if row["id"] in totals:
+                    row["strokes_total"], row["holes_played"] = totals[row["id"]]
+
+        next_cursor = None
+        if has_more:
+            last = page[-1]
+            next_cursor = encode_cursor([last["date_played"].isoformat(), last["id"]])
+
+        return Response(
+            {
+                "rounds": [
+                    {name: row[ROUND_LIST_FIELDS[name]] for name in fields}
+                    for row in page
                 ],
-                status=status.HTTP_200_OK,
+                "next_cursor": next_cursor,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+# Hole score fields accepted by RoundHoleScoreView, with their types and minimums
+HOLE_SCORE_FIELDS = {
+    "strokes": (int, 1),
+    "putts": (int, 0),
+    "fairway_hit": (bool, None),
+    "green_in_regulation": (bool, None),
+    "penalties": (int, 0),
+}
+
+
+class RoundHoleScoreView(APIView):
+    """
+    API endpoint for entering a round hole by hole.
+
+    Upserts the score for one hole instead of resubmitting the whole card,
+    and accepts an Idempotency-Key header so retried requests write once.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    @transaction.atomic
+    def patch(self, request, round_id, hole_number):
+        """
+        Create or update the score for one hole of a round.
+
+        Only the fields sent are changed; strokes is required when the hole
+        has no score yet. The round's stored totals are adjusted by the
+        change, and the round is marked complete once every hole of its tee
+        has a score, unless is_complete is sent explicitly.
+
+        Parameters:
+        - strokes: Number of strokes
+        - putts: Number of putts (optional)
+        - fairway_hit: Boolean (optional)
+        - green_in_regulation: Boolean (optional)
+        - penalties: Number of penalties (optional)
+        - is_complete: Boolean, overrides automatic completion (optional)
+
+        Args:
+            request: HTTP request
+            round_id: ID of the round
+            hole_number: Number of the hole on the round's tee
+
+        Returns:
+            Response: The hole score and round totals, 201 if the score is new
+        """
+        changes = {}
+        for field, (kind, minimum) in HOLE_SCORE_FIELDS.items():
+            if field not in request.data:
+                continue
+            value = request.data[field]
+            if type(value) is not kind or (minimum is not None and value < minimum):
+                expected = "a boolean" if kind is bool else f"an integer >= {minimum}"
+                return Response(
+                    {"error": f"{field} must be {expected}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            changes[field] = value
+        is_complete = request.data.get("is_complete")
+        if is_complete is not None and not isinstance(is_complete, bool):
+            return Response(
+                {"error": "is_complete must be a boolean"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        round_obj = get_object_or_404(
+            Round.objects.select_for_update(of=("self",)).select_related("tee"),
+            id=round_id,
+            player_id=request.user.id,
+        )
+        unpack_round(round_obj)
+        hole = (
+            Hole.objects.filter(tee_id=round_obj.tee_id, hole_number=hole_number)
+            .order_by()
+            .first()
+        )
+        if hole is None:
+            return Response(
+                {"error": f"Hole {hole_number} not found on this round's tee"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        # The round row lock serializes writers, so the score row is stable
+        score = HoleScore.objects.filter(round=round_obj, hole=hole).order_by().first()
+        created = score is None
+        if created:
+            if "strokes" not in changes:
+                return Response(
+                    {"error": "strokes is required for a hole without a score"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            score = HoleScore(hole=hole)
+        score.round = round_obj
+        for field, value in changes.items():
+            setattr(score, field, value)
+        if created or changes:
+            score.save()
+
+        strokes_total, holes_played = (
+            Round.objects.filter(pk=round_obj.pk)
+            .values_list("strokes_total", "holes_played")
+            .get()
+        )
+        if holes_played is None:
+            totals = Round.computed_totals([round_obj.pk])
+            strokes_total, holes_played = totals[round_obj.pk]
+
+        if is_complete is None:
+            is_complete = round_obj.is_complete or (
+                holes_played >= round_obj.tee.number_of_holes
+            )
+        if is_complete != round_obj.is_complete:
+            round_obj.is_complete = is_complete
+            round_obj.save(update_fields=["is_complete", "updated_at"])
+
+        return Response(
+            {
+                "round_id": round_obj.id,
+                "hole_number": hole.hole_number,
+                **{field: getattr(score, field) for field in HOLE_SCORE_FIELDS},
+                "total_score": strokes_total,
+                "holes_played": holes_played,
+                "is_complete": is_complete,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
 
 class CourseTeeView(APIView):
     """
@@ -711,27 +1091,13 @@ class ChatBotView(APIView):
 
     permission_classes = [IsAuthenticated]
 
-    def stream_response(self, prompt, rounds_text):
-        """
-        Generate streaming response from chat bot.
-
-        Args:
-            prompt: User's message to the chat bot
-            rounds_text: Context information about recent rounds
-
-        Yields:
-            str: Chunks of the generated response
-        """
-        bot = ChatBot()
-        response_stream = bot.answer_question(prompt, rounds_text)
-
-        for chunk in response_stream:
-            yield chunk
-
     def post(self, request):
         """
         Process a chat prompt and return streaming response.
 
+        The answer is produced before the response starts so that a busy
+        gateway can still be reported with a proper status code.
+
         Args:
             request: HTTP request containing the chat prompt
 
@@ -745,15 +1111,17 @@ class ChatBotView(APIView):
             )
 
         try:
-            rounds = Round.objects.all().order_by("-date_played")[:5]
-            rounds_text = "\n\nRecent rounds data:\n"
-            for round in rounds:
-                rounds_text += f"- Course: {round.course.course_name}, Date: {round.date_played.strftime('%Y-%m-%d')}, Score: {round.total_score}\n"
+            context_text = get_chat_context(request.user.id, prompt)
 
-            return StreamingHttpResponse(
-                self.stream_response(prompt, rounds_text), content_type="text/plain"
-            )
+            from .ollama_chat import ChatBot
+
+            bot = ChatBot(user_id=request.user.id)
+            answer = bot.answer_question(prompt, context_text)
+
+            return StreamingHttpResponse(replay(answer), content_type="text/plain")
 
+        except GatewayBusy as e:
+            return gateway_busy_response(e)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -790,7 +1158,9 @@ class VisionChatBotView(APIView):
             )
 
         try:
-            bot = VisionChatBot()
+            from .ollama_vision import ChatBot as VisionChatBot
+
+            bot = VisionChatBot(user_id=request.user.id)
 
             if video_file:
                 with tempfile.NamedTemporaryFile(
@@ -811,6 +1181,8 @@ class VisionChatBotView(APIView):
                 response = bot.answer_question(message)
                 return Response({"response": response}, status=status.HTTP_200_OK)
 
+        except GatewayBusy as e:
+            return gateway_busy_response(e)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -821,7 +1193,8 @@ class UserStats(APIView):
     """
     API endpoint for retrieving user golf statistics.
 
-    Calculates and returns various performance metrics for a user.
+    Returns various performance metrics for a user, served from a cache
+    that round writes invalidate (see stats.py).
     """
 
     permission_classes = [IsAuthenticated]
@@ -837,97 +1210,157 @@ class UserStats(APIView):
         Returns:
             Response: User golf statistics
         """
-        user = User.objects.get(id=user_id)
-        user.save()
-        rounds = Round.objects.filter(player=user).order_by("-date_played")[:10]
-        round_count = len(rounds)
+        stats = get_player_stats(user_id)
+        if stats is None:
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(stats)
+
+
+class PlayerTrendsView(APIView):
+    """
+    API endpoint for a player's scoring trends over time.
+
+    Returns 30/90/365-day averages, a day, week or month series for a date
+    range, and a per-round moving average of score, all aggregated in SQL.
+    """
 
-        if round_count == 0:
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, user_id):
+        """
+        Retrieve trend statistics for a user.
+
+        Query Parameters:
+            period (str): "day", "week" (default) or "month"
+            start (str): First date, YYYY-MM-DD (default: a year before end)
+            end (str): Last date, YYYY-MM-DD (default: today)
+            window (int): Days played in the moving average (default: 5)
+
+        Args:
+            request: HTTP request
+            user_id: ID of the user
+
+        Returns:
+            Response: Trend statistics
+        """
+        period = request.query_params.get("period", "week")
+        if period not in PERIODS:
             return Response(
-                {
-                    "handicap": None,
-                    "avg_putts_per_round": 0,
-                    "avg_penalities_per_round": 0,
-                    "avg_score_per_round": 0,
-                    "fairway_hit_percentage": 0,
-                    "gir_percentage": 0,
-                    "scores_list": [],
-                }
+                {"error": f"period must be one of {', '.join(PERIODS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            start = date_param(request, "start")
+            end = date_param(request, "end")
+            window = int(request.query_params.get("window", 5))
+        except ValueError:
+            return Response(
+                {"error": "start and end must be YYYY-MM-DD and window a number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if window < 1 or (start and end and start > end):
+            return Response(
+                {"error": "window must be positive and start no later than end"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        p, pen, s, fir, gir = 0, 0, 0, 0, 0
-        differentials = []
+        if not User.objects.filter(id=user_id).exists():
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
 
-        for round in rounds:
-            p += round.putt_total
-            pen += round.penalties_total
-            s += round.total_score
-            fir += round.fairways_hit_percent
-            gir += round.green_in_regulation
+        return Response(player_trends(user_id, period, start, end, window))
 
-            num_holes = round.hole_scores.count()
 
-            course_rating = round.tee.course_rating
-            slope_rating = round.tee.slope_rating
+class CourseStatsView(APIView):
+    """
+    API endpoint for scoring statistics on a course.
 
-            if num_holes == 9:
-                adjusted_score = round.total_score * 2
-                differential = (adjusted_score - course_rating) * 113 / slope_rating
-            elif num_holes == 18:
-                differential = (round.total_score - course_rating) * 113 / slope_rating
-            else:
-                continue
+    Returns course averages and per-hole averages over a date range, read
+    from the daily rollup tables.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        """
+        Retrieve scoring statistics for a course.
 
-            differentials.append(differential)
+        Query Parameters:
+            start (str): First date, YYYY-MM-DD (default: a year before end)
+            end (str): Last date, YYYY-MM-DD (default: today)
 
-        avg_p_pr = p / round_count
-        avg_pen_pr = pen / round_count
-        avg_s_pr = s / round_count
-        fhp = fir / round_count
-        girp = gir / round_count
+        Args:
+            request: HTTP request
+            course_id: ID of the course
 
-        best_differentials = sorted(differentials)[: max(1, round_count // 2)]
-        handicap = (
-            builtins.round(
-                (sum(best_differentials) / len(best_differentials)) * 0.96, 2
+        Returns:
+            Response: Course and per-hole statistics
+        """
+        try:
+            end = date_param(request, "end") or timezone.localdate()
+            start = date_param(request, "start") or end - timedelta(days=365)
+        except ValueError:
+            return Response(
+                {"error": "start and end must be YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if start > end:
+            return Response(
+                {"error": "start must be no later than end"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            if best_differentials
-            else None
-        )
 
-        scores_list = [
-            {
-                "round_id": round_obj.id,
-                "date": round_obj.date_played,
-                "course": round_obj.course.course_name,
-                "scores": [
-                    {
-                        "hole": score.hole.hole_number,
-                        "par": score.hole.par,
-                        "strokes": score.strokes,
-                        "putts": score.putts,
-                        "fairway_hit": score.fairway_hit,
-                        "green_in_regulation": score.green_in_regulation,
-                        "penalties": score.penalties,
-                        "date": round_obj.date_played,
-                    }
-                    for score in round_obj.hole_scores.all()
-                ],
-                "note": round_obj.notes,
-            }
-            for round_obj in rounds
-        ]
+        if not Course.objects.filter(id=course_id).exists():
+            return Response(
+                {"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(course_stats(course_id, start, end))
+
+
+class CourseHoleDifficultyView(APIView):
+    """
+    API endpoint for how hard each hole on a course plays.
+
+    Returns every hole's all-time scoring average against par, putts,
+    greens in regulation and blow-up rate, with a difficulty rank per tee,
+    read from the materialized hole stats table.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, course_id):
+        """
+        Retrieve hole difficulty for a course.
+
+        Query Parameters:
+            tee_id (int): Only holes on this tee
+
+        Args:
+            request: HTTP request
+            course_id: ID of the course
+
+        Returns:
+            Response: Per-hole difficulty
+        """
+        tee_id = request.query_params.get("tee_id")
+        if tee_id is not None and not tee_id.isdigit():
+            return Response(
+                {"error": "tee_id must be a number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not Course.objects.filter(id=course_id).exists():
+            return Response(
+                {"error": "Course not found"}, status=status.HTTP_404_NOT_FOUND
+            )
 
         return Response(
-            {
-                "handicap": handicap,
-                "avg_putts_per_round": avg_p_pr,
-                "avg_penalities_per_round": avg_pen_pr,
-                "avg_score_per_round": avg_s_pr,
-                "fairway_hit_percentage": fhp,
-                "gir_percentage": girp,
-                "scores_list": scores_list,
-            }
+            {"holes": hole_difficulty(course_id, int(tee_id) if tee_id else None)}
         )
 
 
@@ -950,69 +1383,237 @@ class LeaderBoardView(APIView):
         Returns:
             Response: Leaderboard data sorted by average score
         """
-        players = User.objects.all()[:50]
-        leader_board = []
+        return Response(build_leaderboard())
 
-        for player in players:
-            player_rounds = Round.objects.filter(player=player).order_by(
-                "-date_played"
-            )[:20]
 
-            round_count = len(player_rounds)
-            if round_count == 0:
-                continue
+class TournamentView(APIView):
+    """
+    API endpoint for listing and creating tournaments.
 
-            total = 0
-            for player_round in player_rounds:
-                total += player_round.total_score
+    Anyone signed in can list tournaments; only staff can create them.
+    """
 
-            differentials = []
-            for player_round in player_rounds:
-                num_holes = player_round.hole_scores.count()
+    def get_permissions(self):
+        """
+        Require staff for creating tournaments.
 
-                course_rating = player_round.tee.course_rating
-                slope_rating = player_round.tee.slope_rating
+        Returns:
+            list: Permission instances for the request method
+        """
+        if self.request.method == "POST":
+            return [IsAdminUser()]
+        return [IsAuthenticated()]
 
-                if num_holes == 9:
-                    adjusted_score = player_round.total_score * 2
-                    differential = (adjusted_score - course_rating) * 113 / slope_rating
-                elif num_holes == 18:
-                    differential = (
-                        (player_round.total_score - course_rating) * 113 / slope_rating
-                    )
-                else:
-                    continue
+    def get(self, request):
+        """
+        List tournaments, latest first.
 
-                differentials.append(differential)
+        Query Parameters:
+            course_id (int): Only tournaments on this course
+
+        Args:
+            request: HTTP request
 
-            best_differentials = sorted(differentials)[: max(1, round_count // 2)]
-            handicap = None
-            if best_differentials:
-                handicap = builtins.round(
-                    (sum(best_differentials) / len(best_differentials)) * 0.96, 2
+        Returns:
+            Response: List of tournaments
+        """
+        tournaments = Tournament.objects.order_by("-starts_at", "-id")
+        course_id = request.query_params.get("course_id")
+        if course_id:
+            if not course_id.isdigit():
+                return Response(
+                    {"error": "course_id must be a number"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
+            tournaments = tournaments.filter(course_id=course_id)
+        return Response(
+            list(
+                tournaments.values(
+                    "id", "name", "course_id", "tee_id", "starts_at", "ends_at"
+                )
+            )
+        )
 
-            if player.is_online:
-                is_online = "Online"
-            else:
-                is_online = "Offline"
+    def post(self, request):
+        """
+        Create a tournament.
 
-            leader_board.append(
-                {
-                    "is_online": is_online,
-                    "id": player.id,
-                    "user_id": player.id,
-                    "username": player.username,
-                    "average_score": builtins.round(total / round_count, 1),
-                    "handicap": handicap,
-                    "total_rounds": round_count,
-                }
+        Args:
+            request: HTTP request with name, course, tee, starts_at and ends_at
+
+        Returns:
+            Response: The created tournament, or validation errors
+        """
+        serializer = TournamentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class TournamentStandingsView(APIView):
+    """
+    API endpoint for a page of a tournament's gross or net standings.
+
+    Standings are read from Redis sorted sets kept current by round writes,
+    and include the requesting player's own entry.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, tournament_id):
+        """
+        Retrieve a page of standings.
+
+        Query Parameters:
+            type (str): "gross" (default) or "net"
+            offset (int): Entries to skip (default: 0)
+            limit (int): Entries to return (default: TOURNAMENT_PAGE_SIZE)
+
+        Args:
+            request: HTTP request
+            tournament_id: ID of the tournament
+
+        Returns:
+            Response: Tournament, total entries, standings page and "me"
+        """
+        kind = request.query_params.get("type", "gross")
+        if kind not in KINDS:
+            return Response(
+                {"error": f"type must be one of {', '.join(KINDS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            offset = int(request.query_params.get("offset", 0))
+            limit = page_size(
+                request,
+                getattr(settings, "TOURNAMENT_PAGE_SIZE", 50),
+                getattr(settings, "TOURNAMENT_PAGE_SIZE_MAX", 200),
             )
+            if offset < 0:
+                raise ValueError("offset")
+        except ValueError:
+            return Response(
+                {"error": "offset and limit must be non-negative numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        tournament = get_object_or_404(
+            Tournament.objects.select_related("tee"), pk=tournament_id
+        )
+        result = standings(tournament, kind, offset, limit, request.user.id)
+        return Response(
+            {
+                "tournament": {
+                    "id": tournament.id,
+                    "name": tournament.name,
+                    "starts_at": tournament.starts_at,
+                    "ends_at": tournament.ends_at,
+                },
+                "type": kind,
+                **result,
+            }
+        )
+
+
+class TournamentRebuildView(APIView):
+    """
+    API endpoint for rebuilding a tournament's standings from the database.
+
+    Staff only; used after bulk imports or if the Redis keys drift.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, tournament_id):
+        """
+        Rebuild a tournament's standings.
+
+        Args:
+            request: HTTP request
+            tournament_id: ID of the tournament
 
-        leader_board.sort(key=lambda x: x["average_score"])
+        Returns:
+            Response: Number of entries rebuilt
+        """
+        tournament = get_object_or_404(
+            Tournament.objects.select_related("tee"), pk=tournament_id
+        )
+        return Response({"entries": rebuild_standings(tournament)})
+
+
+class OllamaStatusView(APIView):
+    """
+    API endpoint reporting Ollama model load and residency state.
+
+    Shows which configured models are loaded, which are hot, and whether
+    peak-hour eviction protection is active.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Retrieve the current residency report.
+
+        Args:
+            request: HTTP request
+
+        Returns:
+            Response: Residency state per model
+        """
+        return Response(residency_report())
+
+
+class MetricsView(APIView):
+    """
+    API endpoint exposing process metrics in the Prometheus text format.
 
-        # Return the sorted leaderboard
-        return Response(leader_board)
+    Covers LLM call latency, queue wait, token counts and image sizes per
+    model and endpoint, plus gateway and chat cache state. When
+    METRICS_TOKEN is set, scrapers must send it in the X-Metrics-Token
+    header; otherwise only staff users may read it.
+    """
+
+    def get_authenticators(self):
+        """
+        Skip user authentication when scrapers authenticate by token.
+
+        Returns:
+            list: Authenticator instances
+        """
+        if getattr(settings, "METRICS_TOKEN", ""):
+            return []
+        return super().get_authenticators()
+
+    def get_permissions(self):
+        """
+        Require staff unless a scrape token is configured.
+
+        Returns:
+            list: Permission instances
+        """
+        if getattr(settings, "METRICS_TOKEN", ""):
+            return [AllowAny()]
+        return [IsAdminUser()]
+
+    def get(self, request):
+        """
+        Render the metrics registry.
+
+        Args:
+            request: HTTP request
+
+        Returns:
+            HttpResponse: Prometheus exposition text
+        """
+        token = getattr(settings, "METRICS_TOKEN", "")
+        sent = request.headers.get("X-Metrics-Token", "")
+        if token and not hmac.compare_digest(sent.encode(), token.encode()):
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
 
 
 class CourseTeeDebugView(APIView):
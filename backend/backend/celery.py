@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_ready
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
@@ -18,3 +19,9 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f"Request: {self.request!r}")
+
+
+@worker_ready.connect
+def warm_models_on_startup(sender, **kwargs):
+    # Load the Ollama models as soon as a worker starts instead of on the first request
+    sender.app.send_task("api.tasks.warm_ollama_models")
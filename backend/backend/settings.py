@@ -44,15 +44,22 @@ ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "localhost,127.0.0.1").split(","
 AUTH_USER_MODEL = "api.User"
 
 USER_ONLINE_TIMEOUT = 15 * 60
+# Minimum seconds between presence heartbeats written for the same user
+PRESENCE_HEARTBEAT_INTERVAL = int(os.environ.get("PRESENCE_HEARTBEAT_INTERVAL", 60))
 
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Same JSON as DRF's renderer, encoded with orjson when it is installed
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.fast_serializers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -60,8 +67,64 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(
         days=1,
     ),
+    # Requests are authenticated from token claims without loading the user
+    "TOKEN_USER_CLASS": "api.authentication.GolfTokenUser",
+    "TOKEN_OBTAIN_SERIALIZER": "api.authentication.GolfTokenObtainPairSerializer",
+}
+
+# Maximum database queries per request, by HTTP method and URL name.
+# Requests over budget are logged and counted in metrics; api/tests.py
+# fails on them.
+QUERY_BUDGETS = {
+    ("GET", "round"): 4,
+    ("POST", "round"): 10,  # includes transaction savepoints
+    ("GET", "round_detail"): 3,
+    ("PATCH", "round_hole_score"): 16,  # includes transaction savepoints
+    ("GET", "users"): 2,
+    ("GET", "player_stats"): 3,
+    ("GET", "leaderboard"): 5,
+    ("GET", "courses"): 4,
+    ("POST", "chatbot"): 6,
+    ("POST", "vision_chatbot"): 2,
 }
 
+# Pre-serialized course catalog; rebuilt whenever course data changes
+COURSE_CATALOG_CACHE_TIMEOUT = int(
+    os.environ.get("COURSE_CATALOG_CACHE_TIMEOUT", 24 * 60 * 60)
+)
+
+# Round history page size (GET /api/rounds/?limit=...)
+ROUND_PAGE_SIZE = int(os.environ.get("ROUND_PAGE_SIZE", 50))
+ROUND_PAGE_SIZE_MAX = int(os.environ.get("ROUND_PAGE_SIZE_MAX", 200))
+
+# Live leaderboard (GET /api/leaderboard/stream/): round writes publish at
+# most one delta per debounce window; watchers get keepalives this often
+# and are dropped to a fresh snapshot when this many events back up
+LEADERBOARD_PUSH_DEBOUNCE_SECONDS = int(
+    os.environ.get("LEADERBOARD_PUSH_DEBOUNCE_SECONDS", 2)
+)
+LEADERBOARD_STREAM_KEEPALIVE_SECONDS = int(
+    os.environ.get("LEADERBOARD_STREAM_KEEPALIVE_SECONDS", 20)
+)
+LEADERBOARD_STREAM_QUEUE_SIZE = int(
+    os.environ.get("LEADERBOARD_STREAM_QUEUE_SIZE", 100)
+)
+
+# Responses to writes sent with an Idempotency-Key are replayed this long
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+# User list page size (GET /api/user/?limit=...)
+USER_PAGE_SIZE = int(os.environ.get("USER_PAGE_SIZE", 50))
+USER_PAGE_SIZE_MAX = int(os.environ.get("USER_PAGE_SIZE_MAX", 200))
+
+# Tournament standings page size (GET /api/tournaments/<id>/standings/)
+TOURNAMENT_PAGE_SIZE = int(os.environ.get("TOURNAMENT_PAGE_SIZE", 50))
+TOURNAMENT_PAGE_SIZE_MAX = int(os.environ.get("TOURNAMENT_PAGE_SIZE_MAX", 200))
+
+# In-process caches used by stateless JWT authentication
+AUTH_VERSION_CACHE_SECONDS = int(os.environ.get("AUTH_VERSION_CACHE_SECONDS", 30))
+AUTH_USER_CACHE_SECONDS = int(os.environ.get("AUTH_USER_CACHE_SECONDS", 60))
+
 
 # Application definition
 
@@ -81,6 +144,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "api.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -193,8 +257,133 @@ CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
 
 CELERY_BEAT_SCHEDULE = {
-    "update-user-status": {
-        "task": "api.tasks.update_user_status",
-        "schedule": crontab(minute="*/15"),  # Run every 15 minutes
+    "flush-user-presence": {
+        "task": "api.tasks.flush_user_presence",
+        "schedule": crontab(minute="*"),  # Run every minute
+    },
+    "refresh-daily-rollups": {
+        "task": "api.tasks.refresh_daily_rollups",
+        "schedule": crontab(minute="*/5"),  # Run every 5 minutes
+    },
+    "purge-idempotency-keys": {
+        "task": "api.tasks.purge_idempotency_keys",
+        "schedule": crontab(minute=17),  # Run hourly
+    },
+    "pack-completed-rounds": {
+        "task": "api.tasks.pack_completed_rounds",
+        "schedule": crontab(hour=3, minute=40),  # Run daily
+    },
+    "warm-ollama-models": {
+        "task": "api.tasks.warm_ollama_models",
+        "schedule": crontab(minute="*/5"),  # Run every 5 minutes
     },
 }
+
+# Daily rollups trail writes by this many seconds so slow transactions are
+# not skipped; keys are recomputed this many at a time
+ROLLUP_SETTLE_SECONDS = int(os.environ.get("ROLLUP_SETTLE_SECONDS", 60))
+ROLLUP_BATCH_SIZE = int(os.environ.get("ROLLUP_BATCH_SIZE", 500))
+
+# Compact storage: completed rounds untouched for this many days have their
+# hole scores packed into one column, up to a batch of rounds per daily run
+SCORE_PACKING_ENABLED = os.environ.get(
+    "SCORE_PACKING_ENABLED", "False"
+).lower() in ("true", "1", "yes")
+SCORE_PACKING_AFTER_DAYS = int(os.environ.get("SCORE_PACKING_AFTER_DAYS", 30))
+SCORE_PACKING_BATCH_SIZE = int(os.environ.get("SCORE_PACKING_BATCH_SIZE", 5000))
+
+
+# Cache
+# Redis is used when REDIS_URL is configured (docker-compose sets it); local
+# development without Redis falls back to an in-process cache. Redis runs
+# with volatile-lru, so only keys with a TTL can be evicted: cache entries
+# need a timeout, and state that must survive (Celery queues, standings)
+# is written without one.
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Chatbot response cache (answers are deterministic at temperature 0)
+CHAT_RESPONSE_CACHE_ENABLED = os.environ.get(
+    "CHAT_RESPONSE_CACHE_ENABLED", "True"
+).lower() in ("true", "1", "yes")
+CHAT_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get("CHAT_RESPONSE_CACHE_TIMEOUT", 7 * 24 * 60 * 60)
+)
+
+# LLM gateway: per-model concurrency slots and queue limits (per worker process)
+LLM_GATEWAY = {
+    "MODEL_SLOTS": {
+        model.strip(): int(slots)
+        for model, slots in (
+            entry.split("=")
+            for entry in os.environ.get(
+                "LLM_GATEWAY_MODEL_SLOTS", "mistral=2,gemma3=1"
+            ).split(",")
+            if "=" in entry
+        )
+    },
+    "DEFAULT_SLOTS": int(os.environ.get("LLM_GATEWAY_DEFAULT_SLOTS", 1)),
+    "MAX_QUEUE_DEPTH": int(os.environ.get("LLM_GATEWAY_MAX_QUEUE_DEPTH", 20)),
+    "QUEUE_TIMEOUT": float(os.environ.get("LLM_GATEWAY_QUEUE_TIMEOUT", 60)),
+}
+
+# Per-player profile stats (invalidated on round writes)
+PLAYER_STATS_CACHE_TIMEOUT = int(
+    os.environ.get("PLAYER_STATS_CACHE_TIMEOUT", 24 * 60 * 60)
+)
+
+# Per-user golfer profile appended to chatbot prompts (invalidated on round writes)
+CHAT_PROFILE_CACHE_TIMEOUT = int(os.environ.get("CHAT_PROFILE_CACHE_TIMEOUT", 24 * 60 * 60))
+
+# Chat model routing: small talk goes to a small model, technical questions to the large one
+CHAT_SMALL_MODEL = os.environ.get("CHAT_SMALL_MODEL", "gemma3:1b")
+# Optional tiny model used to classify messages the keyword rules cannot place
+CHAT_ROUTER_CLASSIFIER_MODEL = os.environ.get("CHAT_ROUTER_CLASSIFIER_MODEL", "")
+
+# Ollama model residency: keep the models the app uses loaded between requests
+OLLAMA_RESIDENT_MODELS = os.environ.get(
+    "OLLAMA_RESIDENT_MODELS", "mistral,gemma3,gemma3:1b"
+).split(",")
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# Should match OLLAMA_MAX_LOADED_MODELS on the Ollama server
+OLLAMA_MAX_LOADED_MODELS = int(os.environ.get("OLLAMA_MAX_LOADED_MODELS", 3))
+# A model used within this many seconds is "hot" and will not be evicted at peak
+OLLAMA_HOT_WINDOW = int(os.environ.get("OLLAMA_HOT_WINDOW", 10 * 60))
+# Peak hours (start, end) in TIME_ZONE, end exclusive
+OLLAMA_PEAK_HOURS = tuple(
+    int(hour) for hour in os.environ.get("OLLAMA_PEAK_HOURS", "7-21").split("-")
+)
+OLLAMA_RESIDENCY_CACHE_SECONDS = int(os.environ.get("OLLAMA_RESIDENCY_CACHE_SECONDS", 10))
+# After a failed residency read, skip the server for this many seconds
+OLLAMA_UNREACHABLE_CACHE_SECONDS = int(
+    os.environ.get("OLLAMA_UNREACHABLE_CACHE_SECONDS", 5)
+)
+
+# Retrieval-augmented chat over each user's rounds and the golf tips corpus
+CHAT_RETRIEVAL_ENABLED = os.environ.get(
+    "CHAT_RETRIEVAL_ENABLED", "False"
+).lower() in ("true", "1", "yes")
+CHAT_EMBEDDING_MODEL = os.environ.get("CHAT_EMBEDDING_MODEL", "nomic-embed-text")
+RETRIEVAL_INDEX_DIR = os.environ.get(
+    "RETRIEVAL_INDEX_DIR", os.path.join(BASE_DIR, "retrieval_index")
+)
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 4))
+RETRIEVAL_MIN_SCORE = float(os.environ.get("RETRIEVAL_MIN_SCORE", 0.3))
+
+# Prometheus scrape endpoint: scrapers send this token in X-Metrics-Token;
+# left empty, only staff users can read it
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
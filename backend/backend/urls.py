@@ -6,17 +6,27 @@ from api.views import (
     CourseSearchAPIView,
     SavedCourseView,
     RoundView,
+    RoundHoleScoreView,
     UsersView,
     CourseTeeView,
     TeeHoleView,
     ChatBotView,
     VisionChatBotView,
     UserStats,
+    PlayerTrendsView,
+    CourseStatsView,
+    CourseHoleDifficultyView,
     LeaderBoardView,
+    TournamentView,
+    TournamentStandingsView,
+    TournamentRebuildView,
     VisionChatBotView,
     CourseTeeDebugView,
-    HealthCheckView
+    HealthCheckView,
+    OllamaStatusView,
+    MetricsView,
 )
+from api.leaderboard_stream import leaderboard_stream
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -32,7 +42,25 @@ urlpatterns = [
     path("api/user/", UsersView.as_view(), name="users"),
     path("api/user/<int:user_id>", UsersView.as_view(), name="user_detail"),
     path("api/player/<int:user_id>/stats", UserStats.as_view(), name="player_stats"),
+    path(
+        "api/player/<int:user_id>/trends",
+        PlayerTrendsView.as_view(),
+        name="player_trends",
+    ),
     path("api/leaderboard/", LeaderBoardView.as_view(), name="leaderboard"),
+    path("api/leaderboard/stream/", leaderboard_stream, name="leaderboard_stream"),
+    # Tournament section
+    path("api/tournaments/", TournamentView.as_view(), name="tournaments"),
+    path(
+        "api/tournaments/<int:tournament_id>/standings/",
+        TournamentStandingsView.as_view(),
+        name="tournament_standings",
+    ),
+    path(
+        "api/tournaments/<int:tournament_id>/rebuild/",
+        TournamentRebuildView.as_view(),
+        name="tournament_rebuild",
+    ),
     # Token section
     path("api/token/", TokenObtainPairView.as_view(), name="get_token"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="refresh"),
@@ -44,14 +72,31 @@ urlpatterns = [
         CourseTeeView.as_view(),
         name="course_tee_detail",
     ),
+    path(
+        "api/courses/<int:course_id>/stats/",
+        CourseStatsView.as_view(),
+        name="course_stats",
+    ),
+    path(
+        "api/courses/<int:course_id>/holes/difficulty/",
+        CourseHoleDifficultyView.as_view(),
+        name="course_hole_difficulty",
+    ),
     path("api/tees/<int:tee_id>/holes/", TeeHoleView.as_view(), name="tee_hole_detail"),
     # Round section
     path("api/rounds/", RoundView.as_view(), name="round"),
     path("api/rounds/<int:round_id>", RoundView.as_view(), name="round_detail"),
+    path(
+        "api/rounds/<int:round_id>/holes/<int:hole_number>",
+        RoundHoleScoreView.as_view(),
+        name="round_hole_score",
+    ),
     path("api-auth", include("rest_framework.urls")),
     # custom ai chatbot section
     path("api/chat/", ChatBotView.as_view(), name="chatbot"),
     path("api/vision/", VisionChatBotView.as_view(), name="vision_chatbot"),
+    path("api/ollama/status/", OllamaStatusView.as_view(), name="ollama_status"),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     path(
         "api/courses/<int:course_id>/tees/debug/",
         CourseTeeDebugView.as_view(),
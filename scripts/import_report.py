@@ -0,0 +1,149 @@
+# ╔════════════════════════════════════════════════════════════════════╗
+# ║   Python Script                                                    ║
+# ╠════════════════════════════════════════════════════════════════════╣
+# ║  Author  : Brodie Rogers                                           ║
+# ║  Contact : Brodieman500@gmail.com                                  ║
+# ║  Created : 05-06-2025                                              ║
+# ║  Purpose : Startup import time and memory report per process type  ║
+# ║  Notes   : Ollama is the best                                      ║
+# ╚════════════════════════════════════════════════════════════════════╝
+
+"""
+Report how long each kind of backend process takes to import its code and
+how much memory it holds afterwards.
+
+Each process type is started in a fresh interpreter with -X importtime,
+doing what that process does at boot:
+
+    manage  django.setup() only (management commands)
+    web     django.setup() and the URLconf, which imports every view
+    celery  the Celery app plus api.tasks
+    vision  web plus the video analysis stack (OpenCV), as on first upload
+
+For each one the report shows wall time, peak RSS, whether the heavy
+optional stacks (cv2, ollama, numpy) were loaded, and the slowest
+top-level imports.
+
+Usage:
+    python scripts/import_report.py [--top 8] [--only web celery]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+HEAVY_MODULES = ("cv2", "ollama", "numpy", "httpx")
+
+SETUP = """
+import os, django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+django.setup()
+"""
+
+PROCESS_TYPES = {
+    "manage": SETUP,
+    "web": SETUP + "import backend.urls\n",
+    "celery": "from backend.celery import app\nimport django\ndjango.setup()\nimport api.tasks\n",
+    "vision": SETUP + "import backend.urls\nimport api.ollama_vision\nimport cv2\n",
+}
+
+PROBE = """
+import resource, sys, time
+_started = time.perf_counter()
+{body}
+_elapsed = time.perf_counter() - _started
+_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform != "darwin":
+    _rss *= 1024
+print("REPORT", _elapsed, _rss, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr, top):
+    """
+    Pick the slowest top-level imports out of -X importtime output.
+
+    Returns:
+        list: (cumulative seconds, module name), slowest first
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Nested imports are indented; keep top-level ones to avoid double counting
+        name = name[1:].rstrip()
+        if name.startswith(" "):
+            continue
+        rows.append((int(cumulative_us) / 1e6, name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def measure(name, body, top):
+    """Run one process type in a fresh interpreter and collect its numbers."""
+    env = dict(os.environ)
+    env.setdefault("USE_SQLITE", "True")
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            PROBE.format(body=body, heavy=HEAVY_MODULES),
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    report = [line for line in result.stdout.splitlines() if line.startswith("REPORT")]
+    if result.returncode or not report:
+        tail = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        return {"name": name, "error": tail[0]}
+
+    _, elapsed, rss, heavy = report[-1].split(" ", 3)
+    return {
+        "name": name,
+        "seconds": float(elapsed),
+        "rss_mb": int(rss) / (1024 * 1024),
+        "heavy": heavy.strip() or "-",
+        "slowest": parse_importtime(result.stderr, top),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and RSS per process type")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list")
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(PROCESS_TYPES), help="Process types to run"
+    )
+    args = parser.parse_args()
+
+    results = [
+        measure(name, PROCESS_TYPES[name], args.top)
+        for name in (args.only or PROCESS_TYPES)
+    ]
+
+    print(f"{'process':<8} {'import s':>9} {'peak RSS':>10}  heavy modules loaded")
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<8} failed: {r['error']}")
+            continue
+        print(
+            f"{r['name']:<8} {r['seconds']:>9.2f} {r['rss_mb']:>7.1f} MB  {r['heavy']}"
+        )
+
+    for r in results:
+        if "error" in r or not r["slowest"]:
+            continue
+        print(f"\nSlowest imports ({r['name']}):")
+        for seconds, module in r["slowest"]:
+            print(f"  {seconds:6.3f}s  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# ╔════════════════════════════════════════════════════════════════════╗
+# ║   Python Script                                                    ║
+# ╠════════════════════════════════════════════════════════════════════╣
+# ║  Author  : Brodie Rogers                                           ║
+# ║  Contact : Brodieman500@gmail.com                                  ║
+# ║  Created : 05-06-2025                                              ║
+# ║  Purpose : Load generator for the chat and vision endpoints        ║
+# ║  Notes   : Ollama is the best                                      ║
+# ╚════════════════════════════════════════════════════════════════════╝
+
+"""
+Drive /api/chat/ or /api/vision/ at a fixed concurrency and report latency.
+
+Each worker thread sends requests back to back until the request count or
+duration is reached. For every request the harness records the time to the
+first response byte and the total time, then prints p50/p90/p99, status
+codes and throughput.
+
+Typical run against the stub server (see ollama_stub.py):
+    python scripts/ollama_stub.py --port 11435 &
+    OLLAMA_HOST=http://localhost:11435 python backend/manage.py runserver &
+    python scripts/loadtest.py --username demo --password demo \\
+        --endpoint chat --concurrency 8 --requests 200
+
+Use --unique to append a counter to each message so the chat response
+cache is bypassed, and --video to post a swing video to /api/vision/.
+"""
+
+import argparse
+import http.client
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlparse
+
+DEFAULT_MESSAGES = [
+    "How do I stop slicing my driver?",
+    "What should I work on to cut down three putts?",
+    "How can I hit more greens in regulation?",
+    "Give me a practice plan for this week.",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Client:
+    """Minimal HTTP client bound to one backend base URL."""
+
+    def __init__(self, base_url, timeout):
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip("/")
+        self.timeout = timeout
+
+    def connection(self):
+        cls = (
+            http.client.HTTPSConnection
+            if self.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send one request and time it.
+
+        Returns:
+            tuple: (status, time to first byte, total time, body bytes)
+        """
+        conn = self.connection()
+        started = time.perf_counter()
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            first = response.read(1)
+            ttfb = time.perf_counter() - started
+            rest = response.read()
+            return response.status, ttfb, time.perf_counter() - started, first + rest
+        finally:
+            conn.close()
+
+    def token(self, username, password):
+        """Log in and return an access token."""
+        status, _, _, body = self.request(
+            "POST",
+            "/api/token/",
+            json.dumps({"username": username, "password": password}),
+            {"Content-Type": "application/json"},
+        )
+        if status != 200:
+            sys.exit(f"Login failed ({status}): {body[:200]!r}")
+        return json.loads(body)["access"]
+
+
+def multipart(fields, files):
+    """
+    Encode form fields and files as multipart/form-data.
+
+    Returns:
+        tuple: (body bytes, content type header)
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n".encode()
+        )
+    for name, (filename, data) in files.items():
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n'.encode()
+            + data
+            + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class LoadTest:
+    """Runs workers and collects one result tuple per request."""
+
+    def __init__(self, client, args, token):
+        self.client = client
+        self.args = args
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.path = "/api/chat/" if args.endpoint == "chat" else "/api/vision/"
+        self.messages = args.message or DEFAULT_MESSAGES
+        self.video = None
+        if args.video:
+            with open(args.video, "rb") as f:
+                self.video = (os.path.basename(args.video), f.read())
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.results = []  # (status, ttfb, total)
+        self.errors = Counter()
+
+    def _next(self):
+        """Claim the next request number, or None when the run is over."""
+        with self.lock:
+            if self.args.requests and self.sent >= self.args.requests:
+                return None
+            if self.args.duration and time.perf_counter() >= self.deadline:
+                return None
+            self.sent += 1
+            return self.sent
+
+    def _build(self, n):
+        message = self.messages[n % len(self.messages)]
+        if self.args.unique:
+            message = f"{message} (#{n})"
+        if self.video:
+            body, content_type = multipart({"message": message}, {"video": self.video})
+        else:
+            body, content_type = json.dumps({"message": message}), "application/json"
+        return body, {**self.auth, "Content-Type": content_type}
+
+    def worker(self):
+        while True:
+            n = self._next()
+            if n is None:
+                return
+            body, headers = self._build(n)
+            try:
+                status, ttfb, total, _ = self.client.request(
+                    "POST", self.path, body, headers
+                )
+            except Exception as e:
+                with self.lock:
+                    self.errors[type(e).__name__] += 1
+                continue
+            with self.lock:
+                self.results.append((status, ttfb, total))
+
+    def run(self):
+        self.deadline = time.perf_counter() + (self.args.duration or 0)
+        threads = [
+            threading.Thread(target=self.worker, daemon=True)
+            for _ in range(self.args.concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        ok = [r for r in self.results if 200 <= r[0] < 300]
+        statuses = Counter(r[0] for r in self.results)
+        lines = [
+            f"endpoint     {self.path}",
+            f"concurrency  {self.args.concurrency}",
+            f"requests     {len(self.results)} in {elapsed:.1f}s "
+            f"({len(self.results) / elapsed:.2f} req/s)",
+            "status       "
+            + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items())),
+        ]
+        if self.errors:
+            lines.append(
+                "errors       "
+                + ", ".join(f"{name}: {count}" for name, count in self.errors.items())
+            )
+        for label, index in (("first byte", 1), ("total", 2)):
+            values = sorted(r[index] for r in ok)
+            if not values:
+                continue
+            lines.append(
+                f"{label:<12} p50 {percentile(values, 50) * 1000:8.1f} ms  "
+                f"p90 {percentile(values, 90) * 1000:8.1f} ms  "
+                f"p99 {percentile(values, 99) * 1000:8.1f} ms  "
+                f"max {values[-1] * 1000:8.1f} ms"
+            )
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--endpoint", choices=("chat", "vision"), default="chat")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="0 to use --duration")
+    parser.add_argument("--duration", type=float, default=0, help="Seconds to run")
+    parser.add_argument(
+        "--message", action="append", help="Message to send (repeatable)"
+    )
+    parser.add_argument(
+        "--unique", action="store_true", help="Make every message unique (no cache hits)"
+    )
+    parser.add_argument("--video", help="Video file to post to /api/vision/")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+    if args.video and args.endpoint != "vision":
+        parser.error("--video needs --endpoint vision")
+
+    client = Client(args.base_url, args.timeout)
+    test = LoadTest(client, args, client.token(args.username, args.password))
+    elapsed = test.run()
+    print(test.report(elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# ╔════════════════════════════════════════════════════════════════════╗
+# ║   Python Script                                                    ║
+# ╠════════════════════════════════════════════════════════════════════╣
+# ║  Author  : Brodie Rogers                                           ║
+# ║  Contact : Brodieman500@gmail.com                                  ║
+# ║  Created : 05-06-2025                                              ║
+# ║  Purpose : Stand-in Ollama server for local load testing           ║
+# ║  Notes   : Ollama is the best                                      ║
+# ╚════════════════════════════════════════════════════════════════════╝
+
+"""
+Fake Ollama HTTP server for load testing without a GPU or real models.
+
+Implements the parts of the Ollama API the backend uses: /api/chat
+(streaming NDJSON and non-streaming), /api/generate, /api/embed, /api/ps,
+/api/tags and /api/version. Responses carry realistic eval counts and
+durations so the metrics and gateway code paths behave as they would
+against a real server.
+
+Usage:
+    python scripts/ollama_stub.py --port 11435 --load-time 2 --tokens-per-second 30
+
+Then point the backend at it:
+    OLLAMA_HOST=http://localhost:11435 python manage.py runserver
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "keep your head still through impact and let the club release naturally "
+    "aim for the middle of the green and commit to the shot with a smooth tempo "
+    "practice lag putting from thirty feet to cut down on three putts"
+).split()
+
+
+class StubState:
+    """Configuration and model residency shared by all request threads."""
+
+    def __init__(self, args):
+        self.latency = args.latency
+        self.load_time = args.load_time
+        self.tokens_per_second = args.tokens_per_second
+        self.response_tokens = args.response_tokens
+        self.failure_rate = args.failure_rate
+        self.max_loaded = args.max_loaded
+        self.keep_alive = args.keep_alive
+        self.embedding_dim = args.embedding_dim
+        self.lock = threading.Lock()
+        self.loaded = {}  # model -> expiry timestamp, oldest first
+
+    def load(self, model):
+        """
+        Mark a model as loaded, evicting the oldest if the server is full.
+
+        Returns:
+            float: Seconds spent "loading" (0 if it was already resident)
+        """
+        name = model if ":" in model else f"{model}:latest"
+        with self.lock:
+            now = time.time()
+            self.loaded = {m: exp for m, exp in self.loaded.items() if exp > now}
+            was_loaded = name in self.loaded
+            self.loaded.pop(name, None)
+            while len(self.loaded) >= self.max_loaded:
+                self.loaded.pop(next(iter(self.loaded)))
+            self.loaded[name] = now + self.keep_alive
+        return 0.0 if was_loaded else self.load_time
+
+    def resident(self):
+        """Models currently loaded with their expiry times."""
+        with self.lock:
+            now = time.time()
+            return {m: exp for m, exp in self.loaded.items() if exp > now}
+
+
+def prompt_tokens(messages):
+    """Rough token count for a list of chat messages (4 characters per token)."""
+    chars = sum(len(m.get("content") or "") for m in messages)
+    images = sum(len(m.get("images") or []) for m in messages)
+    return max(1, chars // 4) + images * 256
+
+
+def iso(ts):
+    """Format a timestamp the way Ollama does."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the Ollama endpoints."""
+
+    protocol_version = "HTTP/1.1"
+    state = None  # set by main()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self):
+        """Return True (after sending a 500) for a configured share of requests."""
+        if random.random() < self.state.failure_rate:
+            time.sleep(self.state.latency)
+            self._send_json({"error": "stub: simulated failure"}, status=500)
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            self._send_json(
+                {
+                    "models": [
+                        {
+                            "name": name,
+                            "model": name,
+                            "size": 4_000_000_000,
+                            "size_vram": 4_000_000_000,
+                            "digest": "stub",
+                            "expires_at": iso(expiry),
+                        }
+                        for name, expiry in self.state.resident().items()
+                    ]
+                }
+            )
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        elif self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        routes = {
+            "/api/chat": self._chat,
+            "/api/generate": self._generate,
+            "/api/embed": self._embed,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json({"error": "not found"}, status=404)
+            return
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+        if self._maybe_fail():
+            return
+        handler(request)
+
+    def _timings(self, model, n_prompt):
+        """Sleep for load and prompt evaluation, returning the durations in ns."""
+        load = self.state.load(model)
+        prompt_eval = n_prompt / 2000
+        time.sleep(self.state.latency + load + prompt_eval)
+        return int(load * 1e9), int(prompt_eval * 1e9)
+
+    def _stream_tokens(self, n_tokens):
+        """Yield response words paced at the configured token rate."""
+        delay = 1 / self.state.tokens_per_second if self.state.tokens_per_second else 0
+        for i in range(n_tokens):
+            if delay:
+                time.sleep(delay)
+            yield WORDS[i % len(WORDS)] + " "
+
+    def _final_fields(self, model, started, load_ns, prompt_ns, n_prompt, n_eval):
+        return {
+            "model": model,
+            "created_at": iso(time.time()),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.monotonic() - started) * 1e9),
+            "load_duration": load_ns,
+            "prompt_eval_count": n_prompt,
+            "prompt_eval_duration": prompt_ns,
+            "eval_count": n_eval,
+            "eval_duration": int(
+                n_eval / self.state.tokens_per_second * 1e9
+                if self.state.tokens_per_second
+                else 0
+            ),
+        }
+
+    def _respond(self, request, n_prompt, wrap):
+        """Send a generated answer, streamed as NDJSON or as one JSON body."""
+        model = request.get("model", "stub")
+        started = time.monotonic()
+        n_eval = (request.get("options") or {}).get("num_predict") or self.state.response_tokens
+        n_eval = max(1, min(int(n_eval), self.state.response_tokens))
+        load_ns, prompt_ns = self._timings(model, n_prompt)
+
+        if request.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in self._stream_tokens(n_eval):
+                chunk = {"model": model, "created_at": iso(time.time()), "done": False}
+                chunk.update(wrap(word))
+                self._write_chunk(json.dumps(chunk) + "\n")
+            final = self._final_fields(model, started, load_ns, prompt_ns, n_prompt, n_eval)
+            final.update(wrap(""))
+            self._write_chunk(json.dumps(final) + "\n")
+            self._write_chunk("")
+        else:
+            text = "".join(self._stream_tokens(n_eval)).strip()
+            payload = self._final_fields(model, started, load_ns, prompt_ns, n_prompt, n_eval)
+            payload.update(wrap(text))
+            self._send_json(payload)
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _chat(self, request):
+        messages = request.get("messages") or []
+        self._respond(
+            request,
+            prompt_tokens(messages),
+            lambda text: {"message": {"role": "assistant", "content": text}},
+        )
+
+    def _generate(self, request):
+        if not request.get("prompt"):
+            # Empty prompt: Ollama just loads the model
+            model = request.get("model", "stub")
+            load_ns, _ = self._timings(model, 0)
+            self._send_json(
+                {
+                    "model": model,
+                    "created_at": iso(time.time()),
+                    "response": "",
+                    "done": True,
+                    "done_reason": "load",
+                    "load_duration": load_ns,
+                }
+            )
+            return
+        self._respond(
+            request,
+            max(1, len(request["prompt"]) // 4),
+            lambda text: {"response": text},
+        )
+
+    def _embed(self, request):
+        model = request.get("model", "stub")
+        inputs = request.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        n_prompt = sum(max(1, len(text) // 4) for text in inputs)
+        load_ns, _ = self._timings(model, n_prompt)
+        embeddings = []
+        for text in inputs:
+            rng = random.Random(text)
+            embeddings.append([rng.uniform(-1, 1) for _ in range(self.state.embedding_dim)])
+        self._send_json(
+            {
+                "model": model,
+                "embeddings": embeddings,
+                "load_duration": load_ns,
+                "prompt_eval_count": n_prompt,
+            }
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Fixed seconds added to every call"
+    )
+    parser.add_argument(
+        "--load-time", type=float, default=0.0, help="Seconds to load a cold model"
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=40.0,
+        help="Generation speed; 0 returns tokens instantly",
+    )
+    parser.add_argument(
+        "--response-tokens", type=int, default=120, help="Tokens per generated answer"
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0.0, help="Share of calls that return 500"
+    )
+    parser.add_argument(
+        "--max-loaded", type=int, default=3, help="Models kept loaded at once"
+    )
+    parser.add_argument(
+        "--keep-alive", type=float, default=30 * 60, help="Seconds a model stays loaded"
+    )
+    parser.add_argument("--embedding-dim", type=int, default=768)
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"Ollama stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
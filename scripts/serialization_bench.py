@@ -0,0 +1,182 @@
+# ╔════════════════════════════════════════════════════════════════════╗
+# ║   Python Script                                                    ║
+# ╠════════════════════════════════════════════════════════════════════╣
+# ║  Author  : Brodie Rogers                                           ║
+# ║  Contact : Brodieman500@gmail.com                                  ║
+# ║  Created : 05-06-2025                                              ║
+# ║  Purpose : Per-object serialization cost, DRF vs values() path     ║
+# ║  Notes   : Ollama is the best                                      ║
+# ╚════════════════════════════════════════════════════════════════════╝
+
+"""
+Compare the cost of building and rendering the hot read payloads with DRF
+ModelSerializers against the values()-based path in api/fast_serializers.py.
+
+The benchmark creates a throwaway in-memory SQLite database, fills it with
+courses (tees and holes) and users, then times for each payload:
+
+    drf     ModelSerializer(many=True) over model instances + JSONRenderer
+    fast    values_list() tuples + fast_serializers.dumps()
+    encode  rendering the same finished payload with each encoder only
+
+Times are the best of --repeat runs, reported per serialized object
+(a course, tee and hole each count as one). dumps() uses orjson when it
+is installed and the stdlib json module otherwise; the report says which.
+
+Usage:
+    python scripts/serialization_bench.py [--courses 50] [--users 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def setup_django():
+    """Configure Django against a fresh in-memory SQLite database."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    os.environ["USE_SQLITE"] = "True"
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # Create the api tables straight from the models so no migration files are needed
+    settings.MIGRATION_MODULES = {"api": None}
+    from django.db import connection
+
+    connection.creation.create_test_db(verbosity=0)
+
+
+def populate(courses, users):
+    """
+    Insert benchmark data.
+
+    Args:
+        courses (int): Courses to create, each with two 18-hole tees
+        users (int): Users to create
+
+    Returns:
+        int: Course, tee and hole objects in the catalog
+    """
+    from api.models import Course, Hole, Tee, User
+
+    tee_fields = dict(
+        course_rating=71.2,
+        slope_rating=128,
+        bogey_rating=95.1,
+        total_yards=6500,
+        total_meters=5944,
+        number_of_holes=18,
+        par_total=72,
+        front_course_rating=35.6,
+        front_slope_rating=127,
+        front_bogey_rating=47.5,
+        back_course_rating=35.6,
+        back_slope_rating=129,
+        back_bogey_rating=47.6,
+    )
+    for c in range(courses):
+        course = Course.objects.create(
+            club_name=f"Club {c}",
+            course_name=f"Course {c}",
+            address=f"{c} Fairway Drive",
+            city="Brisbane",
+            state="QLD",
+            country="Australia",
+            latitude=-27.47,
+            longitude=153.02,
+        )
+        for tee_name in ("Blue", "White"):
+            tee = Tee.objects.create(
+                course=course, tee_name=tee_name, gender="male", **tee_fields
+            )
+            Hole.objects.bulk_create(
+                Hole(tee=tee, hole_number=n, par=4, yardage=380 + n, handicap=n)
+                for n in range(1, 19)
+            )
+    User.objects.bulk_create(
+        User(
+            username=f"player{u}",
+            email=f"player{u}@example.com",
+            first_name="Sam",
+            last_name=f"Player{u}",
+        )
+        for u in range(users)
+    )
+    return courses * (1 + 2 * (1 + 18))
+
+
+def best_of(repeat, fn):
+    """Fastest wall time of fn over repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from api.fast_serializers import _load_orjson, course_catalog, dumps, user_rows
+    from api.models import Course, User
+    from api.serializers import CourseSerializer, UserSerializer
+
+    catalog_objects = populate(args.courses, args.users)
+    renderer = JSONRenderer()
+
+    def drf_catalog():
+        courses = Course.objects.prefetch_related("tees__holes").all()
+        return renderer.render(CourseSerializer(courses, many=True).data)
+
+    def drf_users():
+        return renderer.render(
+            {"users": UserSerializer(User.objects.all(), many=True).data}
+        )
+
+    def fast_users():
+        return dumps({"users": user_rows(User.objects.all())})
+
+    if drf_catalog() != dumps(course_catalog()) or drf_users() != fast_users():
+        sys.exit("fast path output differs from the DRF serializers")
+
+    catalog = course_catalog()
+    users = {"users": user_rows(User.objects.all())}
+    cases = [
+        ("catalog", catalog_objects, drf_catalog, lambda: dumps(course_catalog())),
+        ("users", args.users, drf_users, fast_users),
+        (
+            "catalog encode",
+            catalog_objects,
+            lambda: renderer.render(catalog),
+            lambda: dumps(catalog),
+        ),
+        ("users encode", args.users, lambda: renderer.render(users), lambda: dumps(users)),
+    ]
+
+    encoder = "orjson" if _load_orjson() else "json (orjson not installed)"
+    print(f"encoder: {encoder}, best of {args.repeat}\n")
+    print(f"{'payload':<16}{'objects':>8}{'drf us/obj':>12}{'fast us/obj':>13}{'speedup':>9}")
+    for name, objects, drf, fast in cases:
+        before = best_of(args.repeat, drf) / objects * 1e6
+        after = best_of(args.repeat, fast) / objects * 1e6
+        print(f"{name:<16}{objects:>8}{before:>12.2f}{after:>13.2f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
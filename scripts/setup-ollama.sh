@@ -7,7 +7,9 @@ set -e
 echo "Starting to download required Ollama models..."
 
 # Define the models to pull
-MODELS=("gemma3")
+# mistral: chat answers, gemma3: vision, gemma3:1b: small talk (CHAT_SMALL_MODEL),
+# nomic-embed-text: chat retrieval embeddings (CHAT_EMBEDDING_MODEL)
+MODELS=("mistral" "gemma3" "gemma3:1b" "nomic-embed-text")
 
 # Pull each model
 for model in "${MODELS[@]}"; do